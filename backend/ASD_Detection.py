@@ -3,6 +3,7 @@ os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 import json
 import time
 import pathlib
+import itertools
 import argparse
 from collections import deque
 from typing import Dict, Any, List, Tuple, Optional
@@ -13,7 +14,7 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.svm import SVC
 from sklearn.calibration import CalibratedClassifierCV
-from sklearn.metrics import roc_auc_score, accuracy_score, precision_recall_fscore_support, confusion_matrix
+from sklearn.metrics import accuracy_score, precision_recall_fscore_support, confusion_matrix
 from sklearn.utils import class_weight
 import tensorflow as tf
 from tensorflow import keras
@@ -29,12 +30,18 @@ from scipy.signal import savgol_filter, butter, filtfilt
 from scipy.interpolate import interp1d
 from scipy.optimize import minimize
 import warnings
+import ensemble_training
+import feature_cache
+import hyperparameter_search
+import parallel_features
+import training_data
 warnings.filterwarnings('ignore')
 
 # High-precision gaze tracking constants
 SUB_PIXEL_REFINEMENT = True
 GAZE_SMOOTHING_WINDOW = 7
 VELOCITY_FILTER_CUTOFF = 0.1  # Hz for low-pass filter
+ENHANCED_FEATURES_VERSION = 'enhanced-2'  # Feature cache key; bump when extract_enhanced_features changes
 
 class HighPrecisionGazeTracker:
     """Enhanced gaze tracker with sub-pixel precision and advanced filtering"""
@@ -209,6 +216,9 @@ class EnhancedAutismScreeningSystem:
         # Machine learning components
         self.scaler = StandardScaler()
         self.feature_names = []
+        self.feature_cache_dir = feature_cache.CACHE_DIR  # None: always re-extract training features
+        self.training_workers = None  # Cores for training the ensemble members (None: all cores)
+        self.training_report = None  # Per-member timing, memory and AUC of the last training run
         self.models = {}
         self.ensemble_weights = {}
         
@@ -447,11 +457,11 @@ class EnhancedAutismScreeningSystem:
     def extract_enhanced_features(self, data: pd.DataFrame) -> Dict[str, float]:
         """Extract comprehensive features with enhanced precision"""
         features = {}
+        # data is a DataFrame or per-subject column views (training_data.SubjectTable.subject)
+        gaze_x, gaze_y, timestamps = (np.asarray(data[name], dtype=np.float64) for name in ('x', 'y', 'timestamp'))
         
-        if len(data) < 10:
+        if len(gaze_x) < 10:
             return features
-            
-        gaze_x, gaze_y, timestamps = data['x'].values, data['y'].values, data['timestamp'].values
         
         # Enhanced velocity calculation with smoothing
         dx = np.diff(gaze_x)
@@ -651,8 +661,52 @@ class EnhancedAutismScreeningSystem:
         
         return features
     
-    def train_enhanced_models(self):
-        """Train ensemble of models with enhanced features"""
+    def feature_extractor(self) -> 'EnhancedAutismScreeningSystem':
+        """Copy holding only what feature extraction needs (no tracker or models), cheap to send to worker processes"""
+        extractor = EnhancedAutismScreeningSystem.__new__(EnhancedAutismScreeningSystem)
+        extractor.screen_width = self.screen_width
+        extractor.screen_height = self.screen_height
+        return extractor
+
+    def load_and_preprocess_data(self, workers: Optional[int] = None) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Load the training CSV and extract enhanced features per subject, spread across worker processes"""
+        print(f"Loading data from: {self.csv_path}")
+        try:
+            params = dict(training_data.basic_features_params(), screen_width=self.screen_width, screen_height=self.screen_height)
+            X, y, feature_names, hit = feature_cache.cached_features(
+                self.csv_path, ENHANCED_FEATURES_VERSION, params,
+                lambda: self._extract_training_features(workers), cache_dir=self.feature_cache_dir)
+            if not len(X):
+                return None, None
+            self.feature_names = list(feature_names)
+            print(f"{'Loaded cached' if hit else 'Extracted'} enhanced features for {len(X)} subjects")
+            return X, y
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            return None, None
+
+    def _extract_training_features(self, workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        # Streamed in chunks of whole subjects (bounded memory), extracted across worker processes
+        tables = training_data.iter_subject_tables(self.csv_path)
+        extractor = self.feature_extractor()
+        read, first = [], None
+        for table in tables:
+            read.append(table)
+            eligible = np.flatnonzero(table.lengths >= training_data.MIN_SAMPLES)
+            if len(eligible):
+                first = table.subject(eligible[0])
+                break
+        if first is None:
+            return np.empty((0, 0)), np.empty(0), []
+        # Feature names (and their order) from the first subject
+        feature_names = list(extractor.extract_enhanced_features(first).keys())
+        X, y, _ = parallel_features.stream_features(
+            itertools.chain(read, tables), parallel_features.SubjectFeatures(extractor.extract_enhanced_features, feature_names),
+            workers=workers, min_rows_per_worker=20_000)
+        return X, y, feature_names
+
+    def train_enhanced_models(self, search: bool = False):
+        """Train ensemble of models with enhanced features; with search, their settings are tuned first"""
         print("Training enhanced autism screening models...")
         
         # Load and preprocess data
@@ -685,17 +739,26 @@ class EnhancedAutismScreeningSystem:
             )
         }
         
-        # Train models
-        for name, model in models.items():
-            print(f"Training {name}...")
-            model.fit(X_train_scaled, y_train)
-            self.models[name] = model
-            
-            # Calculate model weight based on performance
-            y_pred = model.predict_proba(X_test_scaled)[:, 1]
-            auc_score = roc_auc_score(y_test, y_pred)
-            self.ensemble_weights[name] = auc_score
-            print(f"{name} AUC: {auc_score:.4f}")
+        search_report = None
+        if search:
+            print("Tuning hyperparameters (successive halving)...")
+            spaces = hyperparameter_search.search_spaces()
+            models, search_report = hyperparameter_search.search_members(
+                {name: (model, spaces[name]) for name, model in models.items()},
+                X_train_scaled, y_train, n_jobs=self.training_workers or -1)
+        
+        # Train models concurrently, each in its own worker process; spare cores go to the forest
+        print(f"Training {', '.join(models)}...")
+        members = [ensemble_training.Member(name, model, parallel=(name == 'RandomForest'), prefit=search) for name, model in models.items()]
+        fitted, self.training_report = ensemble_training.train_members(
+            members, X_train_scaled, y_train, X_test_scaled, y_test, workers=self.training_workers)
+        ensemble_training.print_report(self.training_report)
+        if search_report is not None:
+            self.training_report['search'] = search_report
+        for name in models:
+            self.models[name] = fitted[name]
+            # Model weight based on held-out performance
+            self.ensemble_weights[name] = self.training_report['members'][name]['auc']
         
         # Normalize weights
         total_weight = sum(self.ensemble_weights.values())
@@ -1,159 +1,418 @@
+from __future__ import annotations
 import os
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2' # Silences TensorFlow startup messages
+import sys
 import json
 import time
 import pathlib
 import argparse
+import queue
+import threading
+import uuid
 from collections import deque
+from contextlib import contextmanager
+from types import MappingProxyType
 from typing import Dict, Any, List, Tuple, Optional
 import numpy as np
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.svm import SVC
-from sklearn.calibration import CalibratedClassifierCV
-from sklearn.metrics import roc_auc_score
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras import layers # type: ignore
-import cv2
-import mediapipe as mp
 import warnings
-import joblib
-import matplotlib.pyplot as plt
-import seaborn as sns
+from lazy_import import LazyModule
+import pipeline_metrics
+from capture_pipeline import END, CaptureThread, StageQueue
+from screen_compositor import ScreenCompositor
+from face_roi import FaceRoiTracker
+from adaptive_rate import AdaptiveRateController, GazeKalman
+from stimulus import DEFAULT_SCRIPT, StimulusTrajectory, pursuit_error
+from session_buffer import FLAG_INTERPOLATED, GazeBuffer
+from feature_accumulator import OnlineFeatureAccumulator
+from gaze_events import EventStream, classify_events, count_events
+import ensemble_training
+import feature_cache
+import hyperparameter_search
+import parallel_features
+import training_data
+from training_data import BASIC_FEATURES
+from pipeline_metrics import observe_stage, stage_timer
+
+# Heavy dependencies are imported on first use so the API server starts in well under a second
+pd = LazyModule('pandas')
+keras = LazyModule('tensorflow.keras', on_load=lambda _: sys.modules['tensorflow'].get_logger().setLevel('ERROR'))
+layers = LazyModule('tensorflow.keras.layers')
+cv2 = LazyModule('cv2')
+mp = LazyModule('mediapipe')
+joblib = LazyModule('joblib')
+plt = LazyModule('matplotlib.pyplot')
+sns = LazyModule('seaborn')
 
 warnings.filterwarnings('ignore')
-tf.get_logger().setLevel('ERROR')
 
 SCRIPT_DIR = pathlib.Path(__file__).parent.resolve()
 
+# Matplotlib's pyplot state machine is global, so concurrent sessions take turns drawing reports
+_PLOT_LOCK = threading.Lock()
+
+_ACTIVATIONS = {'relu': lambda z: np.maximum(z, 0), 'sigmoid': lambda z: 1 / (1 + np.exp(-z)), 'linear': lambda z: z}
+
+def _dense_layers(model) -> Optional[Tuple[Tuple[np.ndarray, np.ndarray, str], ...]]:
+    """(kernel, bias, activation) per layer if the model is a plain stack of Dense layers, else None."""
+    stack = []
+    for layer in model.layers:
+        activation = layer.get_config().get('activation')
+        if type(layer).__name__ != 'Dense' or activation not in _ACTIVATIONS: return None
+        weights = layer.get_weights()
+        kernel = np.asarray(weights[0], dtype=np.float32)
+        bias = np.asarray(weights[1], dtype=np.float32) if len(weights) > 1 else np.zeros(kernel.shape[1], dtype=np.float32)
+        kernel.setflags(write=False); bias.setflags(write=False)
+        stack.append((kernel, bias, activation))
+    return tuple(stack)
+
+class ModelBundle:
+    """Read-only set of trained models, shared by every screening session in the process"""
+    def __init__(self, scaler, feature_names, ml_models: Dict[str, Dict[str, Any]], dl_models: Dict[str, Dict[str, Any]], ensemble_model, source: Optional[pathlib.Path] = None, version: Optional[str] = None, training_report: Optional[Dict[str, Any]] = None):
+        self.version = version
+        self.training_report = training_report # Per-member timing/memory/AUC from ensemble_training, if known
+        self.scaler = scaler
+        self.feature_names = tuple(feature_names)
+        self.ml_models = MappingProxyType(dict(ml_models))
+        self.dl_models = MappingProxyType(dict(dl_models))
+        self.ensemble_model = ensemble_model
+        self.source = source
+        # The DNN is a small Dense stack: run it in NumPy so inference never touches TensorFlow.
+        # This keeps predictions fork-safe when workers share a bundle loaded before fork.
+        self._dnn_layers = _dense_layers(self.dl_models['DNN']['model'])
+
+    @classmethod
+    def load(cls, models_dir: pathlib.Path = SCRIPT_DIR / "autism_models", version: Optional[str] = None) -> Optional['ModelBundle']:
+        """Loads scaler, feature names, pickled ML models, the DNN and ensemble config from models_dir."""
+        p = pathlib.Path(models_dir)
+        if not p.exists(): return None
+        scaler = joblib.load(p / "scaler.pkl"); feature_names = joblib.load(p / "feature_names.pkl")
+        ml_models = {}
+        for f in sorted(p.glob("*.pkl")):
+            if f.stem not in ["scaler", "feature_names"]: ml_models[f.stem] = {'model': joblib.load(f)}
+        dl_models = {'DNN': {'model': keras.models.load_model(p / "DNN.keras")}}
+        with open(p / "ensemble.json", 'r') as f: ensemble_model = json.load(f)
+        training_report = None
+        if (p / ensemble_training.REPORT_FILE).exists():
+            with open(p / ensemble_training.REPORT_FILE, 'r') as f: training_report = json.load(f)
+        return cls(scaler, feature_names, ml_models, dl_models, ensemble_model, source=p, version=version, training_report=training_report)
+
+    def save(self, models_dir: pathlib.Path = SCRIPT_DIR / "autism_models"):
+        p = pathlib.Path(models_dir); p.mkdir(exist_ok=True)
+        joblib.dump(self.scaler, p / "scaler.pkl"); joblib.dump(list(self.feature_names), p / "feature_names.pkl")
+        for name, data in self.ml_models.items(): joblib.dump(data['model'], p / f"{name}.pkl")
+        self.dl_models['DNN']['model'].save(p / "DNN.keras")
+        with open(p / "ensemble.json", 'w') as f: json.dump(self.ensemble_model, f)
+        if self.training_report is not None:
+            with open(p / ensemble_training.REPORT_FILE, 'w') as f: json.dump(self.training_report, f, indent=2)
+
+    def feature_vector(self, features: Dict[str, float]) -> np.ndarray:
+        return np.array([features.get(name, 0) for name in self.feature_names]).reshape(1, -1)
+
+    def predict_model_probs(self, features: Dict[str, float]) -> Dict[str, float]:
+        """Runs every model in the bundle on one feature dict and returns the ASD probability per model."""
+        f_vector_s = self.scaler.transform(self.feature_vector(features))
+        model_probs = {}
+        for name, m_data in self.ml_models.items(): model_probs[name] = m_data['model'].predict_proba(f_vector_s)[0, 1]
+        model_probs['DNN'] = self.predict_dnn(f_vector_s)
+        return model_probs
+
+    def predict_dnn(self, f_vector_s: np.ndarray) -> float:
+        if self._dnn_layers is None: return self.dl_models['DNN']['model'].predict(f_vector_s, verbose=0)[0, 0]
+        a = f_vector_s.astype(np.float32)
+        for kernel, bias, activation in self._dnn_layers: a = _ACTIVATIONS[activation](a @ kernel + bias)
+        return a[0, 0]
+
+def _fit_dnn(X: np.ndarray, y: np.ndarray):
+    dl_model = keras.Sequential([layers.Dense(64, activation='relu', input_shape=(X.shape[1],)), layers.Dense(1, activation='sigmoid')])
+    dl_model.compile(optimizer='adam', loss='binary_crossentropy')
+    dl_model.fit(X, y, epochs=20, verbose=0)
+    return dl_model
+
+def _predict_dnn(model, X: np.ndarray) -> np.ndarray:
+    return model.predict(X, verbose=0)
+
+class FaceMeshPool:
+    """Pool of reusable MediaPipe FaceMesh instances, created lazily up to `size`."""
+    def __init__(self, size: int = 1, **face_mesh_kwargs):
+        self.size = max(1, size)
+        self.face_mesh_kwargs = face_mesh_kwargs or dict(
+            max_num_faces=1, refine_landmarks=True,
+            min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """Borrows a FaceMesh for the duration of the with-block, blocking while all are in use."""
+        face_mesh = None
+        with self._lock:
+            if self._idle.empty() and self._created < self.size:
+                self._created += 1
+                face_mesh = mp.solutions.face_mesh.FaceMesh(**self.face_mesh_kwargs)
+        if face_mesh is None:
+            try: face_mesh = self._idle.get(timeout=timeout)
+            except queue.Empty: raise TimeoutError("No FaceMesh instance available")
+        try:
+            yield face_mesh
+        finally:
+            self._idle.put(face_mesh)
+
+class ScreeningSession:
+    """Per-session gaze tracking state: calibration, smoothing, samples and fixation/saccade counters."""
+    GAZE_SENSITIVITY = 0.9 # ** You can adjust this sensitivity value for your setup **
+    SMOOTHING_FACTOR = 0.8 # Higher value = more smoothing (e.g., 0.0 to 0.95)
+    VELOCITY_THRESHOLD = 2000
+    FIXATION_DURATION_THRESHOLD = 0.15
+    FIXATION_RADIUS_THRESHOLD = 50
+
+    def __init__(self, screen_width: int = 1920, screen_height: int = 1080, session_id: Optional[str] = None, visual_report_path: Optional[pathlib.Path] = None, bundle: Optional[ModelBundle] = None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.bundle = bundle # Model bundle pinned at session start, so a hot-swap never changes models mid-session
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.visual_report_path = pathlib.Path(visual_report_path) if visual_report_path else SCRIPT_DIR / "Screening_Report.png"
+        self.is_calibrated = False
+        self.calibrated_gaze_offset = np.array([0.0, 0.0])
+        self.gaze_path = deque(maxlen=150)
+        self.current_session_data = GazeBuffer() # Columnar samples; read them through zero-copy column views
+        self.feature_accumulator = OnlineFeatureAccumulator(screen_width, screen_height) # Session features, updated per sample
+        self.stimulus: Optional[StimulusTrajectory] = None # Set for sessions that show the ball; samples are tagged with its position
+        # Live counts may trail the newest sample by under one chunk; features() flushes them
+        self.events = EventStream(chunk_size=16, velocity_threshold=self.VELOCITY_THRESHOLD, min_duration=self.FIXATION_DURATION_THRESHOLD, max_radius=self.FIXATION_RADIUS_THRESHOLD)
+        self.reset()
+
+    def reset(self):
+        self.current_session_data.clear(); self.gaze_path.clear(); self.feature_accumulator.reset()
+        self.events.reset()
+        self.session_start_time = time.time()
+        self.last_gaze_time = None
+        self.last_smoothed_gaze = np.array([self.screen_width / 2, self.screen_height / 2])
+
+    def calibrate(self, offset: Optional[np.ndarray]) -> bool:
+        if offset is None: return False
+        self.calibrated_gaze_offset = offset; self.is_calibrated = True
+        return True
+
+    def map_gaze(self, offset: np.ndarray, timestamp: float) -> Dict[str, Any]:
+        """Maps a pupil offset to smoothed, clamped screen coordinates relative to the calibrated center."""
+        # Calculate gaze deviation from calibrated center
+        gaze_deviation = offset - self.calibrated_gaze_offset
+
+        # Map deviation to screen coordinates (raw calculation)
+        raw_screen_x = self.screen_width / 2 - gaze_deviation[0] * self.screen_width * self.GAZE_SENSITIVITY
+        raw_screen_y = self.screen_height / 2 + gaze_deviation[1] * self.screen_height * self.GAZE_SENSITIVITY
+        # Apply smoothing
+        smoothed_x = (self.last_smoothed_gaze[0] * self.SMOOTHING_FACTOR) + (raw_screen_x * (1 - self.SMOOTHING_FACTOR))
+        smoothed_y = (self.last_smoothed_gaze[1] * self.SMOOTHING_FACTOR) + (raw_screen_y * (1 - self.SMOOTHING_FACTOR))
+
+        # Update the last smoothed gaze point for the next frame
+        self.last_smoothed_gaze = np.array([smoothed_x, smoothed_y])
+
+        # Clamp final coordinates to stay within screen bounds
+        screen_x = np.clip(smoothed_x, 0, self.screen_width)
+        screen_y = np.clip(smoothed_y, 0, self.screen_height)
+        return {'x': screen_x, 'y': screen_y, 'timestamp': timestamp, 'interpolated': False}
+
+    def predicted_gaze(self, x: float, y: float, timestamp: float) -> Dict[str, Any]:
+        """Sample for a frame face mesh was skipped on, from a predicted screen point (flagged as interpolated)."""
+        return {'x': np.clip(x, 0, self.screen_width), 'y': np.clip(y, 0, self.screen_height), 'timestamp': timestamp, 'interpolated': True}
+
+    def add_sample(self, gaze_data: Dict[str, Any]):
+        target_x, target_y = self.stimulus.position(gaze_data['timestamp'] - self.session_start_time) if self.stimulus is not None else (np.nan, np.nan)
+        interpolated = bool(gaze_data.get('interpolated'))
+        self.current_session_data.append(gaze_data['x'], gaze_data['y'], gaze_data['timestamp'], target_x, target_y, FLAG_INTERPOLATED if interpolated else 0)
+        self.gaze_path.append((int(gaze_data['x']), int(gaze_data['y'])))
+        # Predicted samples only fill the trace: they are smoothed, so counting them would lower the velocity under load
+        if interpolated: return
+        self.update_gaze_metrics(gaze_data)
+        self.feature_accumulator.update(gaze_data['x'], gaze_data['y'], gaze_data['timestamp'])
+
+    @property
+    def measured_samples(self) -> int:
+        """Samples with a face mesh measurement (interpolated ones excluded); the minimum-sample check uses this."""
+        return self.feature_accumulator.count
+
+    def update_gaze_metrics(self, gaze_data: Dict[str, Any]):
+        # Fixations/saccades are classified in small vectorized chunks (see gaze_events.py)
+        self.events.push(gaze_data['x'], gaze_data['y'], gaze_data['timestamp'])
+        self.last_gaze_time = gaze_data['timestamp']
+
+    @property
+    def fixations(self) -> int:
+        return self.events.fixations
+
+    @property
+    def saccades(self) -> int:
+        return self.events.saccades
+
+    def event_segments(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """Fixation and saccade segments (durations, centroids) over the whole session; see gaze_events.classify_events."""
+        measured = ~self.current_session_data.interpolated
+        return classify_events(self.current_session_data.x[measured], self.current_session_data.y[measured], self.current_session_data.timestamp[measured],
+                               self.VELOCITY_THRESHOLD, self.FIXATION_DURATION_THRESHOLD, self.FIXATION_RADIUS_THRESHOLD)
+
+    def pursuit_metrics(self) -> Optional[Dict[str, float]]:
+        """Gaze-versus-stimulus error over the session (see stimulus.pursuit_error), or None without a stimulus."""
+        if self.stimulus is None or not self.current_session_data: return None
+        data = self.current_session_data.columns()
+        measured = ~self.current_session_data.interpolated
+        return pursuit_error(data['x'][measured], data['y'][measured], data['target_x'][measured], data['target_y'][measured])
+
+    def features(self) -> Dict[str, float]:
+        """Session features so far, including the fixation/saccade counts; O(1), cheap enough to call mid-session."""
+        self.events.flush()
+        return self.feature_accumulator.features(fixations=self.fixations, saccades=self.saccades)
+
+    @property
+    def fix_sacc_ratio(self) -> float:
+        return self.fixations / self.saccades if self.saccades > 0 else self.fixations * 1000.0
+
 class AutismScreeningSystem:
-    def __init__(self, csv_path: str):
+    VIGOROUS_THRESHOLD = 1000
+
+    def __init__(self, csv_path: str, bundle: Optional[ModelBundle] = None, face_mesh_pool: Optional[FaceMeshPool] = None, registry=None):
         self.csv_path = csv_path
         self.screen_width = 1920
         self.screen_height = 1080
-        self.scaler = StandardScaler()
+        # Training-time state; screening only reads the immutable bundle
+        self.scaler = None
         self.feature_names = []
         self.ml_models = {}
         self.dl_models = {}
         self.ensemble_model = None
-        self.is_trained = False
-        
-        # --- Real-time analysis attributes ---
-        self.current_session_data = []
-        self.gaze_path = deque(maxlen=150)
-        self.fixations = 0
-        self.saccades = 0
-        self.session_start_time = None
-        self.last_gaze_point = None
-        self.last_gaze_time = None
-        self.fixation_start_time = None
-        self.fixation_start_pos = None
-        self.is_in_fixation = False
-        self.counted_fixation = False
-        # --- NEW: Gaze tracking attributes ---
-        self.is_calibrated = False
-        self.calibrated_gaze_offset = np.array([0.0, 0.0])
-        # ** You can adjust this sensitivity value for your setup **
-        self.GAZE_SENSITIVITY = 0.9 
-        self.SMOOTHING_FACTOR = 0.8 # Higher value = more smoothing (e.g., 0.0 to 0.95)
-        self.last_smoothed_gaze = np.array([self.screen_width / 2, self.screen_height / 2])
-        
-        self.VELOCITY_THRESHOLD = 2000
-        self.FIXATION_DURATION_THRESHOLD = 0.15
-        self.FIXATION_RADIUS_THRESHOLD = 50
-        self.VIGOROUS_THRESHOLD = 1000
-
-        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
-            max_num_faces=1, refine_landmarks=True,
-            min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        self._bundle = bundle
+        self.registry = registry # Optional ModelRegistry; when set, the active bundle comes from it
+        self.feature_workers = None # Processes for training feature extraction (None: all cores)
+        self.feature_cache_dir = feature_cache.CACHE_DIR # Extracted training features are reused from here (None: always extract)
+        self.training_workers = None # Cores for training the ensemble members (None: all cores)
+        self.training_report = None # Per-member timing, memory and AUC of the last training run
+        self.face_mesh_pool = face_mesh_pool or FaceMeshPool(size=1)
+        # Most recent session run through this system (for CLI/report use)
+        self.session = None
         print("Autism Screening System Initialized")
 
+    @property
+    def bundle(self) -> Optional[ModelBundle]:
+        if self.registry is not None: return self.registry.current()
+        return self._bundle
+
+    @bundle.setter
+    def bundle(self, bundle: Optional[ModelBundle]):
+        self._bundle = bundle
+
+    @property
+    def is_trained(self) -> bool:
+        return self.bundle is not None
+
+    def new_session(self, **kwargs) -> ScreeningSession:
+        kwargs.setdefault('bundle', self.bundle)
+        return ScreeningSession(self.screen_width, self.screen_height, **kwargs)
+
     def load_and_preprocess_data(self) -> tuple[np.ndarray, np.ndarray]:
-        # This function remains unchanged
         print(f" Loading data from: {self.csv_path}")
         try:
-            df = pd.read_csv(self.csv_path)
-            df['subject_id'] = df.index // 1000
-            features_list, labels_list = [], []
-            for subject_id in df['subject_id'].unique():
-                subject_data = df.loc[df['subject_id'] == subject_id].copy()
-                if len(subject_data) < 50: continue
-                subject_data.rename(columns={'Point of Regard Left X [px]': 'x', 'Point of Regard Left Y [px]': 'y', 'Group': 'label'}, inplace=True)
-                if 'timestamp' not in subject_data.columns: subject_data['timestamp'] = subject_data.index * (1/60)
-                features = self.extract_comprehensive_features(subject_data)
-                if features:
-                    features_list.append(list(features.values()))
-                    labels_list.append(subject_data['label'].iloc[0])
-            X, y = np.array(features_list), np.array(labels_list)
-            print(f"✅ Extracted features for {len(X)} subjects")
+            X, y, feature_names, hit = feature_cache.cached_features(
+                self.csv_path, training_data.BASIC_FEATURES_VERSION, training_data.basic_features_params(),
+                self._extract_training_features, cache_dir=self.feature_cache_dir)
+            self.feature_names = list(feature_names)
+            print(f"✅ {'Loaded cached' if hit else 'Extracted'} features for {len(X)} subjects")
             return X, y
         except Exception as e: print(f"❌ Error loading data: {e}"); return None, None
 
-    def extract_comprehensive_features(self, data: pd.DataFrame) -> Dict[str, float]:
-        # This function remains unchanged
+    def _extract_training_features(self) -> tuple[np.ndarray, np.ndarray, list]:
+        # The CSV is streamed in chunks of whole subjects; each chunk's features are computed in one
+        # vectorized pass, spread across worker processes (see training_data.py, parallel_features.py)
+        tables = training_data.iter_subject_tables(self.csv_path)
+        X, y, _ = parallel_features.stream_features(tables, training_data.basic_features, workers=self.feature_workers)
+        return X, y, list(BASIC_FEATURES)
+
+    def extract_comprehensive_features(self, data, fixations: Optional[int] = None, saccades: Optional[int] = None) -> Dict[str, float]:
+        # data is a DataFrame (training) or a session's column views (GazeBuffer.columns())
+        # Without counts from a live session, events are classified from the samples with the same rules
         features = {}
-        gaze_x, gaze_y, timestamps = data['x'].values, data['y'].values, data['timestamp'].values
+        gaze_x, gaze_y, timestamps = (np.asarray(data[name], dtype=np.float64) for name in ('x', 'y', 'timestamp'))
+        if fixations is None or saccades is None:
+            fixations, saccades = count_events(gaze_x, gaze_y, timestamps, ScreeningSession.VELOCITY_THRESHOLD, ScreeningSession.FIXATION_DURATION_THRESHOLD, ScreeningSession.FIXATION_RADIUS_THRESHOLD)
         dx, dy, dt = np.diff(gaze_x), np.diff(gaze_y), np.diff(timestamps)
         dt[dt == 0] = 1e-3
         velocity = np.sqrt(dx**2 + dy**2) / dt
         features['mean_x'], features['mean_y'] = np.mean(gaze_x), np.mean(gaze_y)
         features['std_x'], features['std_y'] = np.std(gaze_x), np.std(gaze_y)
         features['mean_velocity'] = np.mean(velocity)
-        features['fixation_count'] = self.fixations
-        features['saccade_count'] = self.saccades
-        if not self.feature_names or 'fixation_count' not in self.feature_names:
-            self.feature_names = list(features.keys())
-        return {name: features.get(name, 0) for name in self.feature_names}
+        features['fixation_count'] = fixations
+        features['saccade_count'] = saccades
+        return self.select_features(features)
+
+    def select_features(self, features: Dict[str, float]) -> Dict[str, float]:
+        """Orders features by the model's feature names, filling missing ones with 0."""
+        feature_names = self.bundle.feature_names if self.bundle is not None else self.feature_names
+        if not feature_names or 'fixation_count' not in feature_names:
+            feature_names = self.feature_names = list(BASIC_FEATURES)
+        return {name: features.get(name, 0) for name in feature_names}
     
-    # Functions train_all_models, create_ensemble_model, save_models, load_models remain unchanged...
-    def train_all_models(self):
+    def train_all_models(self, search: bool = False):
+        """Trains the ensemble; with search, RF and SVM settings are tuned first (hyperparameter_search.py)"""
         X, y = self.load_and_preprocess_data()
         if X is None or len(X) == 0: return False
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.svm import SVC
+        from sklearn.calibration import CalibratedClassifierCV
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+        self.scaler = StandardScaler()
         X_train_s = self.scaler.fit_transform(X_train)
         X_test_s = self.scaler.transform(X_test)
-        for name, model in {'RF': RandomForestClassifier(), 'SVM': SVC(probability=True)}.items():
-            cal_model = CalibratedClassifierCV(model, cv=3).fit(X_train_s, y_train)
-            self.ml_models[name] = {'model': cal_model}
-        dl_model = keras.Sequential([layers.Dense(64, activation='relu', input_shape=(X_train_s.shape[1],)), layers.Dense(1, activation='sigmoid')])
-        dl_model.compile(optimizer='adam', loss='binary_crossentropy')
-        dl_model.fit(X_train_s, y_train, epochs=20, verbose=0)
-        self.dl_models['DNN'] = {'model': dl_model}
+        estimators = {'RF': CalibratedClassifierCV(RandomForestClassifier(), cv=3), 'SVM': CalibratedClassifierCV(SVC(probability=True), cv=3)}
+        search_report = None
+        if search:
+            print(" Tuning hyperparameters (successive halving)...")
+            spaces = hyperparameter_search.search_spaces()
+            estimators, search_report = hyperparameter_search.search_members(
+                {name: (est, hyperparameter_search.prefixed(spaces['RandomForest' if name == 'RF' else name], 'estimator__')) for name, est in estimators.items()},
+                X_train_s, y_train, n_jobs=self.training_workers or -1)
+        # Members train concurrently: the calibrated RF/SVM in worker processes, the DNN on a thread here
+        members = [
+            ensemble_training.Member('RF', estimators['RF'], parallel=True, prefit=search),
+            ensemble_training.Member('SVM', estimators['SVM'], prefit=search),
+            ensemble_training.Member('DNN', fit=_fit_dnn, predict=_predict_dnn, in_process=True),
+        ]
+        models, self.training_report = ensemble_training.train_members(members, X_train_s, y_train, X_test_s, y_test, workers=self.training_workers)
+        if search_report is not None: self.training_report['search'] = search_report
+        ensemble_training.print_report(self.training_report)
+        self.ml_models = {name: {'model': models[name]} for name in ('RF', 'SVM')}
+        self.dl_models['DNN'] = {'model': models['DNN']}
         self.create_ensemble_model(X_test_s, y_test)
+        self.bundle = ModelBundle(self.scaler, self.feature_names, self.ml_models, self.dl_models, self.ensemble_model, training_report=self.training_report)
         self.save_models()
-        self.is_trained = True; return True
+        if self.registry is not None: self.registry.refresh(force=True)
+        return True
 
     def create_ensemble_model(self, X_test, y_test):
+        from sklearn.metrics import roc_auc_score
         preds = [m['model'].predict_proba(X_test)[:, 1] for m in self.ml_models.values()]
         preds.append(self.dl_models['DNN']['model'].predict(X_test, verbose=0).flatten())
         self.ensemble_model = {'type': 'average'}
         final_preds = np.mean(preds, axis=0)
-        print(f" Ensemble AUC: {roc_auc_score(y_test, final_preds):.3f}")
+        auc = roc_auc_score(y_test, final_preds)
+        if self.training_report is not None: self.training_report['ensemble_auc'] = float(auc)
+        print(f" Ensemble AUC: {auc:.3f}")
 
     def save_models(self):
-        p = SCRIPT_DIR / "autism_models"; p.mkdir(exist_ok=True)
-        joblib.dump(self.scaler, p / "scaler.pkl"); joblib.dump(self.feature_names, p / "feature_names.pkl")
-        for name, data in self.ml_models.items(): joblib.dump(data['model'], p / f"{name}.pkl")
-        self.dl_models['DNN']['model'].save(p / "DNN.keras")
-        with open(p / "ensemble.json", 'w') as f: json.dump(self.ensemble_model, f)
+        self._bundle.save(SCRIPT_DIR / "autism_models")
         print(" Models saved successfully!")
 
     def load_models(self):
-        p = SCRIPT_DIR / "autism_models";
-        if not p.exists(): return False
         try:
-            self.scaler = joblib.load(p / "scaler.pkl"); self.feature_names = joblib.load(p / "feature_names.pkl")
-            for f in p.glob("*.pkl"):
-                if f.stem not in ["scaler", "feature_names"]: self.ml_models[f.stem] = {'model': joblib.load(f)}
-            self.dl_models['DNN'] = {'model': keras.models.load_model(p / "DNN.keras")}
-            with open(p / "ensemble.json", 'r') as f: self.ensemble_model = json.load(f)
-            self.is_trained = True; print("✅ Models loaded successfully!"); return True
+            bundle = self.registry.current() if self.registry is not None else ModelBundle.load(SCRIPT_DIR / "autism_models")
+            if bundle is None: return False
+            self.bundle = bundle; self.feature_names = list(bundle.feature_names)
+            print("✅ Models loaded successfully!"); return True
         except Exception as e: print(f"❌ Error loading models: {e}"); return False
 
-    def _get_eye_offset(self, landmarks: Any) -> Optional[np.ndarray]:
+    @staticmethod
+    def _get_eye_offset(landmarks: Any) -> Optional[np.ndarray]:
         """Calculates the normalized offset of the pupil from the eye center."""
         try:
             # Using right eye landmarks for calculation
@@ -170,39 +429,20 @@ class AutismScreeningSystem:
         except Exception:
             return None
 
-    def _reset_session_state(self):
-        # This function remains unchanged
-        self.current_session_data = []; self.gaze_path.clear()
-        self.fixations = 0; self.saccades = 0
-        self.session_start_time = time.time()
-        self.last_gaze_point = None; self.last_gaze_time = None
-        self.is_in_fixation = False; self.fixation_start_time = None
-        self.fixation_start_pos = None; self.counted_fixation = False
-
-    def _update_gaze_metrics(self, gaze_data: Dict[str, Any]):
-        # This function remains unchanged
-        current_time = gaze_data['timestamp']; current_point = np.array([gaze_data['x'], gaze_data['y']])
-        if self.last_gaze_point is not None:
-            dt = current_time - self.last_gaze_time
-            if dt > 0:
-                dist = np.linalg.norm(current_point - self.last_gaze_point); velocity = dist / dt
-                if velocity < self.VELOCITY_THRESHOLD:
-                    if not self.is_in_fixation:
-                        self.is_in_fixation = True; self.fixation_start_time = current_time
-                        self.fixation_start_pos = current_point; self.counted_fixation = False
-                    elif not self.counted_fixation:
-                        fix_dist = np.linalg.norm(current_point - self.fixation_start_pos)
-                        fix_dur = current_time - self.fixation_start_time
-                        if fix_dur > self.FIXATION_DURATION_THRESHOLD and fix_dist < self.FIXATION_RADIUS_THRESHOLD:
-                            self.fixations += 1; self.counted_fixation = True
-                else: 
-                    if self.is_in_fixation:
-                        self.saccades += 1; self.is_in_fixation = False; self.fixation_start_time = None
-        self.last_gaze_point = current_point; self.last_gaze_time = current_time
-
-    def run_live_screening(self, video_path=None, display=True, max_duration=60):
+    def run_live_screening(self, video_path=None, display=True, max_duration=60, session: Optional[ScreeningSession] = None, visual_report: bool = True, frame_stride: int = 1, stimulus: str = DEFAULT_SCRIPT):
+        """
+        Runs a screening session on the webcam or a video file and returns the final prediction.
+        With display=False nothing is drawn and video files are processed as fast as the CPU allows,
+        timed by the video's own timeline; frame_stride=N keeps only every Nth frame.
+        stimulus names the ball trajectory script (see stimulus.SCRIPTS); it is only used with display,
+        since headless runs show no ball, and their results carry stimulus None.
+        """
         print(f"🔴STARTING LIVE SCREENING (Duration: {max_duration} seconds)")
         if not self.is_trained: print("Models not trained."); return
+        session = session or self.new_session()
+        self.session = session
+        # Only a displayed session shows the ball; headless samples get no target and no pursuit metrics
+        session.stimulus = StimulusTrajectory(stimulus, self.screen_width, self.screen_height, duration=max_duration, radius=40) if display else None
 
         if video_path:
             cam = cv2.VideoCapture(video_path)
@@ -211,13 +451,24 @@ class AutismScreeningSystem:
             cam = cv2.VideoCapture(0)
             if not cam.isOpened(): print("❌CRITICAL ERROR: Cannot access webcam."); return
 
+        pipeline_metrics.SESSIONS_IN_FLIGHT.inc(source='capture')
+        try:
+            with self.face_mesh_pool.acquire() as face_mesh:
+                return self._run_session(cam, face_mesh, session, video_path, display, max_duration, visual_report, frame_stride)
+        finally:
+            # Also when the session raised; releasing twice is harmless
+            cam.release()
+            if display: cv2.destroyAllWindows()
+            pipeline_metrics.SESSIONS_IN_FLIGHT.dec(source='capture')
+
+    def _run_session(self, cam, face_mesh, session: ScreeningSession, video_path, display, max_duration, visual_report=True, frame_stride=1):
         if display:
             cv2.namedWindow('Autism Screening', cv2.WND_PROP_FULLSCREEN)
             cv2.setWindowProperty('Autism Screening', cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
 
         # --- Calibration Phase ---
         if display:
-            while not self.is_calibrated:
+            while not session.is_calibrated:
                 ret, frame = cam.read()
                 if not ret: break
 
@@ -229,13 +480,10 @@ class AutismScreeningSystem:
 
                 key = cv2.waitKey(1) & 0xFF
                 if key == ord('c'):
-                    results = self.face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                    results = face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
                     if results.multi_face_landmarks:
                         landmarks = results.multi_face_landmarks[0].landmark
-                        offset = self._get_eye_offset(landmarks)
-                        if offset is not None:
-                            self.calibrated_gaze_offset = offset
-                            self.is_calibrated = True
+                        if session.calibrate(self._get_eye_offset(landmarks)):
                             print("✅ Calibration successful!")
                         else:
                             print("❌ Calibration failed. Please try again.")
@@ -243,131 +491,165 @@ class AutismScreeningSystem:
                     cam.release(); cv2.destroyAllWindows(); return
         else:
             # For headless operation, skip calibration and use default offset
-            self.is_calibrated = True
-            self.calibrated_gaze_offset = np.array([0.0, 0.0])
+            session.calibrate(np.array([0.0, 0.0]))
             print("✅ Skipping calibration for headless operation")
         
         # --- Main Screening Phase ---
-        ball_pos = np.array([self.screen_width / 2, self.screen_height / 2], dtype=float)
-        ball_vel = np.array([7, 5], dtype=float); ball_radius = 40
-        self._reset_session_state()
+        # The ball follows the precomputed stimulus by session time, not by loop iterations
+        session.reset()
 
         # Get video properties
         fps = cam.get(cv2.CAP_PROP_FPS) if video_path else 30
-        frame_time = 1 / fps if fps > 0 else 1/30
+
+        # Capture -> inference -> render stages joined by bounded queues (see capture_pipeline.py).
+        # Live frames are dropped when inference falls behind; video frames never are.
+        stop = threading.Event()
+        frames_q = StageQueue(maxsize=4 if video_path else 2, drop_oldest=not video_path)
+        progress = {'frames': 0, 'error': None}
+        # Video frames carry the video's own timeline. Headless runs process them faster than real time;
+        # displayed runs play at the video's speed so the ball (drawn by wall-clock time) matches the samples
+        capture = CaptureThread(cam, frames_q, stop, stride=frame_stride, timeline_start=session.session_start_time if video_path else None, fps=fps, realtime=display)
+        # Live camera only: under CPU pressure face mesh runs on every Nth frame and the rest are predicted.
+        # Videos are never throttled; they just take longer.
+        rate = None if video_path else AdaptiveRateController(1.0 / (fps or 30))
+
+        if not display:
+            # Headless fast path: no canvas, inset, text or pacing - only what the gaze metrics need
+            capture.start()
+            try:
+                self._inference_stage(face_mesh, session, frames_q, None, stop, max_duration, progress, rate)
+            finally:
+                stop.set(); frames_q.close()
+                capture.join()
+            return self._finish_session(cam, session, capture, progress, video_path, display, visual_report)
+
+        render_q = StageQueue(maxsize=1)
+        inference = threading.Thread(target=self._inference_stage, args=(face_mesh, session, frames_q, render_q, stop, max_duration, progress, rate), name='screening-inference', daemon=True)
+        # Cached background/trail layers; only the changed rectangles are redrawn each frame
+        compositor = ScreenCompositor(self.screen_width, self.screen_height)
+        capture.start(); inference.start()
 
         try:
             while True:
-                start_time = time.time()
-                ret_cam, cam_frame = cam.read()
-                if not ret_cam:
-                    if video_path:
-                        print("Video ended.")
-                    else:
-                        print("Webcam disconnected.")
-                    break
-                
-                display_frame = np.zeros((self.screen_height, self.screen_width, 3), dtype=np.uint8)
-                ball_pos += ball_vel
-                if ball_pos[0]<=ball_radius or ball_pos[0]>=self.screen_width-ball_radius: ball_vel[0]*=-1
-                if ball_pos[1]<=ball_radius or ball_pos[1]>=self.screen_height-ball_radius: ball_vel[1]*=-1
-                cv2.circle(display_frame, tuple(ball_pos.astype(int)), ball_radius, (255, 255, 255), -1)
-                
-                flipped_cam_frame = cv2.flip(cam_frame, 1)
-                results = self.face_mesh.process(cv2.cvtColor(cam_frame, cv2.COLOR_BGR2RGB))
-                gaze_data = None
-                
-                if results.multi_face_landmarks:
-                    landmarks = results.multi_face_landmarks[0].landmark
-                    current_offset = self._get_eye_offset(landmarks)
-                    
-                    if current_offset is not None:
-                        # Calculate gaze deviation from calibrated center
-                        gaze_deviation = current_offset - self.calibrated_gaze_offset
-                        
-                        # Map deviation to screen coordinates (raw calculation)
-                        raw_screen_x = self.screen_width / 2 - gaze_deviation[0] * self.screen_width * self.GAZE_SENSITIVITY
-                        raw_screen_y = self.screen_height / 2 + gaze_deviation[1] * self.screen_height * self.GAZE_SENSITIVITY
-                        # Apply smoothing
-                        smoothed_x = (self.last_smoothed_gaze[0] * self.SMOOTHING_FACTOR) + (raw_screen_x * (1 - self.SMOOTHING_FACTOR))
-                        smoothed_y = (self.last_smoothed_gaze[1] * self.SMOOTHING_FACTOR) + (raw_screen_y * (1 - self.SMOOTHING_FACTOR))
-
-                        # Update the last smoothed gaze point for the next frame
-                        self.last_smoothed_gaze = np.array([smoothed_x, smoothed_y])
-
-                        # Clamp final coordinates to stay within screen bounds
-                        screen_x = np.clip(smoothed_x, 0, self.screen_width)
-                        screen_y = np.clip(smoothed_y, 0, self.screen_height)
-
-                        gaze_data = {'x': screen_x, 'y': screen_y, 'timestamp': time.time()}
-
-                if gaze_data:
-                    self._update_gaze_metrics(gaze_data)
-                    self.current_session_data.append(gaze_data)
-                    self.gaze_path.append((int(gaze_data['x']), int(gaze_data['y'])))
-                    
-                    if len(self.gaze_path) > 2:
-                        path_points = np.array(self.gaze_path, dtype=np.int32).reshape((-1, 1, 2))
-                        cv2.polylines(display_frame, [path_points], isClosed=False, color=(0, 0, 255), thickness=3)
-                    
-                    overlay = display_frame.copy()
-                    cv2.circle(overlay, (int(gaze_data['x']), int(gaze_data['y'])), 20, (0, 255, 0), -1)
-                    display_frame = cv2.addWeighted(overlay, 0.6, display_frame, 0.4, 0)
-
-                # Eyecam display code remains the same...
-                facecam_w, facecam_h, margin = 320, 240, 20
-                eyecam_view = cv2.resize(flipped_cam_frame, (facecam_w, facecam_h))
-                if results.multi_face_landmarks:
-                    landmarks = results.multi_face_landmarks[0].landmark
-                    LEFT_EYE_CONTOUR = [33, 246, 161, 160, 159, 158, 157, 173, 133, 155, 154, 153, 145, 144, 163, 7]
-                    h, w, _ = flipped_cam_frame.shape
-                    eye_points = np.array([(landmarks[i].x*w, landmarks[i].y*h) for i in LEFT_EYE_CONTOUR], dtype=np.int32)
-                    x_min, y_min = np.min(eye_points, axis=0); x_max, y_max = np.max(eye_points, axis=0)
-                    padding = 25
-                    x_min, y_min = max(0, x_min-padding), max(0, y_min-padding)
-                    x_max, y_max = min(w, x_max+padding), min(h, y_max+padding)
-                    if x_max > x_min and y_max > y_min:
-                        eye_crop = flipped_cam_frame[y_min:y_max, x_min:x_max]
-                        # Add pink-purple markers to eye landmarks
-                        for point in eye_points:
-                            px = int(point[0] - x_min)
-                            py = int(point[1] - y_min)
-                            cv2.circle(eye_crop, (px, py), 3, (255, 0, 255), -1)
-                        eyecam_view = cv2.resize(eye_crop, (facecam_w, facecam_h))
-                roi_x1 = self.screen_width - facecam_w - margin; roi_y1 = margin
-                display_frame[roi_y1:(roi_y1+facecam_h), roi_x1:(roi_x1+facecam_w)] = eyecam_view
-
-                # Displaying metrics and exit text remains the same...
-                elapsed_time = time.time()-self.session_start_time
-                fix_sacc_ratio = self.fixations / self.saccades if self.saccades > 0 else self.fixations * 1000.0
-                metrics = [f"Time: {elapsed_time:.1f}s", f"Fixations: {self.fixations}", f"Saccades: {self.saccades}", f"Fix/Sacc Ratio: {fix_sacc_ratio:.2f}"]
-                for i, text in enumerate(metrics): cv2.putText(display_frame, text, (30, 60 + i * 45), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
-                exit_text = "Press Q to Exit"
-                text_size = cv2.getTextSize(exit_text, cv2.FONT_HERSHEY_SIMPLEX, 1, 2)[0]
-                cv2.putText(display_frame, exit_text, (self.screen_width-text_size[0]-20, self.screen_height-30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                
-                if display:
-                    cv2.imshow('Autism Screening', display_frame)
+                state = render_q.get(timeout=0.1)
+                if state is END: break
+                if state is None:
+                    # No new frame yet: keep the window responsive and the time limit enforced
                     if cv2.waitKey(1) & 0xFF == ord('q'): break
+                    if time.time()-session.session_start_time >= max_duration: break
+                    continue
+                cam_frame, landmarks, gaze_data, gaze_path, sample_count, (fixations, saccades, fix_sacc_ratio) = state
+
+                elapsed_time = time.time()-session.session_start_time
+                render_start = time.perf_counter()
+                compositor.begin_frame()
+                compositor.draw_trail(gaze_path, sample_count)
+                compositor.draw_ball(session.stimulus.position(elapsed_time), session.stimulus.radius)
+                if gaze_data:
+                    compositor.draw_gaze_dot(gaze_data['x'], gaze_data['y'])
+
+                compositor.draw_inset(self._eyecam_view(cam_frame, landmarks, compositor.INSET_SIZE))
 
-                # Wait to match video frame rate
-                elapsed_frame_time = time.time() - start_time
-                wait_time = max(1, int((frame_time - elapsed_frame_time) * 1000))
-                if not display:
-                    time.sleep(max(0, frame_time - elapsed_frame_time))
+                compositor.draw_metrics([f"Time: {elapsed_time:.1f}s", f"Fixations: {fixations}", f"Saccades: {saccades}", f"Fix/Sacc Ratio: {fix_sacc_ratio:.2f}"])
+                observe_stage('overlay', time.perf_counter() - render_start)
+                
+                cv2.imshow('Autism Screening', compositor.frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'): break
 
                 if elapsed_time >= max_duration: break
         finally:
-            cam.release()
-            if display:
-                cv2.destroyAllWindows()
-            if len(self.current_session_data) > 50:
-                return self.generate_final_prediction()
-            return None
+            stop.set(); frames_q.close(); render_q.close()
+            capture.join(); inference.join()
+        return self._finish_session(cam, session, capture, progress, video_path, display, visual_report)
+
+    def _finish_session(self, cam, session: ScreeningSession, capture: CaptureThread, progress: Dict[str, Any], video_path, display, visual_report):
+        if capture.ended:
+            print("Video ended." if video_path else "Webcam disconnected.")
+        cam.release()
+        if display:
+            cv2.destroyAllWindows()
+        pipeline_metrics.session_finished('capture', progress['frames'], time.time() - session.session_start_time)
+        if progress['error'] is not None: raise progress['error']
+        if session.measured_samples > 50:
+            return self.generate_final_prediction(session, visual_report=visual_report)
+        return None
+
+    @staticmethod
+    def _eyecam_view(cam_frame: np.ndarray, landmarks, size: Tuple[int, int]) -> np.ndarray:
+        """Mirrored close-up of the left eye with its landmarks marked, or the whole mirrored frame without a face."""
+        if landmarks is not None:
+            LEFT_EYE_CONTOUR = [33, 246, 161, 160, 159, 158, 157, 173, 133, 155, 154, 153, 145, 144, 163, 7]
+            h, w, _ = cam_frame.shape
+            # Work on the unmirrored frame and flip only the small eye crop
+            eye_points = np.array([(landmarks[i].x*w, landmarks[i].y*h) for i in LEFT_EYE_CONTOUR], dtype=np.int32)
+            x_min, y_min = np.min(eye_points, axis=0); x_max, y_max = np.max(eye_points, axis=0)
+            padding = 25
+            x_min, y_min = max(0, x_min-padding), max(0, y_min-padding)
+            x_max, y_max = min(w, x_max+padding), min(h, y_max+padding)
+            if x_max > x_min and y_max > y_min:
+                eye_crop = cam_frame[y_min:y_max, x_min:x_max].copy()
+                # Add pink-purple markers to eye landmarks
+                for point in eye_points:
+                    cv2.circle(eye_crop, (int(point[0] - x_min), int(point[1] - y_min)), 3, (255, 0, 255), -1)
+                return cv2.flip(cv2.resize(eye_crop, size), 1)
+        return cv2.flip(cv2.resize(cam_frame, size), 1)
+
+    def _inference_stage(self, face_mesh, session: ScreeningSession, frames_q: StageQueue, render_q: StageQueue, stop: threading.Event, max_duration, progress: Dict[str, Any], rate: Optional[AdaptiveRateController] = None):
+        """Face mesh and gaze mapping for each captured frame; runs on the pipeline's inference thread."""
+        roi_tracker = FaceRoiTracker()
+        kalman = GazeKalman()
+        landmarks = None
+        try:
+            while not stop.is_set():
+                item = frames_q.get(timeout=0.5)
+                if item is END: break
+                if item is None: continue
+                cam_frame, timestamp = item
+                if timestamp - session.session_start_time >= max_duration: break
+                progress['frames'] += 1
+                gaze_data = None
 
-    # Functions generate_final_prediction and generate_visual_report remain unchanged...
-    def generate_final_prediction(self):
-        df = pd.DataFrame(self.current_session_data); features = self.extract_comprehensive_features(df)
+                if rate is None or rate.should_run():
+                    frame_start = time.perf_counter()
+                    # Face mesh runs on a crop around the face found in the previous frame
+                    landmarks = roi_tracker.process(face_mesh, cam_frame)
+                    pipeline_metrics.FRAMES.inc(source='capture')
+                    with stage_timer('gaze_mapping'):
+                        if landmarks is not None:
+                            current_offset = self._get_eye_offset(landmarks)
+                            # Samples carry the capture time, not the time inference got round to them
+                            if current_offset is not None:
+                                gaze_data = session.map_gaze(current_offset, timestamp)
+                        if gaze_data:
+                            session.add_sample(gaze_data)
+                            kalman.update(gaze_data['x'], gaze_data['y'], timestamp)
+                    if not gaze_data:
+                        pipeline_metrics.FACE_LOST.inc(source='capture')
+                    if rate is not None:
+                        rate.observe(time.perf_counter() - frame_start)
+                        pipeline_metrics.FACE_MESH_STRIDE.set(rate.stride, source='capture')
+                else:
+                    # Skipped frame: predict the gaze from the recent measurements (the eyecam reuses the last landmarks)
+                    predicted = kalman.predict(timestamp)
+                    if predicted is not None:
+                        gaze_data = session.predicted_gaze(predicted[0], predicted[1], timestamp)
+                        session.add_sample(gaze_data)
+                        pipeline_metrics.GAZE_INTERPOLATED.inc(source='capture')
+
+                if render_q is not None: render_q.put((cam_frame, landmarks, gaze_data, tuple(session.gaze_path), len(session.current_session_data), (session.fixations, session.saccades, session.fix_sacc_ratio)))
+        except Exception as e:
+            progress['error'] = e
+        finally:
+            stop.set()
+            if render_q is not None: render_q.close()
+
+    def generate_final_prediction(self, session: Optional[ScreeningSession] = None, visual_report: bool = True):
+        # visual_report=False leaves the matplotlib report to the caller (see render_visual_report)
+        session = session or self.session
+        prediction_start = time.perf_counter()
+        data = session.current_session_data.columns()
+        # Accumulated while the session ran; no pass over the samples is needed here
+        features = self.select_features(session.features())
         if not features: return None
         is_vigorous = features.get('mean_velocity', 0) > self.VIGOROUS_THRESHOLD
         verdict = "Autistic Syndrome" if is_vigorous else "Not Autistic"
@@ -376,37 +658,51 @@ class AutismScreeningSystem:
         print(f"Final Verdict: {verdict}\nConfidence Score: {prob:.2%}")
         print("------------------------\n")
         # Compute model_probs for report visualization
-        f_vector = np.array([features.get(name, 0) for name in self.feature_names]).reshape(1, -1)
-        f_vector_s = self.scaler.transform(f_vector)
-        model_probs = {}
-        for name, m_data in self.ml_models.items(): model_probs[name] = m_data['model'].predict_proba(f_vector_s)[0, 1]
-        model_probs['DNN'] = self.dl_models['DNN']['model'].predict(f_vector_s, verbose=0)[0, 0]
-        self.generate_visual_report(df, model_probs, verdict)
-        return {'verdict': verdict, 'confidence': prob, 'model_probs': model_probs}
-
-    def generate_visual_report(self, df: pd.DataFrame, model_probs: Dict[str, float], verdict: str):
+        bundle = session.bundle or self.bundle
+        model_probs = bundle.predict_model_probs(features)
+        observe_stage('prediction', time.perf_counter() - prediction_start)
+        if visual_report: self.generate_visual_report(data, model_probs, verdict, session)
+        result = {'verdict': verdict, 'confidence': prob, 'model_probs': model_probs, 'model_version': bundle.version, 'visual_report_path': str(session.visual_report_path)}
+        pursuit = session.pursuit_metrics()
+        result['stimulus'] = {'script': session.stimulus.script, **pursuit} if pursuit is not None else None
+        return result
+
+    def render_visual_report(self, session: ScreeningSession, result: Dict[str, Any]):
+        """Draws the visual report for a session whose prediction was made with visual_report=False."""
+        self.generate_visual_report(session.current_session_data.columns(), result['model_probs'], result['verdict'], session)
+
+    def generate_visual_report(self, data: Dict[str, np.ndarray], model_probs: Dict[str, float], verdict: str, session: ScreeningSession):
+        with stage_timer('visual_report'):
+            self._draw_visual_report(data, model_probs, verdict, session)
+
+    def _draw_visual_report(self, data: Dict[str, np.ndarray], model_probs: Dict[str, float], verdict: str, session: ScreeningSession):
         print("Generating visual report...")
-        dx=np.diff(df['x'].values); dy=np.diff(df['y'].values); dt=np.diff(df['timestamp'].values)
+        x, y, t = data['x'], data['y'], data['timestamp']
+        dx=np.diff(x); dy=np.diff(y); dt=np.diff(t)
         dt[dt==0] = 1e-6; velocities = np.sqrt(dx**2 + dy**2) / dt
-        plt.style.use('dark_background'); fig = plt.figure(figsize=(18, 10))
-        fig.suptitle(f'Autism Screening Analysis - Final Verdict: {verdict}', fontsize=20, color='lightgray')
-        ax1=plt.subplot(2,3,1); ax1.plot(df['x'],df['y'],color='red',alpha=0.7); ax1.scatter(df['x'].iloc[0],df['y'].iloc[0],c='lime',s=100,label='Start'); ax1.scatter(df['x'].iloc[-1],df['y'].iloc[-1],c='cyan',s=100,label='End'); ax1.set_xlim(0,self.screen_width); ax1.set_ylim(self.screen_height,0); ax1.set_title('Gaze Scan Path',color='white'); ax1.set_aspect('equal',adjustable='box'); ax1.legend()
-        ax2=plt.subplot(2,3,2); ax2.plot(df['timestamp'].iloc[1:]-df['timestamp'].iloc[0],velocities,color='orange'); ax2.axhline(y=self.VELOCITY_THRESHOLD,color='cyan',linestyle='--',label=f'Saccade Threshold ({self.VELOCITY_THRESHOLD} px/s)'); ax2.set_title('Gaze Velocity Over Time',color='white'); ax2.set_xlabel('Time (s)'); ax2.set_ylabel('Velocity (pixels/sec)'); ax2.legend()
-        ax3=plt.subplot(2,3,3); events=['Fixations','Saccades']; counts=[self.fixations,self.saccades]; ax3.bar(events,counts,color=['green','red']); ax3.set_title('Fixation & Saccade Event Counts',color='white'); ax3.set_ylabel('Total Count')
-        ax4=plt.subplot(2,3,4); sns.kdeplot(x=df['x'],y=df['y'],cmap="rocket",fill=True,thresh=0.05,ax=ax4); ax4.set_xlim(0,self.screen_width); ax4.set_ylim(self.screen_height,0); ax4.set_title('Gaze Point Heatmap',color='white'); ax4.set_aspect('equal',adjustable='box')
-        ax5=plt.subplot(2,3,5); models=list(model_probs.keys()); probs=list(model_probs.values()); ax5.bar(models,probs,color='lightblue'); ax5.axhline(y=0.65,color='red',linestyle='--',label='ASD Threshold (0.65)'); ax5.set_ylim(0,1); ax5.set_title('Individual Model Predictions',color='white'); ax5.set_ylabel('ASD Probability'); ax5.legend()
-        plt.tight_layout(rect=[0,0,1,0.96]); report_path = SCRIPT_DIR / "Screening_Report.png"
-        plt.savefig(report_path); print(f"Report saved to {report_path}"); plt.close()
+        with _PLOT_LOCK:
+            plt.style.use('dark_background'); fig = plt.figure(figsize=(18, 10))
+            fig.suptitle(f'Autism Screening Analysis - Final Verdict: {verdict}', fontsize=20, color='lightgray')
+            ax1=plt.subplot(2,3,1); ax1.plot(x,y,color='red',alpha=0.7); ax1.scatter(x[0],y[0],c='lime',s=100,label='Start'); ax1.scatter(x[-1],y[-1],c='cyan',s=100,label='End'); ax1.set_xlim(0,self.screen_width); ax1.set_ylim(self.screen_height,0); ax1.set_title('Gaze Scan Path',color='white'); ax1.set_aspect('equal',adjustable='box'); ax1.legend()
+            ax2=plt.subplot(2,3,2); ax2.plot(t[1:]-t[0],velocities,color='orange'); ax2.axhline(y=session.VELOCITY_THRESHOLD,color='cyan',linestyle='--',label=f'Saccade Threshold ({session.VELOCITY_THRESHOLD} px/s)'); ax2.set_title('Gaze Velocity Over Time',color='white'); ax2.set_xlabel('Time (s)'); ax2.set_ylabel('Velocity (pixels/sec)'); ax2.legend()
+            ax3=plt.subplot(2,3,3); events=['Fixations','Saccades']; counts=[session.fixations,session.saccades]; ax3.bar(events,counts,color=['green','red']); ax3.set_title('Fixation & Saccade Event Counts',color='white'); ax3.set_ylabel('Total Count')
+            ax4=plt.subplot(2,3,4); sns.kdeplot(x=x,y=y,cmap="rocket",fill=True,thresh=0.05,ax=ax4); ax4.set_xlim(0,self.screen_width); ax4.set_ylim(self.screen_height,0); ax4.set_title('Gaze Point Heatmap',color='white'); ax4.set_aspect('equal',adjustable='box')
+            ax5=plt.subplot(2,3,5); models=list(model_probs.keys()); probs=list(model_probs.values()); ax5.bar(models,probs,color='lightblue'); ax5.axhline(y=0.65,color='red',linestyle='--',label='ASD Threshold (0.65)'); ax5.set_ylim(0,1); ax5.set_title('Individual Model Predictions',color='white'); ax5.set_ylabel('ASD Probability'); ax5.legend()
+            plt.tight_layout(rect=[0,0,1,0.96]); report_path = session.visual_report_path
+            plt.savefig(report_path); print(f"Report saved to {report_path}"); plt.close(fig)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Autism Screening System')
     parser.add_argument('--video', type=str, help='Path to video file for screening (optional, uses webcam if not provided)')
     parser.add_argument('--json', action='store_true', help='Output result as JSON')
+    parser.add_argument('--search', action='store_true', help='Retrain with a hyperparameter search (successive halving) before screening')
     args = parser.parse_args()
 
     TRAINING_DATA_CSV = SCRIPT_DIR / "srijan_features_only_with_groups.csv"
     system = AutismScreeningSystem(csv_path=str(TRAINING_DATA_CSV))
-    if not system.load_models():
+    if args.search:
+        system.train_all_models(search=True)
+    elif not system.load_models():
         print(" No pre-trained models found. Training new models...")
         system.train_all_models()
     if system.is_trained:
@@ -23,6 +23,8 @@ import warnings
 import joblib
 import matplotlib.pyplot as plt
 import seaborn as sns
+from stimulus import StimulusTrajectory
+from gaze_events import EventStream
 
 warnings.filterwarnings('ignore')
 tf.get_logger().setLevel('ERROR')
@@ -49,10 +51,7 @@ class AutismScreeningSystem:
         self.session_start_time = None
         self.last_gaze_point = None
         self.last_gaze_time = None
-        self.fixation_start_time = None
-        self.fixation_start_pos = None
-        self.is_in_fixation = False
-        self.counted_fixation = False
+        self.event_stream = None
         # --- NEW: Gaze tracking attributes ---
         self.is_calibrated = False
         self.calibrated_gaze_offset = np.array([0.0, 0.0])
@@ -176,29 +175,20 @@ class AutismScreeningSystem:
         self.fixations = 0; self.saccades = 0
         self.session_start_time = time.time()
         self.last_gaze_point = None; self.last_gaze_time = None
-        self.is_in_fixation = False; self.fixation_start_time = None
-        self.fixation_start_pos = None; self.counted_fixation = False
+        self.event_stream = None
 
     def _update_gaze_metrics(self, gaze_data: Dict[str, Any]):
-        # This function remains unchanged
-        current_time = gaze_data['timestamp']; current_point = np.array([gaze_data['x'], gaze_data['y']])
-        if self.last_gaze_point is not None:
-            dt = current_time - self.last_gaze_time
-            if dt > 0:
-                dist = np.linalg.norm(current_point - self.last_gaze_point); velocity = dist / dt
-                if velocity < self.VELOCITY_THRESHOLD:
-                    if not self.is_in_fixation:
-                        self.is_in_fixation = True; self.fixation_start_time = current_time
-                        self.fixation_start_pos = current_point; self.counted_fixation = False
-                    elif not self.counted_fixation:
-                        fix_dist = np.linalg.norm(current_point - self.fixation_start_pos)
-                        fix_dur = current_time - self.fixation_start_time
-                        if fix_dur > self.FIXATION_DURATION_THRESHOLD and fix_dist < self.FIXATION_RADIUS_THRESHOLD:
-                            self.fixations += 1; self.counted_fixation = True
-                else:
-                    if self.is_in_fixation:
-                        self.saccades += 1; self.is_in_fixation = False; self.fixation_start_time = None
-        self.last_gaze_point = current_point; self.last_gaze_time = current_time
+        # Same rules as before, classified in vectorized chunks (see gaze_events.py)
+        if self.event_stream is None:
+            self.event_stream = EventStream(velocity_threshold=self.VELOCITY_THRESHOLD, min_duration=self.FIXATION_DURATION_THRESHOLD, max_radius=self.FIXATION_RADIUS_THRESHOLD)
+        self.event_stream.push(gaze_data['x'], gaze_data['y'], gaze_data['timestamp'])
+        self.fixations, self.saccades = self.event_stream.fixations, self.event_stream.saccades
+        self.last_gaze_point = (gaze_data['x'], gaze_data['y']); self.last_gaze_time = gaze_data['timestamp']
+
+    def _flush_gaze_metrics(self):
+        if self.event_stream is not None:
+            self.event_stream.flush()
+            self.fixations, self.saccades = self.event_stream.fixations, self.event_stream.saccades
 
     def run_live_screening_browser(self, webcam_callback, canvas_callback, display=True):
         print(f"🔴STARTING LIVE SCREENING IN BROWSER")
@@ -216,8 +206,7 @@ class AutismScreeningSystem:
             print("✅ Skipping calibration for browser version")
 
         # --- Main Screening Phase ---
-        ball_pos = np.array([self.screen_width / 2, self.screen_height / 2], dtype=float)
-        ball_vel = np.array([7, 5], dtype=float); ball_radius = 40
+        stimulus = StimulusTrajectory('bounce', self.screen_width, self.screen_height, duration=60, radius=40)
         self._reset_session_state()
 
         frame_count = 0
@@ -233,11 +222,9 @@ class AutismScreeningSystem:
                 # Create display frame (in browser this would be canvas)
                 display_frame = np.zeros((self.screen_height, self.screen_width, 3), dtype=np.uint8)
 
-                # Update ball position
-                ball_pos += ball_vel
-                if ball_pos[0]<=ball_radius or ball_pos[0]>=self.screen_width-ball_radius: ball_vel[0]*=-1
-                if ball_pos[1]<=ball_radius or ball_pos[1]>=self.screen_height-ball_radius: ball_vel[1]*=-1
-                cv2.circle(display_frame, tuple(ball_pos.astype(int)), ball_radius, (255, 255, 255), -1)
+                # Ball position follows the precomputed stimulus by session time
+                ball_x, ball_y = stimulus.position(time.time() - self.session_start_time)
+                cv2.circle(display_frame, (int(ball_x), int(ball_y)), stimulus.radius, (255, 255, 255), -1)
 
                 # Process face landmarks
                 results = self.face_mesh.process(cv2.cvtColor(cam_frame, cv2.COLOR_BGR2RGB))
@@ -265,7 +252,9 @@ class AutismScreeningSystem:
                         screen_x = np.clip(smoothed_x, 0, self.screen_width)
                         screen_y = np.clip(smoothed_y, 0, self.screen_height)
 
-                        gaze_data = {'x': screen_x, 'y': screen_y, 'timestamp': time.time()}
+                        timestamp = time.time()
+                        target_x, target_y = stimulus.position(timestamp - self.session_start_time)
+                        gaze_data = {'x': screen_x, 'y': screen_y, 'timestamp': timestamp, 'target_x': target_x, 'target_y': target_y}
 
                 if gaze_data:
                     self._update_gaze_metrics(gaze_data)
@@ -314,6 +303,7 @@ class AutismScreeningSystem:
 
                 if elapsed_time >= 60: break
 
+            self._flush_gaze_metrics()
             if len(self.current_session_data) > 50:
                 return self.generate_final_prediction()
             return None
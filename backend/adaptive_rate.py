@@ -0,0 +1,117 @@
+"""
+Adaptive face mesh rate for live screening
+
+When the CPU cannot keep up with the camera, the inference stage used to
+fall behind. The capture queue then dropped frames, and gaze samples ended
+up unevenly spaced. AdaptiveRateController measures how long each frame
+takes to process. When that exceeds the camera's frame interval, it runs
+face mesh only on every Nth frame. The frames in between get a gaze sample
+predicted by a constant-velocity Kalman filter (GazeKalman) and are flagged
+as interpolated. Samples stay one per captured frame, and throughput
+degrades gradually instead of stalling. Interpolated samples only fill the
+gaze trace; the session features are computed from measured samples.
+"""
+
+import math
+
+import numpy as np
+
+
+class AdaptiveRateController:
+    """Chooses how often face mesh runs from the measured per-frame inference latency"""
+
+    def __init__(self, frame_interval, max_stride=4, headroom=0.85, smoothing=0.2):
+        """
+        Args:
+            frame_interval: Seconds between captured frames (1 / camera fps)
+            max_stride: Face mesh runs at least on every max_stride-th frame
+            headroom: Fraction of the frame interval inference may use before frames are skipped
+            smoothing: Weight of the newest measurement in the latency moving average
+        """
+        self.budget = frame_interval * headroom
+        self.max_stride = max(1, int(max_stride))
+        self.smoothing = smoothing
+        self.latency = None  # Moving average of seconds per measured frame
+        self.stride = 1
+        self._since_run = 0
+
+    def should_run(self):
+        """True if face mesh should run on the next frame, False to predict it instead"""
+        if self._since_run + 1 >= self.stride:
+            self._since_run = 0
+            return True
+        self._since_run += 1
+        return False
+
+    def observe(self, seconds):
+        """Record the processing time of a measured frame and update the stride"""
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += self.smoothing * (seconds - self.latency)
+        # The processing time of one measured frame is spread over `stride` frame intervals
+        needed = self.latency / self.budget
+        if needed > self.stride:
+            self.stride = min(self.max_stride, math.ceil(needed))
+        elif self.stride > 1 and needed < (self.stride - 1) * 0.9:
+            # Back off one step at a time, with some margin so the stride does not flap
+            self.stride -= 1
+
+
+class GazeKalman:
+    """Constant-velocity Kalman filter over screen gaze, used to predict samples between measurements"""
+
+    def __init__(self, process_noise=5000.0, measurement_noise=25.0, max_gap=0.25):
+        """
+        Args:
+            process_noise: Acceleration noise spectral density (px^2/s^3)
+            measurement_noise: Variance of a measured gaze point (px^2)
+            max_gap: Do not predict further than this many seconds past the last measurement
+        """
+        self.q = process_noise
+        self.r = measurement_noise
+        self.max_gap = max_gap
+        self.H = np.array([[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0]])
+        self.reset()
+
+    def reset(self):
+        self.x = None  # State [x, y, vx, vy]
+        self.P = None
+        self.t = None  # Time of the state
+        self.last_measurement = None
+
+    def _transition(self, dt):
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = dt
+        # Discrete white-noise acceleration model
+        q = self.q
+        Q = np.zeros((4, 4))
+        Q[0, 0] = Q[1, 1] = q * dt ** 3 / 3
+        Q[0, 2] = Q[2, 0] = Q[1, 3] = Q[3, 1] = q * dt ** 2 / 2
+        Q[2, 2] = Q[3, 3] = q * dt
+        return F, Q
+
+    def update(self, x, y, timestamp):
+        """Fold in a measured gaze point"""
+        z = np.array([x, y], dtype=float)
+        if self.x is None or timestamp - self.last_measurement > self.max_gap:
+            # (Re)start from the measurement at rest; velocity is learned from the next ones
+            self.x = np.array([z[0], z[1], 0.0, 0.0])
+            self.P = np.diag([self.r, self.r, 1e6, 1e6])
+        else:
+            dt = max(timestamp - self.t, 0.0)
+            F, Q = self._transition(dt)
+            x_pred = F @ self.x
+            P_pred = F @ self.P @ F.T + Q
+            S = self.H @ P_pred @ self.H.T + self.r * np.eye(2)
+            K = P_pred @ self.H.T @ np.linalg.inv(S)
+            self.x = x_pred + K @ (z - self.H @ x_pred)
+            self.P = (np.eye(4) - K @ self.H) @ P_pred
+        self.t = self.last_measurement = timestamp
+
+    def predict(self, timestamp):
+        """Predicted (x, y) at timestamp, or None without a recent measurement. Does not change the state."""
+        if self.x is None or timestamp - self.last_measurement > self.max_gap:
+            return None
+        dt = max(timestamp - self.t, 0.0)
+        return self.x[0] + self.x[2] * dt, self.x[1] + self.x[3] * dt
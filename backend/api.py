@@ -1,8 +1,10 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from ASD_Detection import AutismScreeningSystem
+from ASD_Detection_backup import AutismScreeningSystem, ModelBundle
+from model_registry import ModelRegistry
 import pathlib
 import json
+import os
 
 app = Flask(__name__)
 CORS(app)
@@ -10,13 +12,24 @@ CORS(app)
 SCRIPT_DIR = pathlib.Path(__file__).parent.resolve()
 TRAINING_DATA_CSV = SCRIPT_DIR / "srijan_features_only_with_groups.csv"
 
+# Load the model bundle once at startup; the registry hot-swaps new bundles as they appear
+registry = ModelRegistry(SCRIPT_DIR / "autism_models", loader=ModelBundle.load)
+registry.current()
+# Under gunicorn (gunicorn.conf.py) this module is imported in the master before it forks;
+# threads don't survive fork, so each worker starts its own watcher in post_fork()
+if os.environ.get('SCREENING_PRELOAD') != '1':
+    registry.start_watcher()
+
+def post_fork():
+    registry.start_watcher()
+
 # Initialize the system
-system = AutismScreeningSystem(csv_path=str(TRAINING_DATA_CSV))
+system = AutismScreeningSystem(csv_path=str(TRAINING_DATA_CSV), registry=registry)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Simple health check endpoint to verify server is running"""
-    return jsonify({'status': 'ok', 'message': 'Server is running'})
+    return jsonify({'status': 'ok', 'message': 'Server is running', 'model_version': registry.version})
 
 @app.route('/api/screening', methods=['POST'])
 def start_screening():
@@ -24,8 +37,8 @@ def start_screening():
         data = request.get_json() or {}
         print(f"Received screening request: {data}")
 
-        # Load or train models if not already done
-        if not system.load_models():
+        # Train models only if no bundle could be loaded
+        if not system.is_trained:
             print("No pre-trained models found. Training new models...")
             if not system.train_all_models():
                 return jsonify({'error': 'Failed to train models'}), 500
@@ -43,4 +56,4 @@ def start_screening():
         return jsonify({'error': 'Internal server error occurred'}), 500
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=True)
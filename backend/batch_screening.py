@@ -0,0 +1,174 @@
+"""
+Offline batch screening of recorded sessions
+
+Runs many recorded screening videos across a process pool. Each worker
+process loads the model bundle and its own FaceMesh once, then screens the
+videos it is handed headlessly. Results stream out as JSON lines, one per
+video, in completion order, followed by a summary line.
+
+Usage:
+    python batch_screening.py recordings/*.mp4 --workers 8 --output results.jsonl
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import pathlib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+SCRIPT_DIR = pathlib.Path(__file__).parent.resolve()
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+# Per-process screening system, created by the pool initializer
+_worker_system = None
+
+
+def _init_worker(models_dir):
+    global _worker_system
+    # Keep the screening system's progress prints out of the JSON lines stream
+    sys.stdout = sys.stderr
+    from ASD_Detection_backup import AutismScreeningSystem, FaceMeshPool, ModelBundle
+    bundle = ModelBundle.load(models_dir)
+    if bundle is None:
+        raise RuntimeError(f'No model bundle found in {models_dir}')
+    _worker_system = AutismScreeningSystem(csv_path='', bundle=bundle, face_mesh_pool=FaceMeshPool(size=1))
+
+
+def _screen_video(index, video_path, max_duration, report_dir, frame_stride=1):
+    """Screen one video in a worker process and return its JSON-lines record"""
+    start = time.time()
+    record = {'index': index, 'video': video_path, 'worker_pid': os.getpid()}
+    session = _worker_system.new_session(
+        visual_report_path=os.path.join(report_dir, f'{pathlib.Path(video_path).stem}_{index}.png'))
+    try:
+        result = _worker_system.run_live_screening(video_path=video_path, display=False, max_duration=max_duration, session=session, frame_stride=frame_stride)
+        record['success'] = bool(result)
+        record['result'] = result
+        if not result:
+            record['error'] = 'Screening did not collect enough data (need at least 50 frames)'
+    except Exception as e:
+        record['success'] = False
+        record['error'] = str(e)
+    record['samples'] = len(session.current_session_data)
+    record['seconds'] = round(time.time() - start, 3)
+    return record
+
+
+def _json_default(obj):
+    """Convert NumPy scalars/arrays and paths for json.dumps"""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if isinstance(obj, pathlib.Path):
+        return str(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def to_json_line(record):
+    return json.dumps(record, default=_json_default) + '\n'
+
+
+def run_batch(video_paths, workers=None, max_duration=float('inf'), models_dir=SCRIPT_DIR / 'autism_models', report_dir=None, frame_stride=1):
+    """
+    Screen videos across a process pool
+
+    Args:
+        video_paths: Paths of recorded sessions
+        workers: Number of worker processes (defaults to all cores, capped at the number of videos)
+        max_duration: Seconds of each video to screen
+        models_dir: Model bundle directory loaded by every worker
+        report_dir: Where per-video visual reports are written
+        frame_stride: Screen every Nth frame of each video
+
+    Yields:
+        One record dict per video as it finishes, then a summary dict
+    """
+    video_paths = [str(p) for p in video_paths]
+    report_dir = str(report_dir or SCRIPT_DIR / 'reports' / 'batch')
+    os.makedirs(report_dir, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(video_paths) or 1))
+    batch_start = time.time()
+    succeeded = 0
+
+    # Spawn rather than fork: TensorFlow and MediaPipe are not fork-safe once initialised
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(str(models_dir),)) as pool:
+        futures = {pool.submit(_screen_video, i, path, max_duration, report_dir, frame_stride): (i, path) for i, path in enumerate(video_paths)}
+        for future in as_completed(futures):
+            index, path = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:  # Worker crashed or failed to initialise
+                record = {'index': index, 'video': path, 'success': False, 'error': str(e)}
+            succeeded += bool(record.get('success'))
+            yield record
+
+    total = time.time() - batch_start
+    yield {
+        'summary': True,
+        'videos': len(video_paths),
+        'succeeded': succeeded,
+        'failed': len(video_paths) - succeeded,
+        'workers': workers,
+        'seconds': round(total, 3),
+    }
+
+
+def expand_video_paths(paths, root=None):
+    """
+    Expand directories into the video files they contain
+
+    Args:
+        root: If given, relative paths are taken from root, and every path (after resolving
+            symlinks and '..') must lie inside it, else ValueError
+    """
+    if root is not None:
+        root = pathlib.Path(root).resolve()
+
+    def checked(p):
+        if root is None:
+            return p
+        resolved = (root / p).resolve()
+        if not resolved.is_relative_to(root):
+            raise ValueError(f'Video path outside the allowed directory: {p}')
+        return resolved
+
+    expanded = []
+    for p in (checked(pathlib.Path(p)) for p in paths):
+        if p.is_dir():
+            expanded.extend(sorted(checked(f) for f in p.iterdir() if f.suffix.lower() in VIDEO_EXTENSIONS))
+        else:
+            expanded.append(p)
+    return expanded
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch screening of recorded sessions')
+    parser.add_argument('videos', nargs='+', help='Video files or directories of videos')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--max-duration', type=float, default=float('inf'), help='Seconds of each video to screen (default: whole video)')
+    parser.add_argument('--models-dir', type=str, default=str(SCRIPT_DIR / 'autism_models'), help='Model bundle directory')
+    parser.add_argument('--report-dir', type=str, default=None, help='Directory for per-video visual reports')
+    parser.add_argument('--frame-stride', type=int, default=1, help='Screen every Nth frame (default: every frame)')
+    parser.add_argument('--output', type=str, default=None, help='JSON lines output file (default: stdout)')
+    args = parser.parse_args()
+
+    # Same confinement as the /api/batch_screening endpoint when BATCH_VIDEO_ROOT is set
+    try:
+        videos = expand_video_paths(args.videos, root=os.environ.get('BATCH_VIDEO_ROOT'))
+    except ValueError as e:
+        parser.error(str(e))
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for record in run_batch(videos, args.workers, args.max_duration, args.models_dir, args.report_dir, args.frame_stride):
+            out.write(to_json_line(record))
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Staged capture pipeline for live screening
+
+run_live_screening splits each session into three stages joined by bounded
+queues: a capture thread that reads the camera and stamps every frame with
+its capture time, an inference thread that runs face mesh and gaze mapping,
+and the render stage on the calling thread (OpenCV windows must stay on it).
+A slow render or a slow face mesh call then delays only its own stage. The
+capture timestamps keep the gaze signal on the camera's clock.
+
+Recorded videos are stamped with their own timeline instead of the wall
+clock, so a video can be screened faster than real time (headless mode)
+without changing the gaze velocities the features are built from.
+"""
+
+import threading
+import time
+from collections import deque
+
+from lazy_import import LazyModule
+from pipeline_metrics import stage_timer
+
+cv2 = LazyModule('cv2')
+
+# Marks the end of a stage's output
+END = object()
+
+
+class StageQueue:
+    """
+    Bounded FIFO between two pipeline stages
+
+    With drop_oldest (live camera), a full queue discards its oldest item so
+    the consumer always works on fresh frames. Without it (video files), the
+    producer blocks so that no frame is skipped.
+    """
+
+    def __init__(self, maxsize=2, drop_oldest=True):
+        self.maxsize = max(1, maxsize)
+        self.drop_oldest = drop_oldest
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, item):
+        """Queue an item; returns False once the queue has been closed"""
+        with self._cond:
+            while not self.drop_oldest and len(self._items) >= self.maxsize and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return False
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """Next item, END once closed and drained, or None on timeout"""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if self._items:
+                item = self._items.popleft()
+                self._cond.notify_all()
+                return item
+            return END if self._closed else None
+
+    def close(self):
+        """No more items will be accepted; consumers drain what is left and then get END"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class CaptureThread(threading.Thread):
+    """Reads frames from a cv2.VideoCapture into a StageQueue as (frame, capture_time) pairs"""
+
+    def __init__(self, cam, output, stop_event, stride=1, timeline_start=None, fps=30, realtime=False):
+        """
+        Args:
+            cam: Opened cv2.VideoCapture
+            output: StageQueue receiving (frame, timestamp) tuples, closed when capture ends
+            stop_event: Set by the other stages to end the capture early
+            stride: Keep every stride-th frame; the others are grabbed but never decoded
+            timeline_start: For video files, the session start time to which the video's own
+                timeline is added; None stamps frames with the wall clock (live camera)
+            fps: Frame rate used for the timeline when the backend reports no position
+            realtime: For video files, hold each frame until its timeline time comes round on the
+                wall clock, so a displayed session plays at the video's own speed
+        """
+        super().__init__(name='screening-capture', daemon=True)
+        self.cam = cam
+        self.output = output
+        self.stop_event = stop_event
+        self.stride = max(1, int(stride))
+        self.timeline_start = timeline_start
+        self.frame_interval = 1.0 / fps if fps and fps > 0 else 1.0 / 30
+        self.realtime = realtime and timeline_start is not None
+        self.frames = 0  # Frames passed downstream
+        self.position = 0  # Frames consumed from the source, including skipped ones
+        self.ended = False  # True when the source ran out of frames (end of video, camera unplugged)
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                with stage_timer('capture_read'):
+                    ok, frame = self.cam.read()
+                if not ok:
+                    self.ended = True
+                    return
+                self.position += 1
+                self.frames += 1
+                timestamp = self._timestamp()
+                if self.realtime:
+                    # Paced against the session start, so waits never accumulate drift
+                    delay = timestamp - time.time()
+                    if delay > 0 and self.stop_event.wait(delay):
+                        return
+                if not self.output.put((frame, timestamp)):
+                    return
+                if not self._skip(self.stride - 1):
+                    self.ended = True
+                    return
+        finally:
+            self.output.close()
+
+    def _skip(self, count):
+        for _ in range(count):
+            if not self.cam.grab():
+                return False
+            self.position += 1
+        return True
+
+    def _timestamp(self):
+        if self.timeline_start is None:
+            return time.time()
+        position_ms = self.cam.get(cv2.CAP_PROP_POS_MSEC)
+        if position_ms and position_ms > 0:
+            return self.timeline_start + position_ms / 1000.0
+        return self.timeline_start + (self.position - 1) * self.frame_interval
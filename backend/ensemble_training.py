@@ -0,0 +1,200 @@
+"""
+Parallel training of ensemble members
+
+The ensemble members (random forest, SVM, gradient boosting, the DNN) are
+independent of each other but were fitted one after another.
+train_members() fits them concurrently:
+
+- members marked in_process (the Keras DNN) are fitted on a thread of
+  this process, so the model never has to cross a process boundary
+- every other member is fitted in its own worker process (spawn, one
+  single-worker pool per member) and the fitted model is returned pickled
+- cores left over after one per member go to the parallel members
+  (forests) through their n_jobs
+
+Each member gets a report entry:
+
+- wall_seconds: fit time (None for prefit members: they were fitted by the
+  hyperparameter search, whose time is in the report's 'search' entry)
+- predict_seconds: time to score the held-out split
+- peak_rss_mb: high-water resident memory of the process that fitted it.
+  For worker members this is that member alone, including the
+  interpreter and imports. For in-process members it is the whole
+  training process. Not available on Windows (None).
+- auc: held-out ROC AUC
+- process: 'worker', 'main' or 'prefit'
+- n_jobs: cores given to the fit (not for prefit members)
+
+The report is saved with the model bundle (training_report.json).
+"""
+
+import multiprocessing
+import os
+import platform
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from lazy_import import LazyModule
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sklearn_base = LazyModule('sklearn.base')
+sklearn_metrics = LazyModule('sklearn.metrics')
+
+REPORT_FILE = 'training_report.json'
+
+
+class Member:
+    """One ensemble member: an estimator (or fit function) and how to run it"""
+
+    def __init__(self, name, estimator=None, fit=None, predict=None, parallel=False, in_process=False, prefit=False):
+        """
+        Args:
+            name: Model name in the bundle
+            estimator: Unfitted scikit-learn estimator (cloned before fitting)
+            fit: Callable (X, y) -> fitted model, instead of an estimator; must be picklable unless in_process
+            predict: Callable (model, X) -> probability of the positive class (default predict_proba[:, 1])
+            parallel: The estimator parallelises internally (n_jobs) and gets the spare cores
+            in_process: Fit on a thread of this process instead of a worker process
+            prefit: estimator is already fitted on the training split (e.g. by hyperparameter_search);
+                it is only scored, in this process
+        """
+        self.name = name
+        self.estimator = estimator
+        self.fit_fn = fit
+        self.predict_fn = predict
+        self.parallel = parallel
+        self.prefit = prefit
+        self.in_process = in_process or prefit
+
+    def fit(self, X, y, n_jobs=1):
+        if self.prefit:
+            return self.estimator
+        if self.fit_fn is not None:
+            return self.fit_fn(X, y)
+        model = sklearn_base.clone(self.estimator)
+        if self.parallel:
+            # Only the innermost n_jobs (the forest inside a calibrator, say), to avoid nested pools
+            params = [k for k in model.get_params() if k == 'n_jobs' or k.endswith('__n_jobs')]
+            if params:
+                depth = max(k.count('__') for k in params)
+                model.set_params(**{k: n_jobs for k in params if k.count('__') == depth})
+        return model.fit(X, y)
+
+    def predict(self, model, X):
+        if self.predict_fn is not None:
+            return np.asarray(self.predict_fn(model, X)).reshape(-1)
+        return model.predict_proba(X)[:, 1]
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1 << 20) if platform.system() == 'Darwin' else peak / 1024, 1)  # bytes on macOS, KiB elsewhere
+
+
+def _run_member(member, n_jobs, X_train, y_train, X_test, y_test):
+    start = time.perf_counter()
+    model = member.fit(X_train, y_train, n_jobs)
+    fitted = time.perf_counter()
+    probs = member.predict(model, X_test)
+    entry = {
+        'wall_seconds': None if member.prefit else round(fitted - start, 3),
+        'predict_seconds': round(time.perf_counter() - fitted, 3),
+        'peak_rss_mb': _peak_rss_mb(),
+        'auc': float(sklearn_metrics.roc_auc_score(y_test, probs)) if len(np.unique(y_test)) > 1 else None,
+    }
+    if member.prefit:
+        entry['process'] = 'prefit'
+    else:
+        entry['n_jobs'] = n_jobs
+        entry['process'] = 'main' if member.in_process else 'worker'
+    return model, entry
+
+
+def core_shares(members, cores):
+    """n_jobs per member: one core each, the spare cores split between the parallel members"""
+    parallel = [m for m in members if m.parallel]
+    spare = max(0, cores - len(members))
+    shares = {m.name: 1 for m in members}
+    for i, m in enumerate(parallel):
+        shares[m.name] += spare // len(parallel) + (1 if i < spare % len(parallel) else 0)
+    return shares
+
+
+def train_members(members, X_train, y_train, X_test, y_test, workers=None):
+    """
+    Fit members concurrently and score each on the held-out split
+
+    Args:
+        members: List of Member
+        workers: Cores to use (default: all); 1 fits the members one after another in this process
+
+    Returns:
+        ({name: fitted model}, report) with report['members'][name] as described in the module docstring
+    """
+    X_train, y_train, X_test, y_test = (np.asarray(a) for a in (X_train, y_train, X_test, y_test))  # Plain arrays, not cache memmaps
+    cores = workers or os.cpu_count() or 1
+    shares = core_shares(members, cores)
+    results = {}
+    start = time.perf_counter()
+    if cores <= 1:
+        for m in members:
+            results[m.name] = _run_member(m, 1, X_train, y_train, X_test, y_test)
+    else:
+        remote = [m for m in members if not m.in_process]
+        local = [m for m in members if m.in_process]
+        errors = []
+
+        def run_local(m):
+            try:
+                results[m.name] = _run_member(m, shares[m.name], X_train, y_train, X_test, y_test)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run_local, args=(m,), name=f"train-{m.name}") for m in local]
+        # A pool of one worker per member gives every member a fresh process (max_tasks_per_child needs Python 3.11)
+        context = multiprocessing.get_context('spawn')
+        pools = {m.name: ProcessPoolExecutor(max_workers=1, mp_context=context) for m in remote}
+        try:
+            futures = {m.name: pools[m.name].submit(_run_member, m, shares[m.name], X_train, y_train, X_test, y_test) for m in remote}
+            for t in threads:
+                t.start()
+            for name, future in futures.items():
+                results[name] = future.result()
+        finally:
+            for t in threads:
+                t.join()
+            for pool in pools.values():
+                pool.shutdown(cancel_futures=True)
+        if errors:
+            raise errors[0]
+
+    models = {m.name: results[m.name][0] for m in members}
+    report = {
+        'members': {m.name: results[m.name][1] for m in members},
+        'total_wall_seconds': round(time.perf_counter() - start, 3),
+        'cores': cores,
+        'n_train': int(len(X_train)),
+        'n_test': int(len(X_test)),
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    return models, report
+
+
+def print_report(report):
+    for name, entry in report['members'].items():
+        auc = f"{entry['auc']:.3f}" if entry['auc'] is not None else 'n/a'
+        peak = f"{entry['peak_rss_mb']:.0f} MB" if entry['peak_rss_mb'] is not None else 'n/a'
+        if entry['process'] == 'prefit':
+            print(f"   {name}: fitted by the search, {peak} peak, AUC {auc} (prefit)")
+        else:
+            print(f"   {name}: {entry['wall_seconds']:.2f}s fit, {peak} peak, AUC {auc} ({entry['process']}, n_jobs={entry['n_jobs']})")
+    print(f"   Total training wall time: {report['total_wall_seconds']:.2f}s on {report['cores']} cores")
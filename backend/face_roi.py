@@ -0,0 +1,149 @@
+"""
+Face region-of-interest tracking for FaceMesh
+
+Running face mesh on the full camera frame means converting and copying the
+whole 1080p image into MediaPipe every frame, even though the face covers a
+small part of it. FaceRoiTracker keeps a square crop around the face found
+in the previous frame. It converts and downscales only that crop, runs the
+mesh on it, and maps the landmarks back to full-frame coordinates. When the
+face is lost in the crop it falls back to a full-frame search.
+
+The crop is only moved when the face drifts out of its central area or
+changes size noticeably. Between moves, the mesh sees a stable image, and
+MediaPipe's own frame-to-frame tracking keeps working.
+"""
+
+import numpy as np
+
+from lazy_import import LazyModule
+import pipeline_metrics
+from pipeline_metrics import stage_timer
+
+cv2 = LazyModule('cv2')
+
+
+class _Point:
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+def _landmark_arrays(landmarks):
+    n = len(landmarks)
+    return (np.fromiter((lm.x for lm in landmarks), dtype=np.float32, count=n),
+            np.fromiter((lm.y for lm in landmarks), dtype=np.float32, count=n))
+
+
+class RemappedLandmarks:
+    """Landmarks detected in a crop, exposed in normalized full-frame coordinates (mapped on access)"""
+
+    def __init__(self, landmarks, scale_x, scale_y, offset_x, offset_y):
+        self._landmarks = landmarks
+        self._sx, self._sy = scale_x, scale_y
+        self._ox, self._oy = offset_x, offset_y
+
+    def __len__(self):
+        return len(self._landmarks)
+
+    def __getitem__(self, i):
+        lm = self._landmarks[i]
+        return _Point(lm.x * self._sx + self._ox, lm.y * self._sy + self._oy, lm.z * self._sx)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class FaceRoiTracker:
+    """Runs face mesh on a tracked crop around the face, falling back to the full frame"""
+
+    def __init__(self, max_side=256, margin=0.6, recenter_fraction=0.2, resize_tolerance=0.25):
+        """
+        Args:
+            max_side: Crops larger than this (pixels) are downscaled to it before the mesh runs
+            margin: Crop size is the face size times (1 + 2 * margin)
+            recenter_fraction: Move the crop when the face centre drifts this fraction of the crop size
+            resize_tolerance: Move the crop when the face size changes by more than this fraction
+        """
+        self.max_side = max_side
+        self.margin = margin
+        self.recenter_fraction = recenter_fraction
+        self.resize_tolerance = resize_tolerance
+        self.roi = None  # (x0, y0, x1, y1) in pixels, or None to search the full frame
+        self._roi_face_size = None
+        self.tracked_frames = 0
+        self.full_frames = 0
+
+    def reset(self):
+        self.roi = None
+        self._roi_face_size = None
+
+    def process(self, face_mesh, frame):
+        """
+        Find the face landmarks in a BGR frame
+
+        Returns:
+            Landmarks in normalized full-frame coordinates (indexable like MediaPipe's
+            landmark list), or None when no face was found
+        """
+        h, w = frame.shape[:2]
+        if self.roi is not None:
+            landmarks = self._process_roi(face_mesh, frame, w, h)
+            if landmarks is not None:
+                self.tracked_frames += 1
+                pipeline_metrics.FACE_ROI_FRAMES.inc(mode='tracked')
+                return landmarks
+            self.reset()
+
+        self.full_frames += 1
+        pipeline_metrics.FACE_ROI_FRAMES.inc(mode='full_frame')
+        with stage_timer('bgr_to_rgb'):
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        with stage_timer('face_mesh'):
+            results = face_mesh.process(rgb_frame)
+        if not results.multi_face_landmarks:
+            return None
+        landmarks = results.multi_face_landmarks[0].landmark
+        xs, ys = _landmark_arrays(landmarks)
+        self._update_roi(xs * w, ys * h, w, h)
+        return landmarks
+
+    def _process_roi(self, face_mesh, frame, w, h):
+        x0, y0, x1, y1 = self.roi
+        crop = frame[y0:y1, x0:x1]
+        scale = min(1.0, self.max_side / max(x1 - x0, y1 - y0))
+        with stage_timer('bgr_to_rgb'):
+            if scale < 1.0:
+                crop = cv2.resize(crop, (max(1, int((x1 - x0) * scale)), max(1, int((y1 - y0) * scale))), interpolation=cv2.INTER_AREA)
+            rgb_crop = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+        with stage_timer('face_mesh'):
+            results = face_mesh.process(rgb_crop)
+        if not results.multi_face_landmarks:
+            return None
+        crop_landmarks = results.multi_face_landmarks[0].landmark
+        xs, ys = _landmark_arrays(crop_landmarks)
+        self._update_roi(xs * (x1 - x0) + x0, ys * (y1 - y0) + y0, w, h)
+        return RemappedLandmarks(crop_landmarks, (x1 - x0) / w, (y1 - y0) / h, x0 / w, y0 / h)
+
+    def _update_roi(self, xs, ys, w, h):
+        """Re-centre the crop on the face (landmark pixel coordinates) if it drifted or changed size"""
+        cx, cy = (xs.min() + xs.max()) / 2, (ys.min() + ys.max()) / 2
+        face_size = max(xs.max() - xs.min(), ys.max() - ys.min(), 1.0)
+
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            side = max(x1 - x0, y1 - y0)
+            drift = max(abs(cx - (x0 + x1) / 2), abs(cy - (y0 + y1) / 2))
+            if drift <= self.recenter_fraction * side and abs(face_size / self._roi_face_size - 1) <= self.resize_tolerance:
+                return
+
+        half = face_size * (0.5 + self.margin)
+        x0, y0 = int(max(0, cx - half)), int(max(0, cy - half))
+        x1, y1 = int(min(w, cx + half)), int(min(h, cy + half))
+        if x1 - x0 < 16 or y1 - y0 < 16:
+            self.reset()
+            return
+        self.roi = (x0, y0, x1, y1)
+        self._roi_face_size = face_size
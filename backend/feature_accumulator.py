@@ -0,0 +1,139 @@
+"""
+Online gaze feature accumulator
+
+extract_comprehensive_features computes its statistics over the whole
+session once the session ends, so the prediction waits for a pass over
+every sample. OnlineFeatureAccumulator updates the same statistics as each
+sample arrives:
+
+- position mean/std (Welford)
+- velocity mean/std/skewness/kurtosis (running central moments)
+- acceleration mean/std
+- path length for path efficiency
+- a fixed screen-grid histogram for scanpath entropy
+
+The feature dict is then ready in O(1) when the session ends, and reading
+it mid-session (features()) costs about the same. Fixation and saccade
+counts are already kept by the session and are passed in.
+"""
+
+import math
+
+
+class RunningMoments:
+    """Streaming mean, variance, skewness and kurtosis of a scalar series (population statistics)"""
+
+    __slots__ = ('n', 'mean', 'm2', 'm3', 'm4')
+
+    def __init__(self):
+        self.n = 0
+        self.mean = self.m2 = self.m3 = self.m4 = 0.0
+
+    def update(self, value):
+        n1 = self.n
+        self.n = n = n1 + 1
+        delta = value - self.mean
+        delta_n = delta / n
+        delta_n2 = delta_n * delta_n
+        term1 = delta * delta_n * n1
+        self.mean += delta_n
+        self.m4 += term1 * delta_n2 * (n * n - 3 * n + 3) + 6 * delta_n2 * self.m2 - 4 * delta_n * self.m3
+        self.m3 += term1 * delta_n * (n - 2) - 3 * delta_n * self.m2
+        self.m2 += term1
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / self.n) if self.n else 0.0
+
+    @property
+    def skewness(self):
+        """Biased sample skewness (scipy.stats.skew default)"""
+        if self.n < 3 or self.m2 <= 0:
+            return 0.0
+        return math.sqrt(self.n) * self.m3 / self.m2 ** 1.5
+
+    @property
+    def kurtosis(self):
+        """Biased excess kurtosis (scipy.stats.kurtosis default)"""
+        if self.n < 4 or self.m2 <= 0:
+            return 0.0
+        return self.n * self.m4 / (self.m2 * self.m2) - 3.0
+
+
+class OnlineFeatureAccumulator:
+    """Per-sample updated gaze statistics, producing the session feature dict on demand"""
+
+    MIN_DT = 1e-3  # Same substitute for repeated timestamps as extract_comprehensive_features
+
+    def __init__(self, screen_width=1920, screen_height=1080, histogram_bins=10):
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.bins = histogram_bins
+        self.reset()
+
+    def reset(self):
+        self.x = RunningMoments()
+        self.y = RunningMoments()
+        self.velocity = RunningMoments()
+        self.acceleration = RunningMoments()
+        self.histogram = [0] * (self.bins * self.bins)
+        self.path_length = 0.0
+        self.first = None
+        self._last = None  # (x, y, timestamp, velocity)
+
+    def update(self, x, y, timestamp):
+        x, y, timestamp = float(x), float(y), float(timestamp)
+        self.x.update(x)
+        self.y.update(y)
+        if self.first is None:
+            self.first = (x, y)
+        # Same binning as np.histogram2d(bins, range=screen): the right edge belongs to the last bin
+        if 0 <= x <= self.screen_width and 0 <= y <= self.screen_height:
+            bx = min(int(x * self.bins / self.screen_width), self.bins - 1)
+            by = min(int(y * self.bins / self.screen_height), self.bins - 1)
+            self.histogram[bx * self.bins + by] += 1
+
+        velocity = None
+        if self._last is not None:
+            last_x, last_y, last_t, last_velocity = self._last
+            dt = timestamp - last_t
+            if dt == 0:
+                dt = self.MIN_DT
+            step = math.hypot(x - last_x, y - last_y)
+            self.path_length += step
+            velocity = step / dt
+            self.velocity.update(velocity)
+            if last_velocity is not None:
+                self.acceleration.update((velocity - last_velocity) / dt)
+        self._last = (x, y, timestamp, velocity)
+
+    @property
+    def count(self):
+        return self.x.n
+
+    def scanpath_entropy(self):
+        total = sum(self.histogram)
+        if not total:
+            return 0.0
+        return -sum(c / total * math.log2(c / total) for c in self.histogram if c)
+
+    def features(self, fixations=0, saccades=0):
+        """Current feature dict: the extract_comprehensive_features keys plus the extended statistics"""
+        path_efficiency = 0.0
+        if self.path_length > 0:
+            path_efficiency = math.hypot(self._last[0] - self.first[0], self._last[1] - self.first[1]) / self.path_length
+        return {
+            'mean_x': self.x.mean, 'mean_y': self.y.mean,
+            'std_x': self.x.std, 'std_y': self.y.std,
+            'mean_velocity': self.velocity.mean if self.velocity.n else float('nan'),
+            'fixation_count': fixations,
+            'saccade_count': saccades,
+            'velocity_std': self.velocity.std,
+            'velocity_skewness': self.velocity.skewness,
+            'velocity_kurtosis': self.velocity.kurtosis,
+            'mean_acceleration': self.acceleration.mean,
+            'acceleration_std': self.acceleration.std,
+            'path_efficiency': path_efficiency,
+            'scanpath_entropy': self.scanpath_entropy(),
+            'fixation_saccade_ratio': fixations / max(1, saccades),
+        }
@@ -0,0 +1,138 @@
+"""
+On-disk cache of training feature matrices
+
+Every training run used to re-read the training CSV and extract every
+subject's features again, even when neither the data nor the extractor
+had changed. cached_features() keys the extracted (X, y, feature_names)
+on:
+
+- the SHA-256 of the CSV contents
+- the extractor's version string, bumped whenever its features change
+- its parameters (rows per subject, thresholds, screen size, ...)
+
+A hit loads the stored matrix instead of extracting. Each entry is a
+directory with X.npy, y.npy and feature_names.json. The arrays are
+memory-mapped, so sweeping over a large matrix does not copy it up front.
+Entries are written to a temporary directory and renamed into place, so a
+concurrent or interrupted run never leaves a half-written entry.
+
+Hashing still reads the whole CSV, but reading bytes costs far less than
+parsing and extracting. The digest is also remembered per file size and
+modification time in digests.json, so an unchanged file is not read at
+all.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+CACHE_DIR = pathlib.Path(os.environ.get('FEATURE_CACHE_DIR') or pathlib.Path(__file__).parent.resolve() / 'feature_cache')
+DIGESTS_FILE = 'digests.json'
+
+_digest_lock = threading.Lock()
+
+
+def file_digest(path, cache_dir=CACHE_DIR):
+    """SHA-256 of a file's contents, reused while its size and mtime are unchanged"""
+    path = pathlib.Path(path).resolve()
+    st = path.stat()
+    stamp = [st.st_size, st.st_mtime_ns]
+    memo_path = pathlib.Path(cache_dir) / DIGESTS_FILE
+    with _digest_lock:
+        try:
+            memo = json.loads(memo_path.read_text())
+        except (OSError, ValueError):
+            memo = {}
+        entry = memo.get(str(path))
+        if entry and entry['stamp'] == stamp:
+            return entry['sha256']
+        digest = hashlib.sha256()
+        with open(path, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b''):
+                digest.update(chunk)
+        memo[str(path)] = {'stamp': stamp, 'sha256': digest.hexdigest()}
+        try:
+            memo_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = memo_path.with_name(f"{DIGESTS_FILE}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(memo, indent=1))
+            os.replace(tmp, memo_path)
+        except OSError:
+            pass  # The memo only saves re-hashing
+        return memo[str(path)]['sha256']
+
+
+def cache_key(csv_path, version, params=None, cache_dir=CACHE_DIR):
+    """Entry name for a CSV's features under an extractor version and parameters"""
+    key = {'data': file_digest(csv_path, cache_dir), 'version': version, 'params': params or {}}
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()[:24]
+
+
+def load(key, cache_dir=CACHE_DIR):
+    """(X, y, feature_names) of a cache entry, memory-mapped, or None if there is none"""
+    entry = pathlib.Path(cache_dir) / key
+    try:
+        X = np.load(entry / 'X.npy', mmap_mode='r')
+        y = np.load(entry / 'y.npy', mmap_mode='r')
+        feature_names = json.loads((entry / 'feature_names.json').read_text())
+    except (OSError, ValueError):
+        return None
+    return X, y, feature_names
+
+
+def store(key, X, y, feature_names, cache_dir=CACHE_DIR):
+    """Write a cache entry atomically (an existing entry for the key is kept)"""
+    cache_dir = pathlib.Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    y = np.asarray(y)
+    if y.dtype == object:
+        y = y.astype(str)  # Object arrays would need pickling and cannot be memory-mapped
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix=f".{key}.", dir=cache_dir))
+    try:
+        np.save(tmp / 'X.npy', np.ascontiguousarray(X, dtype=np.float64))
+        np.save(tmp / 'y.npy', y)
+        (tmp / 'feature_names.json').write_text(json.dumps(list(feature_names)))
+        os.rename(tmp, cache_dir / key)
+    except OSError:
+        pass  # Another run stored the same entry first, or the disk is read-only
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def cached_features(csv_path, version, params, extract, cache_dir=CACHE_DIR):
+    """
+    Features of a training CSV, from the cache when possible
+
+    Args:
+        csv_path: Training CSV
+        version: Extractor version string; change it whenever the extracted features change
+        params: JSON-serialisable dict of everything else that changes the features
+        extract: Callable () -> (X, y, feature_names), run on a miss
+        cache_dir: Cache location (None disables caching)
+
+    Returns:
+        (X, y, feature_names, hit)
+    """
+    if cache_dir is None:
+        return (*extract(), False)
+    try:
+        key = cache_key(csv_path, version, params, cache_dir)
+    except OSError:
+        return (*extract(), False)
+    entry = load(key, cache_dir)
+    if entry is not None:
+        return (*entry, True)
+    X, y, feature_names = extract()
+    store(key, X, y, feature_names, cache_dir)
+    # Return the stored copy so a miss and later hits see the same arrays
+    return (*(load(key, cache_dir) or (X, y, feature_names)), False)
+
+
+def clear(cache_dir=CACHE_DIR):
+    """Remove every cache entry"""
+    shutil.rmtree(cache_dir, ignore_errors=True)
@@ -0,0 +1,329 @@
+"""
+Frame ingest for browser-side webcam capture
+
+The browser captures the webcam and streams JPEG/WebP frames to the backend,
+which runs them through the usual face mesh -> eye offset -> gaze metrics
+pipeline. Each ingest session has a small bounded frame queue: when the
+browser sends faster than the server can process, the oldest pending frame is
+dropped, so a slow session never builds up latency or memory.
+
+Sessions live in the server process that started them. With a state_dir,
+each live session also leaves a small marker file naming that process, so
+another server process that receives its frames can answer with a clear 409
+instead of treating the session as unknown.
+"""
+
+import os
+import pathlib
+import struct
+import threading
+import time
+import uuid
+from collections import deque
+
+import numpy as np
+
+from lazy_import import LazyModule
+import pipeline_metrics
+from face_roi import FaceRoiTracker
+from pipeline_metrics import stage_timer
+
+cv2 = LazyModule('cv2')
+
+# Streamed request bodies are a sequence of: uint32 payload length, float64 capture time (ms), payload
+STREAM_HEADER = struct.Struct('>Id')
+MAX_FRAME_BYTES = 4 * 1024 * 1024
+
+
+class IngestError(Exception):
+    """Raised for invalid ingest requests; carries the HTTP status to return"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class IngestSession:
+    """One browser screening session: bounded frame queue plus a processing thread"""
+
+    def __init__(self, system, session, face_mesh_pool, max_pending=2, max_duration=60):
+        self.system = system
+        self.session = session
+        self.face_mesh_pool = face_mesh_pool
+        self.max_duration = max_duration
+        self.created_at = time.time()
+        self.last_activity = self.created_at
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.decode_errors = 0
+        self.face_lost = 0
+        self.processing_time = None  # EMA of seconds per processed frame
+        self.first_timestamp = None
+        self.calibration_requested = False
+        self.calibrated = False
+        self.closed = False
+        self.roi_tracker = FaceRoiTracker()
+        self._pending = deque(maxlen=max(1, max_pending))
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=f'ingest-{session.session_id[:8]}', daemon=True)
+        self._thread.start()
+
+    @property
+    def session_id(self):
+        return self.session.session_id
+
+    @property
+    def elapsed(self):
+        """Session time covered by processed frames, in seconds"""
+        if self.first_timestamp is None or self.session.last_gaze_time is None:
+            return 0.0
+        return max(0.0, self.session.last_gaze_time - self.first_timestamp)
+
+    @property
+    def complete(self):
+        return self.elapsed >= self.max_duration
+
+    def push(self, payload, timestamp=None):
+        """
+        Queue an encoded frame for processing, dropping the oldest pending one if full
+
+        Args:
+            payload: JPEG/WebP bytes
+            timestamp: Capture time in seconds (client clock); defaults to arrival time
+        """
+        if self.closed:
+            raise IngestError('Ingest session is closed', status=409)
+        if len(payload) > MAX_FRAME_BYTES:
+            raise IngestError(f'Frame too large ({len(payload)} bytes)', status=413)
+        with self._cond:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append((payload, timestamp if timestamp is not None else time.time()))
+            self.received += 1
+            self.last_activity = time.time()
+            self._cond.notify()
+
+    def request_calibration(self):
+        """Use the next processed frame with a detected face as the calibration reference"""
+        self.calibration_requested = True
+        self.last_activity = time.time()
+
+    def close(self, wait=True):
+        """Stop accepting frames, let the worker drain the queue and exit"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+        if wait:
+            self._thread.join()
+
+    def stats(self):
+        session = self.session
+        return {
+            'session_id': self.session_id,
+            'received': self.received,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'decode_errors': self.decode_errors,
+            'face_lost': self.face_lost,
+            'pending': len(self._pending),
+            'samples': len(session.current_session_data),
+            'fixations': session.fixations,
+            'saccades': session.saccades,
+            'calibrated': self.calibrated,
+            'elapsed': round(self.elapsed, 3),
+            'complete': self.complete,
+            # Hint for the client: don't send faster than the server can process
+            'suggested_interval_ms': round(self.processing_time * 1000) if self.processing_time else None,
+        }
+
+    def _run(self):
+        pipeline_metrics.SESSIONS_IN_FLIGHT.inc(source='ingest')
+        try:
+            self._process_pending()
+        finally:
+            pipeline_metrics.SESSIONS_IN_FLIGHT.dec(source='ingest')
+            pipeline_metrics.session_finished('ingest', self.processed, self.elapsed)
+
+    def _process_pending(self):
+        with self.face_mesh_pool.acquire() as face_mesh:
+            while True:
+                with self._cond:
+                    while not self._pending and not self.closed:
+                        self._cond.wait()
+                    if not self._pending:
+                        return
+                    payload, timestamp = self._pending.popleft()
+                start = time.time()
+                self._process(face_mesh, payload, timestamp)
+                cost = time.time() - start
+                self.processing_time = cost if self.processing_time is None else 0.8 * self.processing_time + 0.2 * cost
+
+    def _process(self, face_mesh, payload, timestamp):
+        with stage_timer('decode'):
+            frame = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            self.decode_errors += 1
+            return
+        self.processed += 1
+        if self.complete:
+            return
+
+        landmarks = self.roi_tracker.process(face_mesh, frame)
+        pipeline_metrics.FRAMES.inc(source='ingest')
+        if landmarks is None:
+            self._lost_face()
+            return
+        offset = self.system._get_eye_offset(landmarks)
+        if offset is None:
+            self._lost_face()
+            return
+
+        if self.calibration_requested:
+            self.calibrated = self.session.calibrate(offset)
+            self.calibration_requested = False
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        with stage_timer('gaze_mapping'):
+            self.session.add_sample(self.session.map_gaze(offset, timestamp))
+
+    def _lost_face(self):
+        self.face_lost += 1
+        pipeline_metrics.FACE_LOST.inc(source='ingest')
+
+
+class FrameIngestManager:
+    """Registry of live ingest sessions with a global session limit and idle reaping"""
+
+    def __init__(self, face_mesh_pool, max_sessions=16, max_pending=2, idle_timeout=30, state_dir=None):
+        """
+        Args:
+            state_dir: Directory shared between server processes for session owner markers (None: this process only)
+        """
+        self.face_mesh_pool = face_mesh_pool
+        self.max_sessions = max_sessions
+        self.max_pending = max_pending
+        self.idle_timeout = idle_timeout
+        self.state_dir = pathlib.Path(state_dir) if state_dir else None
+        if self.state_dir is not None:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def start(self, system, max_duration=60, **session_kwargs):
+        """Open a new ingest session for the given screening system"""
+        self.reap_idle()
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise IngestError(f'Too many active ingest sessions (limit {self.max_sessions})', status=429)
+            session = system.new_session(session_id=uuid.uuid4().hex, **session_kwargs)
+            # Browser sessions are calibrated on request; until then the neutral offset is used
+            session.calibrate(np.array([0.0, 0.0]))
+            ingest = IngestSession(system, session, self.face_mesh_pool, self.max_pending, max_duration)
+            self._sessions[ingest.session_id] = ingest
+        self._mark(ingest.session_id)
+        return ingest
+
+    def get(self, session_id):
+        with self._lock:
+            ingest = self._sessions.get(session_id)
+        if ingest is None:
+            owner = self._owner(session_id)
+            if owner is not None and owner != os.getpid():
+                raise IngestError(f'Ingest session {session_id} is held by another server process (pid {owner}); '
+                                  'route ingest requests to one worker (WEB_CONCURRENCY=1 or session affinity)', status=409)
+            raise IngestError(f'Unknown or expired ingest session: {session_id}', status=404)
+        return ingest
+
+    def finish(self, session_id):
+        """Close a session, wait for its queued frames and hand it back for prediction"""
+        ingest = self.get(session_id)
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        self._unmark(session_id)
+        ingest.close(wait=True)
+        return ingest
+
+    def _marker(self, session_id):
+        if self.state_dir is None or pathlib.Path(session_id).name != session_id:
+            return None
+        return self.state_dir / f'{session_id}.pid'
+
+    def _mark(self, session_id):
+        marker = self._marker(session_id)
+        if marker is not None:
+            try:
+                marker.write_text(str(os.getpid()))
+            except OSError as e:
+                print(f"⚠️ Could not write ingest marker {marker}: {e}")
+
+    def _unmark(self, session_id):
+        marker = self._marker(session_id)
+        if marker is not None:
+            try:
+                marker.unlink()
+            except OSError:
+                pass
+
+    def _owner(self, session_id):
+        """Pid of the server process holding a session, from its marker, or None"""
+        marker = self._marker(session_id)
+        if marker is None:
+            return None
+        try:
+            owner = int(marker.read_text())
+            if os.name == 'posix':
+                os.kill(owner, 0)  # Raises if that process has exited (a crashed worker's marker is stale)
+        except (OSError, ValueError):
+            return None
+        return owner
+
+    def reap_idle(self):
+        now = time.time()
+        with self._lock:
+            idle = [sid for sid, ingest in self._sessions.items() if now - ingest.last_activity > self.idle_timeout]
+            expired = [self._sessions.pop(sid) for sid in idle]
+        for ingest in expired:
+            print(f"⚠️ Dropping idle ingest session {ingest.session_id}")
+            self._unmark(ingest.session_id)
+            ingest.close(wait=False)
+
+    def stats(self):
+        with self._lock:
+            return {'active_sessions': len(self._sessions), 'max_sessions': self.max_sessions}
+
+
+def iter_stream_frames(stream):
+    """
+    Yield (payload, timestamp_seconds) from a length-prefixed binary frame stream
+
+    Each frame is STREAM_HEADER (uint32 length, float64 capture time in ms)
+    followed by the encoded image. A zero-length frame ends the stream.
+    """
+    while True:
+        header = _read_exact(stream, STREAM_HEADER.size)
+        if header is None:
+            return
+        length, timestamp_ms = STREAM_HEADER.unpack(header)
+        if length == 0:
+            return
+        if length > MAX_FRAME_BYTES:
+            raise IngestError(f'Frame too large ({length} bytes)', status=413)
+        payload = _read_exact(stream, length)
+        if payload is None:
+            raise IngestError('Truncated frame in stream')
+        yield payload, timestamp_ms / 1000.0
+
+
+def _read_exact(stream, size):
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            if chunks:
+                raise IngestError('Truncated frame in stream')
+            return None
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
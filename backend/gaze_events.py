@@ -0,0 +1,196 @@
+"""
+Vectorized fixation/saccade classification
+
+The session used to run a per-sample state machine (update_gaze_metrics)
+that built small NumPy arrays and called np.linalg.norm on every sample,
+and could only be run live. classify_events() applies the same rules to
+whole x/y/t arrays at once:
+
+- velocity-threshold segmentation (I-VT): a sample is slow when its
+  velocity from the previous sample is under VELOCITY_THRESHOLD
+- a run of slow samples is a fixation candidate anchored at its first
+  sample. It counts as a fixation once a later sample of the run is more
+  than MIN_FIXATION_DURATION after the anchor and within
+  MAX_FIXATION_RADIUS of it (a dispersion/duration check, as in I-DT)
+- every fast sample that ends a slow run is a saccade
+
+Samples whose timestamp does not advance are skipped, exactly like the
+state machine. The counts match it sample for sample.
+
+EventStream is the live wrapper. It buffers samples and classifies them in
+chunks, carrying the open fixation across chunk boundaries. Live sessions,
+offline re-analysis and training features therefore share one
+implementation.
+"""
+
+import numpy as np
+
+VELOCITY_THRESHOLD = 2000  # px/s
+MIN_FIXATION_DURATION = 0.15  # s
+MAX_FIXATION_RADIUS = 50  # px
+
+
+def _initial_state():
+    # Previous sample, whether a slow run is open, its anchor, and whether it was already counted
+    return {'prev': None, 'in_fixation': False, 'anchor': (0.0, 0.0, 0.0), 'counted': False}
+
+
+def _scan(x, y, t, state, velocity_threshold, min_duration, max_radius):
+    """
+    Classify one block of samples, continuing from state (updated in place)
+
+    Returns:
+        Dict of per-block arrays used by the callers: valid sample indices, slow flags,
+        run ids, run anchors and which runs qualified as fixations
+    """
+    n = len(t)
+    px, py, pt = np.empty(n), np.empty(n), np.empty(n)
+    px[1:], py[1:], pt[1:] = x[:-1], y[:-1], t[:-1]
+    if state['prev'] is None:
+        px[0], py[0], pt[0] = x[0], y[0], t[0]  # First sample of the session has no velocity
+    else:
+        px[0], py[0], pt[0] = state['prev']
+    dt = t - pt
+    step = np.hypot(x - px, y - py)
+    valid = np.flatnonzero(dt > 0)
+    # velocity < threshold without dividing by dt
+    slow = step[valid] < velocity_threshold * dt[valid]
+
+    prev_slow = np.empty(len(valid), dtype=bool)
+    if len(valid):
+        prev_slow[0] = state['in_fixation']
+        prev_slow[1:] = slow[:-1]
+    starts = slow & ~prev_slow
+    # Run 0 is the fixation carried over from the previous block; runs 1.. start in this block
+    run_id = np.cumsum(starts)
+    start_idx = valid[starts]
+    anchor_t = np.concatenate(([state['anchor'][0]], t[start_idx]))
+    anchor_x = np.concatenate(([state['anchor'][1]], x[start_idx]))
+    anchor_y = np.concatenate(([state['anchor'][2]], y[start_idx]))
+    already_counted = np.zeros(len(anchor_t), dtype=bool)
+    already_counted[0] = state['counted']
+
+    followers = slow & ~starts
+    rid = run_id[followers]
+    fi = valid[followers]
+    hits = (t[fi] - anchor_t[rid] > min_duration) & (np.hypot(x[fi] - anchor_x[rid], y[fi] - anchor_y[rid]) < max_radius)
+    qualified = np.bincount(rid[hits], minlength=len(anchor_t)) > 0
+    new_fixation = qualified & ~already_counted
+    saccade = ~slow & prev_slow
+
+    state['prev'] = (x[-1], y[-1], t[-1])
+    if len(valid):
+        state['in_fixation'] = bool(slow[-1])
+        if state['in_fixation']:
+            last_run = run_id[-1]
+            state['anchor'] = (anchor_t[last_run], anchor_x[last_run], anchor_y[last_run])
+            state['counted'] = bool(already_counted[last_run] or qualified[last_run])
+    return {'valid': valid, 'slow': slow, 'run_id': run_id, 'new_fixation': new_fixation, 'saccade': saccade}
+
+
+def count_events(x, y, t, velocity_threshold=VELOCITY_THRESHOLD, min_duration=MIN_FIXATION_DURATION, max_radius=MAX_FIXATION_RADIUS):
+    """(fixation_count, saccade_count) over whole arrays"""
+    if len(t) == 0:
+        return 0, 0
+    x, y, t = (np.asarray(a, dtype=np.float64) for a in (x, y, t))
+    scan = _scan(x, y, t, _initial_state(), velocity_threshold, min_duration, max_radius)
+    return int(scan['new_fixation'].sum()), int(scan['saccade'].sum())
+
+
+def classify_events(x, y, t, velocity_threshold=VELOCITY_THRESHOLD, min_duration=MIN_FIXATION_DURATION, max_radius=MAX_FIXATION_RADIUS):
+    """
+    Fixation and saccade segments over whole x/y/t arrays
+
+    Returns:
+        {'fixations': {...}, 'saccades': {...}}, each a dict of equal-length arrays:
+        start/end (sample indices, inclusive), start_time, duration and centroid_x/centroid_y.
+        Fixations span their slow run; saccades span from the last fixation sample to the
+        last fast sample and also carry amplitude (px) and peak_velocity (px/s).
+    """
+    x, y, t = (np.asarray(a, dtype=np.float64) for a in (x, y, t))
+    empty = {'start': np.empty(0, dtype=np.int64), 'end': np.empty(0, dtype=np.int64), 'start_time': np.empty(0),
+             'duration': np.empty(0), 'centroid_x': np.empty(0), 'centroid_y': np.empty(0)}
+    if len(t) < 2:
+        return {'fixations': dict(empty), 'saccades': dict(empty, amplitude=np.empty(0), peak_velocity=np.empty(0))}
+    scan = _scan(x, y, t, _initial_state(), velocity_threshold, min_duration, max_radius)
+    valid, slow, run_id = scan['valid'], scan['slow'], scan['run_id']
+    if not len(valid):
+        return {'fixations': dict(empty), 'saccades': dict(empty, amplitude=np.empty(0), peak_velocity=np.empty(0))}
+
+    # Fixations: slow runs that qualified. Run 0 (carried over) is always empty on a fresh scan.
+    slow_idx, slow_run = valid[slow], run_id[slow]
+    runs = np.flatnonzero(scan['new_fixation'])
+    first = np.searchsorted(slow_run, runs, side='left')
+    last = np.searchsorted(slow_run, runs, side='right') - 1
+    n_runs = len(scan['new_fixation'])
+    counts = np.bincount(slow_run, minlength=n_runs)[runs]
+    fixations = {
+        'start': slow_idx[first], 'end': slow_idx[last],
+        'start_time': t[slow_idx[first]], 'duration': t[slow_idx[last]] - t[slow_idx[first]],
+        'centroid_x': np.bincount(slow_run, weights=x[slow_idx], minlength=n_runs)[runs] / counts,
+        'centroid_y': np.bincount(slow_run, weights=y[slow_idx], minlength=n_runs)[runs] / counts,
+    }
+
+    # Saccades: runs of fast samples that begin right after a slow sample. Fast runs are separated by
+    # slow samples, so every fast run except one at the very start is a saccade.
+    fast = ~slow
+    fast_run = np.cumsum(fast & np.concatenate(([True], slow[:-1])))  # New id at each fast run start
+    saccade_runs = fast_run[scan['saccade']]
+    fast_idx, fast_id = valid[fast], fast_run[fast]
+    s_first = np.searchsorted(fast_id, saccade_runs, side='left')
+    s_last = np.searchsorted(fast_id, saccade_runs, side='right') - 1
+    launch = valid[np.flatnonzero(scan['saccade']) - 1]  # Last slow sample before the saccade
+    end = fast_idx[s_last]
+    n_fast = fast_run.max() + 1
+    fast_counts = np.bincount(fast_id, minlength=n_fast)[saccade_runs]
+    dt = np.diff(t, prepend=t[0])
+    velocity = np.zeros(len(t))
+    velocity[valid] = np.hypot(np.diff(x, prepend=x[0]), np.diff(y, prepend=y[0]))[valid] / dt[valid]
+    saccades = {
+        'start': launch, 'end': end,
+        'start_time': t[launch], 'duration': t[end] - t[launch],
+        'centroid_x': np.bincount(fast_id, weights=x[fast_idx], minlength=n_fast)[saccade_runs] / fast_counts,
+        'centroid_y': np.bincount(fast_id, weights=y[fast_idx], minlength=n_fast)[saccade_runs] / fast_counts,
+        'amplitude': np.hypot(x[end] - x[launch], y[end] - y[launch]),
+        'peak_velocity': np.maximum.reduceat(velocity[fast_idx], s_first) if len(s_first) else np.empty(0),
+    }
+    return {'fixations': fixations, 'saccades': saccades}
+
+
+class EventStream:
+    """
+    Live fixation/saccade counter: classifies buffered samples in chunks
+
+    Counts lag the newest sample by less than chunk_size samples; call flush()
+    before reading them when they must be exact (end of session).
+    """
+
+    def __init__(self, chunk_size=16, velocity_threshold=VELOCITY_THRESHOLD, min_duration=MIN_FIXATION_DURATION, max_radius=MAX_FIXATION_RADIUS):
+        self.chunk_size = max(1, chunk_size)
+        self.velocity_threshold = velocity_threshold
+        self.min_duration = min_duration
+        self.max_radius = max_radius
+        self._chunk = np.empty((3, self.chunk_size))
+        self.reset()
+
+    def reset(self):
+        self.fixations = 0
+        self.saccades = 0
+        self._pending = 0
+        self._state = _initial_state()
+
+    def push(self, x, y, timestamp):
+        self._chunk[:, self._pending] = (x, y, timestamp)
+        self._pending += 1
+        if self._pending == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Classify the buffered samples now"""
+        if not self._pending:
+            return
+        x, y, t = self._chunk[:, :self._pending]
+        self._pending = 0
+        scan = _scan(x, y, t, self._state, self.velocity_threshold, self.min_duration, self.max_radius)
+        self.fixations += int(scan['new_fixation'].sum())
+        self.saccades += int(scan['saccade'].sum())
@@ -0,0 +1,70 @@
+"""
+Production server configuration
+
+    gunicorn -c gunicorn.conf.py
+
+Runs screening_api:app (or APP_MODULE, e.g. api:app) on a pre-fork
+multi-worker server. The app and its model bundle are loaded once in the
+master process before forking, so every worker shares the model memory
+copy-on-write instead of loading its own copy. Workers are recycled after
+MAX_REQUESTS requests. Each worker serves up to THREADS requests at once,
+so the server as a whole handles at most WEB_CONCURRENCY * THREADS requests
+concurrently.
+
+Browser frame ingest sessions live in the worker that started them. Run
+ingest with WEB_CONCURRENCY=1, or put a proxy with session affinity in front
+of the server; a request that reaches another worker gets a 409. Screening
+and report jobs do not have this limit: their state is shared between
+workers through JOB_STATE_DIR. Webcam and display screenings take turns
+across all workers through a file lock in the same directory.
+"""
+
+import gc
+import multiprocessing
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Read by screening_api at import time, which happens below in the master (preload_app)
+os.environ.setdefault('SCREENING_PRELOAD', '1')
+os.environ.setdefault('JOB_STATE_DIR', os.path.join(BACKEND_DIR, 'job_state'))
+
+wsgi_app = os.environ.get('APP_MODULE', 'screening_api:app')
+chdir = BACKEND_DIR
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('THREADS', '8'))  # Concurrent requests per worker; long-polls hold a thread each
+backlog = int(os.environ.get('BACKLOG', '256'))
+preload_app = True
+
+# Recycle workers to bound memory growth; jitter keeps them from all restarting at once
+max_requests = int(os.environ.get('MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.environ.get('MAX_REQUESTS_JITTER', '100'))
+# Long-polls block for up to MAX_JOB_WAIT (60 s); a recycled worker gets this long to finish its screenings
+timeout = int(os.environ.get('TIMEOUT', '120'))
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', '180'))
+
+
+def when_ready(server):
+    # Everything loaded so far is shared with the workers; move it out of the
+    # garbage collector's reach so collections don't touch (and copy) those pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    app_module = _app_module()
+    if hasattr(app_module, 'post_fork'):
+        app_module.post_fork()
+
+
+def worker_exit(server, worker):
+    app_module = _app_module()
+    if hasattr(app_module, 'worker_exit'):
+        app_module.worker_exit()
+
+
+def _app_module():
+    return sys.modules.get(wsgi_app.split(':')[0])
@@ -0,0 +1,159 @@
+"""
+Budgeted hyperparameter search for the ensemble members
+
+The random forest, gradient boosting and SVM settings used to be
+hard-coded or library defaults. search_member() tunes one member with
+successive halving (scikit-learn's HalvingRandomSearchCV). Many random
+candidates are scored by cross-validated ROC AUC on a small share of the
+training subjects. Only the best third move on to the next round, which
+has three times the data. This repeats until the survivors have used the
+whole training set. Most of the budget therefore goes to promising
+settings, and the folds of each round run in parallel across cores.
+
+Screening predicts one subject at a time, so an accurate but slow member
+costs every session. The best survivors of the last round (up to
+LATENCY_FINALISTS) are then fitted on the whole split one after another.
+Each is timed on its own while nothing else runs, since timing them during
+the parallel rounds would mostly measure CPU contention. The winner
+maximises
+
+    objective = ROC AUC - latency_weight * single-sample latency (ms)
+
+where the latency is the median time of predict_proba on one row. The
+winner is returned already fitted, so training does not fit it again. Its
+settings, AUC, latency and objective go into the training report saved
+with the model bundle.
+
+Run this over the cached feature matrix (feature_cache.py), so a sweep
+does not re-extract features.
+"""
+
+import importlib
+import time
+
+import numpy as np
+
+from lazy_import import LazyModule
+
+sklearn_base = LazyModule('sklearn.base')
+sklearn_model_selection = LazyModule('sklearn.model_selection')
+scipy_stats = LazyModule('scipy.stats')
+
+LATENCY_WEIGHT = 0.002  # AUC given up per millisecond of single-sample latency
+LATENCY_REPEATS = 15
+N_CANDIDATES = 48  # Settings sampled for the first round
+LATENCY_FINALISTS = 5  # Last-round survivors fitted and timed for the latency trade-off
+MIN_RESOURCES = 60  # Fewest training subjects a candidate is scored on (calibrated members cross-validate again inside)
+
+
+def search_spaces():
+    """Parameter distributions per member (the models of train_enhanced_models and train_all_models)"""
+    return {
+        'RandomForest': {
+            'n_estimators': [50, 100, 200, 300, 400],
+            'max_depth': [None, 6, 10, 15, 25],
+            'min_samples_split': [2, 5, 10],
+            'min_samples_leaf': [1, 2, 4],
+            'max_features': ['sqrt', 'log2', None],
+        },
+        'GradientBoosting': {
+            'n_estimators': [50, 100, 150, 250],
+            'learning_rate': scipy_stats.loguniform(0.01, 0.3),
+            'max_depth': [2, 3, 4, 6],
+            'min_samples_split': [2, 5, 10],
+            'subsample': [0.6, 0.8, 1.0],
+        },
+        'SVM': {
+            'C': scipy_stats.loguniform(0.1, 100),
+            'gamma': ['scale', 'auto', 0.001, 0.01, 0.1, 1.0],
+            'kernel': ['rbf'],
+        },
+    }
+
+
+def prefixed(space, prefix):
+    """Parameter space addressed to a nested estimator (e.g. 'estimator__' inside CalibratedClassifierCV)"""
+    return {prefix + name: values for name, values in space.items()}
+
+
+def single_sample_latency(estimator, X, repeats=LATENCY_REPEATS):
+    """Median seconds of predict_proba on one row, after one warm-up call"""
+    row = np.asarray(X[:1])
+    estimator.predict_proba(row)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        estimator.predict_proba(row)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def search_member(name, estimator, space, X, y, latency_weight=LATENCY_WEIGHT, n_jobs=-1, n_candidates=N_CANDIDATES, factor=3, cv=3, random_state=42):
+    """
+    Tune one member with successive halving
+
+    Args:
+        name: Member name (for the report)
+        estimator: Unfitted scikit-learn estimator
+        space: Parameter distributions (see search_spaces, prefixed)
+        X, y: Training split (scaled features)
+        n_jobs: Parallel fits during the rounds (-1: all cores)
+        n_candidates: Settings sampled for the first round. The first round's share of X is chosen
+            so the last round's survivors train on all of it, but never below MIN_RESOURCES subjects.
+        factor: Candidates kept per round is 1/factor, and the data per candidate grows by factor
+
+    Returns:
+        (winner fitted on X, y; report entry)
+    """
+    importlib.import_module('sklearn.experimental.enable_halving_search_cv')  # Registers HalvingRandomSearchCV
+
+    start = time.perf_counter()
+    rounds = int(np.ceil(np.log(n_candidates) / np.log(factor)))
+    min_resources = max(min(len(X), MIN_RESOURCES), len(X) // factor ** rounds)
+    search = sklearn_model_selection.HalvingRandomSearchCV(
+        estimator, space, n_candidates=n_candidates, factor=factor, cv=cv, scoring='roc_auc',
+        n_jobs=n_jobs, random_state=random_state, min_resources=min_resources, error_score=np.nan, refit=False)
+    search.fit(X, y)
+
+    # Latency trade-off among the last round's best, timed here with the pool idle
+    results = search.cv_results_
+    last = np.flatnonzero(results['iter'] == results['iter'].max())
+    auc = np.nan_to_num(results['mean_test_score'], nan=-np.inf)
+    finalists = last[np.argsort(-auc[last], kind='stable')][:LATENCY_FINALISTS]
+    best, best_entry = None, None
+    for i in finalists:
+        model = sklearn_base.clone(estimator).set_params(**results['params'][i]).fit(X, y)
+        latency_ms = 1000 * single_sample_latency(model, X)
+        objective = float(auc[i]) - latency_weight * latency_ms
+        if best_entry is None or objective > best_entry['objective']:
+            best = model
+            best_entry = {'params': results['params'][i], 'cv_auc': float(auc[i]), 'latency_ms': round(latency_ms, 3), 'objective': objective}
+    entry = {
+        'best_params': {k: (v.item() if isinstance(v, np.generic) else v) for k, v in best_entry['params'].items()},
+        'cv_auc': best_entry['cv_auc'],
+        'latency_ms': best_entry['latency_ms'],
+        'objective': best_entry['objective'],
+        'finalists': int(len(finalists)),
+        'n_candidates': [int(n) for n in search.n_candidates_],
+        'n_resources': [int(n) for n in search.n_resources_],
+        'search_seconds': round(time.perf_counter() - start, 2),
+    }
+    print(f"   {name}: objective {entry['objective']:.3f} (AUC {entry['cv_auc']:.3f}, {entry['latency_ms']:.2f} ms/sample), "
+          f"{sum(entry['n_candidates'])} fits over {len(entry['n_candidates'])} rounds, {entry['best_params']}")
+    return best, entry
+
+
+def search_members(estimators, X, y, latency_weight=LATENCY_WEIGHT, n_jobs=-1, n_candidates=N_CANDIDATES):
+    """
+    Tune several members one after another (each search parallel across cores)
+
+    Args:
+        estimators: {name: (unfitted estimator, parameter space)}
+
+    Returns:
+        ({name: winner fitted on X, y}, search report for the training report)
+    """
+    tuned, report = {}, {'latency_weight': latency_weight, 'members': {}}
+    for name, (estimator, space) in estimators.items():
+        tuned[name], report['members'][name] = search_member(name, estimator, space, X, y, latency_weight, n_jobs, n_candidates)
+    return tuned, report
@@ -0,0 +1,60 @@
+"""
+Deferred imports for heavy dependencies
+
+TensorFlow, MediaPipe, OpenCV, matplotlib, scikit-learn and pandas together
+take several seconds to import. Modules bind them as LazyModule proxies at
+the top of the file instead, and the real import happens on first attribute
+access. Import times are recorded in IMPORT_TIMES so /api/health can report
+them.
+"""
+
+import importlib
+import sys
+import threading
+import time
+
+IMPORT_TIMES = {}
+_lock = threading.RLock()
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, name, on_load=None):
+        self._name = name
+        self._on_load = on_load
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    self._module = load(self._name, self._on_load)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<LazyModule '{self._name}' ({state})>"
+
+
+def load(name, on_load=None):
+    """Import a module now, recording how long the first import took"""
+    with _lock:
+        module = sys.modules.get(name)
+        if module is not None and name in IMPORT_TIMES:
+            return module
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        if on_load is not None:
+            on_load(module)
+        IMPORT_TIMES.setdefault(name, round(time.perf_counter() - start, 3))
+        return module
+
+
+def preload(*names):
+    """Import several modules ahead of first use (e.g. from a warm-up thread)"""
+    for name in names:
+        load(name)
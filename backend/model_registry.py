@@ -0,0 +1,165 @@
+"""
+Process-wide registry of loaded model bundles
+
+Models are loaded once when the server starts and shared by every session.
+The registry watches the autism_models/ directory and, when a new bundle
+appears, loads it next to the current one and swaps it in atomically:
+sessions already running keep the bundle they started with, new sessions
+get the new version.
+"""
+
+import hashlib
+import pathlib
+import threading
+import time
+from collections import OrderedDict
+
+BUNDLE_FILES = ('scaler.pkl', 'feature_names.pkl', 'DNN.keras', 'ensemble.json')
+
+
+def bundle_fingerprint(models_dir):
+    """Cheap change detector: name, size and mtime of every file in the bundle directory"""
+    p = pathlib.Path(models_dir)
+    if not p.exists():
+        return None
+    entries = []
+    for f in sorted(p.iterdir()):
+        if f.is_file():
+            st = f.stat()
+            entries.append((f.name, st.st_size, st.st_mtime_ns))
+    return tuple(entries)
+
+
+def bundle_version(models_dir):
+    """Content hash of the bundle files, used as the bundle version id"""
+    p = pathlib.Path(models_dir)
+    digest = hashlib.sha256()
+    for f in sorted(p.iterdir()):
+        if f.is_file() and (f.suffix == '.pkl' or f.name in BUNDLE_FILES):
+            digest.update(f.name.encode())
+            with open(f, 'rb') as fh:
+                for chunk in iter(lambda: fh.read(1 << 20), b''):
+                    digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class ModelRegistry:
+    """Holds the active model bundle, keyed by version, with hot-swap on change"""
+
+    def __init__(self, models_dir, loader, keep_versions=2):
+        """
+        Args:
+            models_dir: Directory holding the bundle files
+            loader: Callable (models_dir, version) -> bundle, or None if nothing to load
+            keep_versions: How many recently active bundles to keep for lookup by version
+        """
+        self.models_dir = pathlib.Path(models_dir)
+        self.loader = loader
+        self.keep_versions = keep_versions
+        self._bundles = OrderedDict()
+        self._active_version = None
+        self._fingerprint = None
+        self._pending_fingerprint = None
+        self._load_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self.loaded_at = None
+        self.load_seconds = None
+        self.last_error = None
+
+    @property
+    def version(self):
+        return self._active_version
+
+    def current(self):
+        """Return the active bundle, loading it on first use"""
+        bundle = self._active()
+        if bundle is None:
+            self.refresh(force=True)
+            bundle = self._active()
+        return bundle
+
+    def get(self, version):
+        with self._swap_lock:
+            return self._bundles.get(version)
+
+    def versions(self):
+        with self._swap_lock:
+            return list(self._bundles.keys())
+
+    def refresh(self, force=False):
+        """
+        Load the bundle on disk if it changed since the last load
+
+        Outside of a forced refresh, a change must look the same on two
+        consecutive checks before it is loaded, so a bundle that is still
+        being written is never picked up half-way.
+
+        Returns:
+            True if a new bundle was swapped in
+        """
+        with self._load_lock:
+            fingerprint = bundle_fingerprint(self.models_dir)
+            if fingerprint is None or fingerprint == self._fingerprint:
+                self._pending_fingerprint = None
+                return False
+            if not force and fingerprint != self._pending_fingerprint:
+                self._pending_fingerprint = fingerprint
+                return False
+            self._pending_fingerprint = None
+
+            # Remember the fingerprint even if loading fails, so a broken bundle is retried
+            # only once its files change again rather than on every request
+            self._fingerprint = fingerprint
+            start = time.time()
+            try:
+                version = bundle_version(self.models_dir)
+                bundle = self.get(version) or self.loader(self.models_dir, version)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"❌ Failed to load model bundle from {self.models_dir}: {e}")
+                return False
+            if bundle is None:
+                return False
+
+            with self._swap_lock:
+                self._bundles[version] = bundle
+                self._bundles.move_to_end(version)
+                while len(self._bundles) > self.keep_versions:
+                    self._bundles.popitem(last=False)
+                previous = self._active_version
+                self._active_version = version
+            self.loaded_at = time.time()
+            self.load_seconds = round(self.loaded_at - start, 3)
+            self.last_error = None
+            if previous != version:
+                print(f"✅ Model bundle {version} active (loaded in {self.load_seconds}s, previous: {previous})")
+            return previous != version
+
+    def start_watcher(self, interval=10.0):
+        """Poll the models directory in a daemon thread and hot-swap new bundles"""
+        if self._watcher is not None:
+            return
+        def watch():
+            while not self._stop.wait(interval):
+                self.refresh()
+        self._watcher = threading.Thread(target=watch, name='model-registry-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+
+    def info(self):
+        return {
+            'version': self._active_version,
+            'versions': self.versions(),
+            'models_dir': str(self.models_dir),
+            'loaded_at': self.loaded_at,
+            'load_seconds': self.load_seconds,
+            'last_error': self.last_error,
+        }
+
+    def _active(self):
+        with self._swap_lock:
+            return self._bundles.get(self._active_version)
@@ -0,0 +1,223 @@
+"""
+Parallel per-subject feature extraction
+
+Training feature extraction runs subject by subject on one core. The
+enhanced extractor (Savitzky-Golay, ConvexHull, histogram2d, welch) is the
+slowest part. extract_features() spreads the subjects of a SubjectTable
+(see training_data.py) across a process pool.
+
+The gaze columns are copied once into a shared memory block that every
+worker maps. A task is a batch of subjects' row ranges, a few integers,
+instead of a pickled DataFrame. Each worker runs the extractor on zero-copy
+views of its batch. Batches are returned in subject order whatever order
+they finish in, so the feature matrix is identical to a sequential run.
+
+stream_features() does the same for a file streamed as a sequence of
+tables (training_data.iter_subject_tables). One pool serves the whole
+stream, and the extractor is sent to each worker once. Each table's gaze
+columns are copied into a shared memory block of their own, and the task
+is the block's name plus the table's row ranges, labels and subject ids.
+The block is released as soon as its result is collected. At most a few
+tables are in flight, so memory stays bounded however large the file is.
+
+Extractors are picklable callables taking a SubjectTable and returning
+(X, labels, subject_ids) for the subjects they keep, like
+training_data.basic_features. SubjectFeatures adapts a per-subject
+extractor that returns a feature dict.
+"""
+
+import itertools
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from training_data import MIN_SAMPLES, SubjectTable
+
+COLUMNS = ('x', 'y', 'timestamp')
+
+# Per-process state, set by the pool initializer
+_worker_columns = None
+_worker_extractor = None
+_worker_shm = None
+
+
+class SubjectFeatures:
+    """Adapts a per-subject extractor (column views -> feature dict) to the batch extractor interface"""
+
+    def __init__(self, extractor, feature_names, min_samples=MIN_SAMPLES):
+        self.extractor = extractor
+        self.feature_names = tuple(feature_names)
+        self.min_samples = min_samples
+
+    def __call__(self, table):
+        rows, keep = [], []
+        for i in range(len(table)):
+            if table.lengths[i] < self.min_samples:
+                continue
+            features = self.extractor(table.subject(i))
+            if features:
+                rows.append([features.get(name, 0) for name in self.feature_names])
+                keep.append(i)
+        X = np.array(rows, dtype=np.float64).reshape(len(rows), len(self.feature_names))
+        return X, table.label[keep], table.subject_ids[keep]
+
+
+def _init_worker(shm_name, rows, extractor):
+    global _worker_columns, _worker_extractor, _worker_shm
+    # Spawned workers share the parent's resource tracker, which forgets the block when the parent unlinks it
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    block = np.ndarray((len(COLUMNS), rows), dtype=np.float64, buffer=_worker_shm.buf)
+    _worker_columns = dict(zip(COLUMNS, block))
+    _worker_extractor = extractor
+
+
+def _batch_table(columns, starts, stops, labels, subject_ids):
+    """SubjectTable over one contiguous batch of subjects (views into the shared columns)"""
+    first, last = starts[0], stops[-1]
+    return SubjectTable(subject_ids, starts - first, stops - first,
+                        columns['x'][first:last], columns['y'][first:last], columns['timestamp'][first:last], labels)
+
+
+def _run_batch(starts, stops, labels, subject_ids):
+    return _worker_extractor(_batch_table(_worker_columns, starts, stops, labels, subject_ids))
+
+
+def _batches(table, count):
+    """Split subject indices into about `count` contiguous batches of similar row totals"""
+    bounds = np.searchsorted(np.cumsum(table.lengths), np.linspace(0, table.stops[-1], count + 1)[1:-1], side='right')
+    edges = np.unique(np.concatenate(([0], bounds, [len(table)])))
+    return [slice(a, b) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def extract_features(table, extractor, workers=None, batches_per_worker=4, min_rows_per_worker=200_000):
+    """
+    Run extractor over the subjects of table in worker processes
+
+    Args:
+        table: SubjectTable (training_data.load_subjects)
+        extractor: Picklable callable SubjectTable -> (X, labels, subject_ids)
+        workers: Worker processes (default: all cores); 1 runs in this process
+        batches_per_worker: Smaller batches balance uneven subjects better, larger ones cost less overhead
+        min_rows_per_worker: Fewer workers are started for small tables, where process start-up
+            would cost more than it saves
+
+    Returns:
+        (X, labels, subject_ids) in subject order, identical to extractor(table)
+    """
+    rows = int(table.stops[-1]) if len(table) else 0
+    workers = min(workers or os.cpu_count() or 1, rows // max(1, min_rows_per_worker))
+    if workers <= 1 or len(table) < 2:
+        return extractor(table)
+    batches = _batches(table, workers * batches_per_worker)
+    shm = shared_memory.SharedMemory(create=True, size=len(COLUMNS) * rows * 8)
+    block = np.ndarray((len(COLUMNS), rows), dtype=np.float64, buffer=shm.buf)
+    try:
+        for i, name in enumerate(COLUMNS):
+            block[i] = getattr(table, name)
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches)), mp_context=context,
+                                 initializer=_init_worker, initargs=(shm.name, rows, extractor)) as pool:
+            # map() yields results in submission (subject) order
+            results = list(pool.map(_run_batch, *zip(*((table.starts[b], table.stops[b], table.label[b], table.subject_ids[b]) for b in batches))))
+    finally:
+        del block  # Release the buffer export so the block can be closed
+        shm.close()
+        shm.unlink()
+    return _concatenate(results)
+
+
+def _concatenate(results):
+    return tuple(np.concatenate([r[i] for r in results]) for i in range(3))
+
+
+def _init_stream_worker(extractor):
+    global _worker_extractor
+    _worker_extractor = extractor
+
+
+def _share_columns(table):
+    """Copy a table's gaze columns into a new shared memory block (the caller closes and unlinks it)"""
+    rows = len(table.x)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(COLUMNS) * rows * 8))
+    block = np.ndarray((len(COLUMNS), rows), dtype=np.float64, buffer=shm.buf)
+    for i, name in enumerate(COLUMNS):
+        block[i] = getattr(table, name)
+    return shm
+
+
+def _run_shared_table(shm_name, rows, starts, stops, labels, subject_ids):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    block = np.ndarray((len(COLUMNS), rows), dtype=np.float64, buffer=shm.buf)
+    try:
+        return _worker_extractor(SubjectTable(subject_ids, starts, stops, *block, labels))  # Rows of block: x, y, timestamp
+    finally:
+        del block  # Release the buffer export so the block can be closed
+        try:
+            shm.close()
+        except BufferError:
+            pass  # The extractor raised and its traceback still holds views; the mapping goes with the worker
+
+
+def _release(shm):
+    shm.close()
+    shm.unlink()
+
+
+def stream_features(tables, extractor, workers=None, max_pending=None, **kwargs):
+    """
+    Run extractor over a stream of SubjectTables in worker processes
+
+    Args:
+        tables: Iterable of SubjectTables (training_data.iter_subject_tables)
+        extractor: Picklable callable SubjectTable -> (X, labels, subject_ids)
+        workers: Worker processes (default: all cores); 1 runs in this process
+        max_pending: Tables submitted but not yet collected (default: 2 per worker)
+        kwargs: Passed to extract_features() when the stream holds a single table
+
+    Returns:
+        (X, labels, subject_ids) in stream order
+    """
+    tables = iter(tables)
+    head = list(itertools.islice(tables, 2))
+    if not head:
+        return extractor(SubjectTable(np.empty(0), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64),
+                                      np.empty(0), np.empty(0), np.empty(0), np.empty(0)))
+    if len(head) == 1:
+        return extract_features(head[0], extractor, workers=workers, **kwargs)  # Small file: shared-memory split
+    tables = itertools.chain(head, tables)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        return _concatenate([extractor(table) for table in tables])
+    max_pending = max_pending or 2 * workers
+    results, pending = [], deque()  # pending: (future, shared memory block) of submitted tables
+
+    def collect():
+        future, shm = pending.popleft()  # Oldest first keeps stream order
+        try:
+            results.append(future.result())
+        finally:
+            _release(shm)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_stream_worker, initargs=(extractor,)) as pool:
+            for table in tables:
+                shm = _share_columns(table)
+                try:
+                    future = pool.submit(_run_shared_table, shm.name, len(table.x), table.starts, table.stops, table.label, table.subject_ids)
+                except BaseException:
+                    _release(shm)
+                    raise
+                pending.append((future, shm))
+                if len(pending) >= max_pending:
+                    collect()
+            while pending:
+                collect()
+    finally:
+        for _, shm in pending:
+            _release(shm)
+    return _concatenate(results)
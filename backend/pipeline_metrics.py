@@ -0,0 +1,151 @@
+"""
+Latency and throughput metrics for the screening pipeline
+
+Each stage of a screening session (capture read, colour conversion, face
+mesh, gaze mapping, overlay rendering, prediction, visual report, PDF) records
+its duration into a histogram. /api/metrics renders everything in the
+Prometheus text exposition format, so a scraper or a plain curl shows where
+the per-frame budget goes under load.
+
+Metrics are per process: batch screening workers keep their own.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-frame stages are a few ms; prediction, reports and PDFs can take seconds
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.02, 0.035, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FPS_BUCKETS = (1, 5, 10, 15, 20, 25, 30, 45, 60)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple((name, labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, label_names=()):
+        super().__init__(name, documentation, label_names)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        return [f'{self.name}{_format_labels(key)} {_format_value(value)}' for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=STAGE_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [per-bucket counts (last one is +Inf), sum]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def _samples(self):
+        lines = []
+        for key, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(key + (("le", _format_value(bound)),))} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {total!r}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {cumulative}')
+        return lines
+
+
+STAGE_SECONDS = Histogram('screening_stage_seconds', 'Time spent in each screening pipeline stage', ('stage',))
+FRAMES = Counter('screening_frames_total', 'Frames run through face mesh', ('source',))
+FACE_LOST = Counter('screening_face_lost_frames_total', 'Frames where no face or eye offset was found', ('source',))
+FACE_ROI_FRAMES = Counter('screening_face_roi_frames_total', 'Face mesh runs by input: tracked face crop or full-frame search', ('mode',))
+GAZE_INTERPOLATED = Counter('screening_gaze_interpolated_total', 'Gaze samples predicted instead of measured while face mesh was throttled', ('source',))
+FACE_MESH_STRIDE = Gauge('screening_face_mesh_stride', 'Face mesh currently runs on every Nth captured frame', ('source',))
+SESSIONS_IN_FLIGHT = Gauge('screening_sessions_in_flight', 'Screening sessions currently processing frames', ('source',))
+SESSION_FPS = Histogram('screening_session_fps', 'Achieved frames per second over a finished session', ('source',), buckets=FPS_BUCKETS)
+LAST_SESSION_FPS = Gauge('screening_last_session_fps', 'Achieved frames per second of the most recently finished session', ('source',))
+
+REGISTRY = [STAGE_SECONDS, FRAMES, FACE_LOST, FACE_ROI_FRAMES, GAZE_INTERPOLATED, FACE_MESH_STRIDE, SESSIONS_IN_FLIGHT, SESSION_FPS, LAST_SESSION_FPS]
+
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+@contextmanager
+def stage_timer(stage):
+    """Record the duration of the enclosed block under the given stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def session_finished(source, frames, seconds):
+    """Record the achieved frame rate of a finished session"""
+    if frames and seconds > 0:
+        fps = frames / seconds
+        SESSION_FPS.observe(fps, source=source)
+        LAST_SESSION_FPS.set(round(fps, 3), source=source)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
@@ -10,6 +10,8 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from datetime import datetime
 import os
+import re
+import uuid
 
 class ASDScreeningReportGenerator:
     def __init__(self):
@@ -471,8 +473,17 @@ class ASDScreeningReportGenerator:
         return elements
 
 
+def report_filename(patient_info):
+    """Build the PDF filename for a patient's report"""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    # Only file-name-safe characters: the name also becomes the report job id and its snapshot file
+    patient_name = re.sub(r'[^A-Za-z0-9_.-]', '_', str(patient_info.get('name') or 'Unknown')).strip('.') or 'Unknown'
+    # Random suffix: two sessions for the same patient can finish within the same second
+    return f"ASD_Screening_Report_{patient_name}_{timestamp}_{uuid.uuid4().hex[:8]}.pdf"
+
+
 # Convenience function
-def generate_screening_report(result_data, patient_info, output_dir='reports'):
+def generate_screening_report(result_data, patient_info, output_dir='reports', image_path=None, filename=None):
     """
     Generate a screening report PDF
     
@@ -480,6 +491,8 @@ def generate_screening_report(result_data, patient_info, output_dir='reports'):
         result_data: Screening results dictionary
         patient_info: Patient information dictionary
         output_dir: Directory to save the report
+        image_path: Visual report image for this session (defaults to Screening_Report.png)
+        filename: PDF filename (defaults to report_filename(patient_info))
     
     Returns:
         Path to generated PDF file
@@ -490,18 +503,19 @@ def generate_screening_report(result_data, patient_info, output_dir='reports'):
     os.makedirs(output_dir, exist_ok=True)
     
     # Generate filename
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    patient_name = patient_info.get('name', 'Unknown').replace(' ', '_')
-    filename = f"ASD_Screening_Report_{patient_name}_{timestamp}.pdf"
+    filename = filename or report_filename(patient_info)
     output_path = os.path.join(output_dir, filename)
     
     # Get image path if it exists
-    image_path = os.path.join(os.path.dirname(__file__), 'Screening_Report.png')
+    if image_path is None:
+        image_path = os.path.join(os.path.dirname(__file__), 'Screening_Report.png')
     if not os.path.exists(image_path):
         image_path = None
     
-    # Generate report
+    # Build into a temporary file and rename, so a download never sees a half-written PDF
+    partial_path = output_path + '.part'
     generator = ASDScreeningReportGenerator()
-    generator.generate_report(result_data, patient_info, output_path, image_path)
+    generator.generate_report(result_data, patient_info, partial_path, image_path)
+    os.replace(partial_path, output_path)
     
     return output_path
@@ -1,73 +1,168 @@
+import time
+_IMPORT_START = time.perf_counter()
+
 from flask import Flask, request, jsonify, Response, send_file
 from flask_cors import CORS
 import base64
-import io
-import numpy as np
-from PIL import Image
+import binascii
+import importlib.util
+import math
 import sys
 import os
 import traceback
-import cv2
-import time
-import json as json_module
-from threading import Thread, Lock
-import json
+import shutil
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:  # Windows: a single server process, the thread lock is enough
+    fcntl = None
+
 # Add the backend directory to the path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# Force reload of modules to pick up changes
-import importlib
+from screening_jobs import JobManager, JOB_COMPLETED, JOB_FAILED
+from frame_ingest import FrameIngestManager, IngestError, iter_stream_frames
+from model_registry import ModelRegistry
+import batch_screening
+import lazy_import
+import pipeline_metrics
+import result_encoding
+import stimulus
 
-# Try to import the screening system and report generator
+# Try to import the screening system and report generator.
+# TensorFlow, MediaPipe, OpenCV and ReportLab are only imported on first use
+# (see lazy_import.py); the warm-up thread below loads them in the background.
 try:
-    import ASD_Detection_backup
-    importlib.reload(ASD_Detection_backup)  # Force reload to get latest changes
-    from ASD_Detection_backup import AutismScreeningSystem
-    from report_generator import generate_screening_report
+    from ASD_Detection_backup import AutismScreeningSystem, FaceMeshPool, ModelBundle
     IMPORT_ERROR = None
-    REPORT_GENERATOR_AVAILABLE = True
-except ImportError as e:
-    if 'report_generator' in str(e):
-        print(f"Warning: Report generator not available: {e}")
-        print("Install reportlab: pip install reportlab")
-        REPORT_GENERATOR_AVAILABLE = False
-        import ASD_Detection_backup
-        importlib.reload(ASD_Detection_backup)  # Force reload to get latest changes
-        from ASD_Detection_backup import AutismScreeningSystem
-        IMPORT_ERROR = None
-    else:
-        AutismScreeningSystem = None
-        REPORT_GENERATOR_AVAILABLE = False
 except Exception as e:
-    AutismScreeningSystem = None
-    REPORT_GENERATOR_AVAILABLE = False
+    AutismScreeningSystem = FaceMeshPool = ModelBundle = None
     IMPORT_ERROR = str(e)
     print(f"WARNING: Failed to import AutismScreeningSystem: {e}")
     print("The server will start but screening functionality will not work.")
-    print("\nTo fix this:")
-    print("1. Install Visual C++ Redistributable: https://aka.ms/vs/17/release/vc_redist.x64.exe")
-    print("2. Reinstall mediapipe: pip uninstall mediapipe && pip install mediapipe")
-    print("3. Or use Python 3.10 instead of 3.11 if issues persist")
+
+REPORT_GENERATOR_AVAILABLE = importlib.util.find_spec('reportlab') is not None
+if REPORT_GENERATOR_AVAILABLE:
+    report_generator = lazy_import.LazyModule('report_generator')
+else:
+    print("Warning: Report generator not available: reportlab is not installed")
+    print("Install reportlab: pip install reportlab")
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Global variables
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BACKEND_DIR, 'autism_models')
+TRAINING_CSV = os.path.join(BACKEND_DIR, 'srijan_features_only_with_groups.csv')
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', '10'))  # Seconds between bundle checks (0 disables hot-swap)
+
+# Shared screening engine: models come from the process-wide registry, plus a FaceMesh pool.
+# All per-session state lives in ScreeningSession objects owned by each job.
+model_registry = None
 screening_system = None
-current_frame = None
-frame_lock = Lock()
-screening_active = False
-screening_result = None
-screening_phase = "idle"  # idle, calibration, screening, completed
-calibration_done = False
+
+# Screening sessions run on a worker pool; requests only submit and poll jobs
+SCREENING_WORKERS = int(os.environ.get('SCREENING_WORKERS', '4'))
+REPORTS_DIR = os.path.join(BACKEND_DIR, 'reports')
+MAX_JOB_WAIT = 60  # Longest a client may block on a job per request (seconds)
+# PDF reports are built on their own queue so the verdict never waits on ReportLab
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', '1'))
+REPORT_PENDING, REPORT_READY, REPORT_FAILED = 'pending', 'ready', 'failed'
+# Shared job snapshots let any server process answer for a job started in another (see gunicorn.conf.py)
+JOB_STATE_DIR = os.environ.get('JOB_STATE_DIR')
+# Set by gunicorn.conf.py: models are loaded in the master process and shared copy-on-write by the forked workers
+PRELOAD_MODELS = os.environ.get('SCREENING_PRELOAD') == '1'
+
+def _job_state_dir(name):
+    return os.path.join(JOB_STATE_DIR, name) if JOB_STATE_DIR else None
+
+# Report jobs use the PDF filename as their job id, so a report's status can be found from its filename alone
+report_jobs = JobManager(max_workers=REPORT_WORKERS, name='report', state_dir=_job_state_dir('report'), serialize=result_encoding.to_builtin)
+batch_lock = threading.Lock()  # One batch at a time; each batch already uses every core
+# Server-side "video_paths" for batch screening must lie inside this directory; unset, only uploads are accepted
+BATCH_VIDEO_ROOT = os.environ.get('BATCH_VIDEO_ROOT')
+# The server has one webcam and one 'Autism Screening' window, so sessions that use either take turns;
+# headless video-file jobs run concurrently (use browser frame ingest for several kiosks).
+# Across server processes (gunicorn workers) the turn is taken with a file lock in JOB_STATE_DIR.
+local_device_lock = threading.Lock()
+LOCAL_DEVICE_LOCK_FILE = os.path.join(JOB_STATE_DIR, 'local_device.lock') if JOB_STATE_DIR else None
+screening_jobs = JobManager(max_workers=SCREENING_WORKERS, state_dir=_job_state_dir('screening'), serialize=result_encoding.to_builtin)
+
+# Browser frame ingest: sessions stream webcam frames instead of the server opening a camera
+INGEST_MAX_SESSIONS = int(os.environ.get('INGEST_MAX_SESSIONS', '16'))
+INGEST_MAX_PENDING = int(os.environ.get('INGEST_MAX_PENDING', '2'))
+frame_ingest = None
+if FaceMeshPool is not None:
+    frame_ingest = FrameIngestManager(FaceMeshPool(size=INGEST_MAX_SESSIONS), max_sessions=INGEST_MAX_SESSIONS, max_pending=INGEST_MAX_PENDING, state_dir=_job_state_dir('ingest'))
+
+# Cold-start timings reported by /api/health
+STARTUP = {'import_seconds': None, 'ready_seconds': None, 'warm_up_thread': None}
+
+def _load_vision_and_models():
+    """Import the vision stack and load the model bundle. Returns False if the imports failed."""
+    global IMPORT_ERROR
+    try:
+        lazy_import.preload('cv2', 'mediapipe')
+    except Exception as e:
+        IMPORT_ERROR = str(e)
+        print(f"WARNING: Failed to import the vision stack: {e}")
+        print("The server will start but screening functionality will not work.")
+        print("\nTo fix this:")
+        print("1. Install Visual C++ Redistributable: https://aka.ms/vs/17/release/vc_redist.x64.exe")
+        print("2. Reinstall mediapipe: pip uninstall mediapipe && pip install mediapipe")
+        print("3. Or use Python 3.10 instead of 3.11 if issues persist")
+        return False
+    print(f"Looking for models in: {MODELS_DIR}")
+    if model_registry.current() is None:
+        print("⚠️ No model bundle loaded. Check if model files exist in backend/autism_models/")
+    STARTUP['ready_seconds'] = round(time.perf_counter() - _IMPORT_START, 3)
+    return True
+
+def _warm_up():
+    """Load everything without blocking server startup, then watch for new bundles"""
+    if _load_vision_and_models() and MODEL_WATCH_INTERVAL > 0:
+        model_registry.start_watcher(MODEL_WATCH_INTERVAL)
+
+def _warm_start():
+    """Create the shared screening system and load models in a background warm-up thread"""
+    global model_registry, screening_system
+    model_registry = ModelRegistry(MODELS_DIR, loader=ModelBundle.load)
+    screening_system = AutismScreeningSystem(TRAINING_CSV, face_mesh_pool=FaceMeshPool(size=SCREENING_WORKERS), registry=model_registry)
+    if PRELOAD_MODELS:
+        # Load synchronously and start no threads: this runs in the gunicorn master right before it forks
+        _load_vision_and_models()
+        return
+    warm_up = threading.Thread(target=_warm_up, name='warm-up', daemon=True)
+    warm_up.start()
+    STARTUP['warm_up_thread'] = warm_up
+
+def post_fork():
+    """Per-worker setup after a preloaded master forks (called from gunicorn.conf.py)"""
+    if model_registry is not None and not IMPORT_ERROR and MODEL_WATCH_INTERVAL > 0:
+        model_registry.start_watcher(MODEL_WATCH_INTERVAL)
+
+def worker_exit():
+    """Let running screenings and reports finish before a worker is recycled (called from gunicorn.conf.py)"""
+    if model_registry is not None:
+        model_registry.stop_watcher()
+    screening_jobs.shutdown(wait=True)
+    report_jobs.shutdown(wait=True)
+
+# Run directly (python screening_api.py), this script is re-imported as __mp_main__ by every spawned
+# batch screening worker; those load their own bundle (batch_screening._init_worker) and must not warm start
+if not IMPORT_ERROR and __name__ != '__mp_main__':
+    _warm_start()
+STARTUP['import_seconds'] = round(time.perf_counter() - _IMPORT_START, 3)
+
+def _system_ready():
+    return screening_system is not None and screening_system.is_trained
 
 @app.route('/api/initialize', methods=['POST'])
 def initialize():
-    """Initialize the screening system"""
-    global screening_system
-    
+    """Check the screening system is ready (models are loaded once at process start)"""
     # Check if import failed
     if IMPORT_ERROR:
         return jsonify({
@@ -77,55 +172,300 @@ def initialize():
         }), 500
     
     try:
-        # Use the CSV file from the backend directory
-        backend_dir = os.path.dirname(os.path.abspath(__file__))
-        csv_path = os.path.join(backend_dir, 'srijan_features_only_with_groups.csv')
-        
-        if not os.path.exists(csv_path):
-            return jsonify({'success': False, 'error': f'CSV file not found at {csv_path}'}), 404
-        
-        screening_system = AutismScreeningSystem(csv_path)
-        
-        # Load models from the autism_models directory
-        models_dir = os.path.join(backend_dir, 'autism_models')
-        print(f"Looking for models in: {models_dir}")
-        print(f"Models directory exists: {os.path.exists(models_dir)}")
-        
-        if os.path.exists(models_dir):
-            os.chdir(models_dir)
-        
-        models_loaded = screening_system.load_models()
-        print(f"Models loaded: {models_loaded}")
-        print(f"System is_trained: {screening_system.is_trained}")
-        
-        if not models_loaded:
+        if not _system_ready():
+            # Nothing loaded yet: try once more in case the bundle appeared after startup
+            model_registry.refresh(force=True)
+        if not _system_ready():
             return jsonify({
                 'success': False,
-                'error': 'Failed to load ML models. Check if model files exist in backend/autism_models/'
+                'error': 'Failed to load ML models. Check if model files exist in backend/autism_models/',
+                'models': model_registry.info()
             }), 500
         
-        return jsonify({'success': True, 'message': 'Screening system initialized'})
+        return jsonify({'success': True, 'message': 'Screening system initialized', 'model_version': model_registry.version})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e), 'traceback': traceback.format_exc()}), 500
 
+def _ingest_unavailable():
+    """Return an error response if browser ingest cannot be used, else None"""
+    if IMPORT_ERROR or frame_ingest is None:
+        return jsonify({'success': False, 'error': f'Cannot ingest frames: {IMPORT_ERROR}'}), 500
+    if not _system_ready():
+        return jsonify({'success': False, 'error': 'System not initialized'}), 400
+    return None
+
+def _number_field(data, key, default, cast=float, minimum=None):
+    """Optional numeric field of a request body; ValueError with a message for the client if it is not a valid number"""
+    value = data.get(key)
+    if value is None:
+        return default
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        number = cast(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f'"{key}" must be a number, got {value!r}') from None
+    if not math.isfinite(number) or (minimum is not None and number < minimum):
+        raise ValueError(f'"{key}" must be at least {minimum}, got {value!r}' if minimum is not None else f'"{key}" must be finite')
+    return number
+
+def _frame_timestamp(value):
+    """Capture time of a pushed frame in seconds, from milliseconds (None: use the arrival time)"""
+    try:
+        timestamp = _number_field({'timestamp': value}, 'timestamp', None)
+    except ValueError as e:
+        raise IngestError(str(e)) from None
+    return timestamp / 1000.0 if timestamp is not None else None
+
+def _get_ingest(session_id):
+    if frame_ingest is None:
+        raise IngestError(f'Unknown ingest session: {session_id}', status=404)
+    return frame_ingest.get(session_id)
+
+@app.errorhandler(IngestError)
+def handle_ingest_error(e):
+    return jsonify({'success': False, 'error': str(e)}), e.status
+
+@app.route('/api/ingest/start', methods=['POST'])
+def ingest_start():
+    """Open a browser frame-ingest screening session"""
+    unavailable = _ingest_unavailable()
+    if unavailable:
+        return unavailable
+    data = request.get_json(silent=True) or {}
+    try:
+        duration = _number_field(data, 'duration', 60, minimum=1)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    ingest = frame_ingest.start(screening_system, max_duration=duration, visual_report_path=_visual_report_path())
+    print(f"📡 Ingest session started: {ingest.session_id}")
+    return jsonify({
+        'success': True,
+        'session_id': ingest.session_id,
+        'frames_url': f'/api/ingest/{ingest.session_id}/frames',
+        'max_pending': INGEST_MAX_PENDING,
+        'duration': ingest.max_duration
+    }), 201
+
+@app.route('/api/ingest/<session_id>/frames', methods=['POST'])
+def ingest_frames(session_id):
+    """
+    Push webcam frames into an ingest session
+
+    Either a single image body (Content-Type image/jpeg or image/webp, capture time in
+    the X-Frame-Timestamp header, ms) or a chunked application/octet-stream body of
+    length-prefixed frames (see frame_ingest.iter_stream_frames).
+    """
+    ingest = _get_ingest(session_id)
+    if request.mimetype.startswith('image/'):
+        ingest.push(request.get_data(), _frame_timestamp(request.headers.get('X-Frame-Timestamp')))
+    else:
+        for payload, timestamp in iter_stream_frames(request.stream):
+            ingest.push(payload, timestamp)
+    return jsonify({'success': True, **ingest.stats()})
+
+@app.route('/api/ingest/<session_id>/calibrate', methods=['POST'])
+def ingest_calibrate(session_id):
+    """Calibrate on the next frame with a detected face (the browser shows the center target)"""
+    ingest = _get_ingest(session_id)
+    ingest.request_calibration()
+    return jsonify({'success': True, **ingest.stats()})
+
+@app.route('/api/ingest/<session_id>', methods=['GET'])
+def ingest_status(session_id):
+    return jsonify({'success': True, **_get_ingest(session_id).stats()})
+
+@app.route('/api/ingest/<session_id>/finish', methods=['POST'])
+def ingest_finish(session_id):
+    """Close an ingest session and queue its prediction as a screening job"""
+    _get_ingest(session_id)
+    ingest = frame_ingest.finish(session_id)
+    data = dict(request.get_json(silent=True) or {}, ingest=ingest)
+    job = screening_jobs.submit(_finish_ingest_job, data)
+    return jsonify({
+        'success': True,
+        'job_id': job.job_id,
+        'status': job.status,
+        'ingest': ingest.stats(),
+        'result_url': f'/api/screening_result/{job.job_id}',
+        'report_url': f'/api/screening_report/{job.job_id}'
+    }), 202
+
 @app.route('/api/process_frame', methods=['POST'])
 def process_frame():
-    """Process a single frame from the webcam (NOT USED - screening runs via run_live_screening)"""
-    # This endpoint is not used anymore since run_live_screening handles everything
-    return jsonify({
-        'success': False,
-        'error': 'This endpoint is deprecated. Use /api/start_screening instead which runs the full screening.'
-    }), 400
+    """Process a single base64 webcam frame for an ingest session (JSON form of /api/ingest/<id>/frames)"""
+    unavailable = _ingest_unavailable()
+    if unavailable:
+        return unavailable
+    data = request.get_json(silent=True) or {}
+    if 'session_id' not in data or 'image' not in data:
+        return jsonify({'success': False, 'error': 'session_id and image are required (start a session with /api/ingest/start)'}), 400
+    if not isinstance(data['image'], str):
+        return jsonify({'success': False, 'error': '"image" must be a base64 string or data URL'}), 400
+    image = data['image'].split(',', 1)[-1]  # Accept data URLs from canvas.toDataURL()
+    try:
+        payload = base64.b64decode(image, validate=True)
+    except (binascii.Error, ValueError):
+        return jsonify({'success': False, 'error': '"image" is not valid base64'}), 400
+    timestamp = _frame_timestamp(data.get('timestamp'))
+    ingest = _get_ingest(data['session_id'])
+    ingest.push(payload, timestamp)
+    return jsonify({'success': True, **ingest.stats()})
 
-@app.route('/api/start_screening', methods=['POST'])
-def start_screening():
-    """Start a new screening session - runs the full ASD_Detection screening"""
-    print("\n" + "!"*50)
-    print("!!! START_SCREENING ENDPOINT CALLED !!!")
-    print("!"*50 + "\n")
+def _run_screening_job(data):
+    """Run one screening session and build its result (executed on a job worker)"""
+    video_path = data.get('video_path', None)  # Optional: use video file instead of webcam
+    duration = data.get('duration', 60)  # Get duration from request, default 60 seconds
+    screening_type = data.get('screening_type', 'basic-asd')
+    
+    print("\n" + "="*50)
+    print("🎯 Starting ASD Screening Session")
+    print(f"System is_trained: {screening_system.is_trained}")
+    print(f"Video path: {video_path}")
+    print(f"Duration: {duration} seconds")
+    print(f"Screening type: {screening_type}")
+    print("="*50)
+    
+    # Each job gets its own session state; models and FaceMesh instances are shared
+    session = screening_system.new_session(visual_report_path=_visual_report_path())
     
-    global screening_system
+    # Run the actual screening (this will open fullscreen OpenCV window unless display is disabled)
+    # The visual and PDF reports are built in the background so the verdict is not held up
+    display = data.get('display', True)
+    def run():
+        return screening_system.run_live_screening(video_path=video_path, display=display, max_duration=duration, session=session, visual_report=False, frame_stride=data.get('frame_stride', 1), stimulus=data.get('stimulus', stimulus.DEFAULT_SCRIPT))
+    if display or not video_path:
+        with _local_device():
+            result = run()
+    else:
+        result = run()
     
+    return _build_job_result(result, data, duration, session)
+
+@contextmanager
+def _local_device():
+    """Hold the server's webcam and display: within this process, and across server processes when JOB_STATE_DIR is set"""
+    if local_device_lock.locked():
+        print("⏳ Waiting for the camera/display used by another session...")
+    with local_device_lock:
+        if LOCAL_DEVICE_LOCK_FILE is None or fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(LOCAL_DEVICE_LOCK_FILE), exist_ok=True)
+        with open(LOCAL_DEVICE_LOCK_FILE, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                print("⏳ Waiting for the camera/display used by another server process...")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _finish_ingest_job(data):
+    """Predict on a finished browser ingest session (executed on a job worker)"""
+    ingest = data['ingest']
+    print(f"\n🎯 Finishing ingest session {ingest.session_id}: {ingest.stats()}")
+    result = None
+    if ingest.session.measured_samples > 50:
+        result = screening_system.generate_final_prediction(ingest.session, visual_report=False)
+    return _build_job_result(result, data, round(ingest.elapsed, 1), ingest.session)
+
+def _visual_report_path():
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    return os.path.join(REPORTS_DIR, f"Screening_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.urandom(4).hex()}.png")
+
+def _build_job_result(result, data, duration, session):
+    """Convert a screening result to JSON types and queue its report"""
+    print(f"\nScreening result: {result}")
+    
+    if not result:
+        raise RuntimeError('Screening did not collect enough data (need at least 50 frames)')
+    
+    print("\n✅ Screening completed successfully!")
+    
+    result_serializable = result_encoding.to_builtin(result)
+    
+    if REPORT_GENERATOR_AVAILABLE:
+        _queue_report(result_serializable, data, session)
+    else:
+        result_serializable['report_status'] = 'unavailable'
+    
+    # The packed gaze trace is kept with the job and encoded per request (see screening_result)
+    return {'result': result_serializable, 'duration': duration, 'trace': result_encoding.build_trace(session.current_session_data)}
+
+def _queue_report(result, data, session):
+    """Queue the visual + PDF report for a result; the result gets the filename and a pending status"""
+    # Get patient info from request
+    screening_type = data.get('screening_type', 'basic-asd')
+    screening_type_name = 'Advanced ASD Screening' if screening_type == 'advanced-asd' else 'Basic ASD Screening'
+    patient_info = {
+        'name': data.get('patient_name', 'Unknown Patient'),
+        'id': data.get('patient_id', 'N/A'),
+        'age': data.get('patient_age', 'N/A'),
+        'date': datetime.now().strftime('%B %d, %Y'),
+        'time': datetime.now().strftime('%I:%M %p'),
+        'type': screening_type_name
+    }
+    filename = report_generator.report_filename(patient_info)
+    
+    # Add PDF path to result
+    result['pdf_report_path'] = os.path.join(REPORTS_DIR, filename)
+    result['pdf_report_filename'] = filename
+    result['report_status'] = REPORT_PENDING
+    
+    report_jobs.submit(_build_report, {
+        'result': dict(result),
+        'patient_info': patient_info,
+        'filename': filename,
+        'session': session
+    }, job_id=filename)
+
+def _build_report(params):
+    """Draw the session's visual report and build the PDF (executed on a report worker)"""
+    result, session = params['result'], params['session']
+    screening_system.render_visual_report(session, result)
+    with pipeline_metrics.stage_timer('pdf_build'):
+        pdf_path = report_generator.generate_screening_report(result, params['patient_info'], image_path=result.get('visual_report_path'), output_dir=REPORTS_DIR, filename=params['filename'])
+    print(f"📄 PDF Report generated: {pdf_path}")
+    return pdf_path
+
+def _report_job(filename):
+    return report_jobs.get(filename)
+
+def _report_status(filename):
+    """Report build status for a PDF filename: pending, ready or failed"""
+    job = _report_job(filename)
+    if job is None:
+        return REPORT_READY if os.path.exists(os.path.join(REPORTS_DIR, filename)) else REPORT_FAILED
+    if job.status == JOB_COMPLETED:
+        return REPORT_READY
+    if job.status == JOB_FAILED:
+        return REPORT_FAILED
+    return REPORT_PENDING
+
+def _wait_for_job(job_id):
+    """Look up a job and optionally block on it for ?wait=<seconds> (capped at MAX_JOB_WAIT)"""
+    job = screening_jobs.get(job_id)
+    if job is not None:
+        try:
+            wait = min(float(request.args.get('wait', 0)), MAX_JOB_WAIT)
+        except ValueError:
+            wait = 0
+        if wait > 0:
+            job.wait(wait)
+    return job
+
+def _job_status_payload(job):
+    payload = job.to_dict()
+    payload['success'] = job.status != JOB_FAILED
+    payload['queue_position'] = screening_jobs.queue_position(job.job_id)
+    return payload
+
+@app.route('/api/start_screening', methods=['POST'])
+def start_screening():
+    """Queue a new screening session and return its job id immediately"""
     if IMPORT_ERROR:
         return jsonify({
             'success': False,
@@ -133,112 +473,186 @@ def start_screening():
             'help': 'MediaPipe DLL error. Install Visual C++ Redistributable.'
         }), 500
     
-    if screening_system is None:
+    if not _system_ready():
         return jsonify({'success': False, 'error': 'System not initialized'}), 400
     
+    data = request.get_json(silent=True) or {}
+    if data.get('stimulus', stimulus.DEFAULT_SCRIPT) not in stimulus.SCRIPTS:
+        return jsonify({'success': False, 'error': f"Unknown stimulus: {data['stimulus']} (available: {', '.join(stimulus.SCRIPTS)})"}), 400
+    if data.get('video_path') is not None and not isinstance(data['video_path'], str):
+        return jsonify({'success': False, 'error': '"video_path" must be a string'}), 400
     try:
-        data = request.json
-        video_path = data.get('video_path', None)  # Optional: use video file instead of webcam
-        duration = data.get('duration', 60)  # Get duration from request, default 60 seconds
-        screening_type = data.get('screening_type', 'basic-asd')
-        
-        print("\n" + "="*50)
-        print("🎯 Starting ASD Screening Session")
-        print(f"System is_trained: {screening_system.is_trained}")
-        print(f"Video path: {video_path}")
-        print(f"Duration: {duration} seconds")
-        print(f"Screening type: {screening_type}")
-        print("="*50)
-        
-        # Run the actual screening (this will open fullscreen OpenCV window)
-        result = screening_system.run_live_screening(video_path=video_path, display=True, max_duration=duration)
-        
-        print(f"\nScreening result: {result}")
-        
-        if result:
-            print("\n✅ Screening completed successfully!")
-            
-            # Convert result to JSON-serializable format using custom encoder
-            class NumpyEncoder(json.JSONEncoder):
-                def default(self, obj):
-                    if isinstance(obj, (np.integer, np.floating, np.bool_)):
-                        return obj.item()
-                    elif isinstance(obj, np.ndarray):
-                        return obj.tolist()
-                    return super().default(obj)
-            
-            # Serialize and deserialize to convert all numpy types
-            result_json = json.dumps(result, cls=NumpyEncoder)
-            result_serializable = json.loads(result_json)
-            
-            # Generate PDF report if report generator is available
-            pdf_path = None
-            if REPORT_GENERATOR_AVAILABLE:
-                try:
-                    # Get patient info from request
-                    screening_type_name = 'Advanced ASD Screening' if screening_type == 'advanced-asd' else 'Basic ASD Screening'
-                    patient_info = {
-                        'name': data.get('patient_name', 'Unknown Patient'),
-                        'id': data.get('patient_id', 'N/A'),
-                        'age': data.get('patient_age', 'N/A'),
-                        'date': datetime.now().strftime('%B %d, %Y'),
-                        'time': datetime.now().strftime('%I:%M %p'),
-                        'type': screening_type_name
-                    }
-                    
-                    # Generate PDF report
-                    pdf_path = generate_screening_report(result_serializable, patient_info)
-                    print(f"📄 PDF Report generated: {pdf_path}")
-                    
-                    # Add PDF path to result
-                    result_serializable['pdf_report_path'] = pdf_path
-                    result_serializable['pdf_report_filename'] = os.path.basename(pdf_path)
-                    
-                except Exception as e:
-                    print(f"⚠️ Failed to generate PDF report: {e}")
-                    traceback.print_exc()
-            
-            return jsonify({
-                'success': True,
-                'message': 'Screening completed',
-                'result': result_serializable,
-                'duration': duration
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Screening did not collect enough data (need at least 50 frames)'
-            }), 400
-            
-    except Exception as e:
-        print(f"\n❌ Screening error: {e}")
-        traceback.print_exc()
-        return jsonify({
-            'success': False,
-            'error': str(e),
-            'traceback': traceback.format_exc()
-        }), 500
-    finally:
-        print("\n✅ Screening endpoint completed")
+        data['duration'] = _number_field(data, 'duration', 60, minimum=1)
+        data['frame_stride'] = _number_field(data, 'frame_stride', 1, cast=int, minimum=1)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    job = screening_jobs.submit(_run_screening_job, data)
+    print(f"📋 Screening job queued: {job.job_id}")
+    
+    return jsonify({
+        'success': True,
+        'message': 'Screening queued',
+        'job_id': job.job_id,
+        'status': job.status,
+        'queue_position': screening_jobs.queue_position(job.job_id),
+        'status_url': f'/api/screening_status/{job.job_id}',
+        'result_url': f'/api/screening_result/{job.job_id}',
+        'report_url': f'/api/screening_report/{job.job_id}'
+    }), 202
+
+@app.route('/api/screening_status/<job_id>', methods=['GET'])
+def screening_status(job_id):
+    """Get the status of a screening job (optionally wait with ?wait=<seconds>)"""
+    job = _wait_for_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': f'Unknown job: {job_id}'}), 404
+    return jsonify(_job_status_payload(job))
+
+@app.route('/api/screening_result/<job_id>', methods=['GET'])
+def screening_result(job_id):
+    """Get the result of a screening job; returns 202 while the job is still running"""
+    job = _wait_for_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': f'Unknown job: {job_id}'}), 404
+    
+    if job.status == JOB_COMPLETED:
+        result = dict(job.result['result'])
+        if result.get('pdf_report_filename'):
+            result['report_status'] = _report_status(result['pdf_report_filename'])
+        payload = {
+            'success': True,
+            'message': 'Screening completed',
+            'job_id': job.job_id,
+            'status': job.status,
+            'result': result,
+            'duration': job.result['duration']
+        }
+        # Optional compact gaze trace: ?trace=base64|msgpack&max_points=N
+        trace_format = request.args.get('trace')
+        if trace_format:
+            if trace_format not in result_encoding.TRACE_FORMATS:
+                return jsonify({'success': False, 'error': f'Unknown trace format: {trace_format}'}), 400
+            if trace_format == 'msgpack' and not result_encoding.MSGPACK_AVAILABLE:
+                return jsonify({'success': False, 'error': 'msgpack is not installed on the server; use trace=base64'}), 406
+            max_points = request.args.get('max_points', type=int)
+            result['gaze_trace'] = result_encoding.encode_trace(job.result.get('trace'), trace_format, max_points)
+            if trace_format == 'msgpack':
+                return Response(result_encoding.packb(payload), mimetype='application/msgpack')
+        return jsonify(payload)
+    if job.status == JOB_FAILED:
+        return jsonify({'success': False, 'job_id': job.job_id, 'status': job.status, 'error': job.error}), 400
+    return jsonify(_job_status_payload(job)), 202
+
+@app.route('/api/screening_report/<job_id>', methods=['GET'])
+def screening_report(job_id):
+    """Download the PDF report of a finished screening job"""
+    job = _wait_for_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': f'Unknown job: {job_id}'}), 404
+    if job.status == JOB_FAILED:
+        return jsonify({'success': False, 'job_id': job.job_id, 'status': job.status, 'error': job.error}), 400
+    if job.status != JOB_COMPLETED:
+        return jsonify(_job_status_payload(job)), 202
+    
+    filename = job.result['result'].get('pdf_report_filename')
+    if not filename:
+        return jsonify({'success': False, 'error': 'No report was generated for this screening'}), 404
+    return download_report(filename)
 
 @app.route('/api/end_screening', methods=['POST'])
 def end_screening():
-    """End the screening session and get results (NOT USED - screening runs via run_live_screening)"""
-    # This endpoint is not used anymore since run_live_screening handles everything
-    return jsonify({
-        'success': False,
-        'error': 'This endpoint is deprecated. Use /api/start_screening which runs the full screening and returns results.'
-    }), 400
+    """End an ingest session and queue its prediction (same as /api/ingest/<id>/finish)"""
+    data = request.get_json(silent=True) or {}
+    if 'session_id' not in data:
+        return jsonify({'success': False, 'error': 'session_id is required'}), 400
+    return ingest_finish(data['session_id'])
+
+@app.route('/api/batch_screening', methods=['POST'])
+def batch_screening_endpoint():
+    """
+    Screen many recorded sessions across a process pool, streaming JSON lines
+
+    Accepts either multipart uploads (field "videos", repeated) or a JSON body
+    {"video_paths": [...]} of files already on the server, inside BATCH_VIDEO_ROOT. Optional "workers",
+    "max_duration" and "frame_stride" can be given as form fields or JSON keys.
+    """
+    if IMPORT_ERROR:
+        return jsonify({'success': False, 'error': f'Cannot run batch screening: {IMPORT_ERROR}'}), 500
+    if not batch_lock.acquire(blocking=False):
+        return jsonify({'success': False, 'error': 'A batch screening is already running'}), 409
+    
+    upload_dir = None
+    try:
+        if request.files:
+            upload_dir = os.path.join(BACKEND_DIR, 'uploads', f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.urandom(4).hex()}")
+            os.makedirs(upload_dir)
+            video_paths = []
+            for i, upload in enumerate(request.files.getlist('videos')):
+                path = os.path.join(upload_dir, f"{i:04d}_{os.path.basename(upload.filename or 'video')}")
+                upload.save(path)
+                video_paths.append(path)
+            options = request.form
+        else:
+            options = request.get_json(silent=True) or {}
+            requested = options.get('video_paths') or []
+            if not isinstance(requested, list):
+                raise ValueError('"video_paths" must be a list')
+            if requested and not BATCH_VIDEO_ROOT:
+                raise ValueError('Server-side "video_paths" are disabled (set BATCH_VIDEO_ROOT); upload "videos" files instead')
+            video_paths = batch_screening.expand_video_paths([str(p) for p in requested], root=BATCH_VIDEO_ROOT)
+        if not video_paths:
+            raise ValueError('No videos given (upload "videos" files or pass "video_paths")')
+        # Never more worker processes than cores, whatever the client asks for
+        workers = min(max(1, int(options['workers'])), os.cpu_count() or 1) if options.get('workers') else None
+        max_duration = float(options.get('max_duration', float('inf')))
+        frame_stride = int(options.get('frame_stride', 1))
+    except Exception as e:
+        batch_lock.release()
+        if upload_dir:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    def generate():
+        try:
+            for record in batch_screening.run_batch(video_paths, workers=workers, max_duration=max_duration, models_dir=MODELS_DIR, frame_stride=frame_stride):
+                yield batch_screening.to_json_line(record)
+        finally:
+            batch_lock.release()
+            if upload_dir:
+                shutil.rmtree(upload_dir, ignore_errors=True)
+    
+    return Response(generate(), mimetype='application/x-ndjson')
 
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy', 
-        'initialized': screening_system is not None,
-        'import_error': IMPORT_ERROR
+        # Non-blocking: don't wait on a model load that the warm-up thread is still running
+        'initialized': model_registry is not None and model_registry.version is not None,
+        'models': model_registry.info() if model_registry else None,
+        'import_error': IMPORT_ERROR,
+        'jobs': screening_jobs.stats(),
+        'report_jobs': report_jobs.stats(),
+        'ingest': frame_ingest.stats() if frame_ingest else None,
+        'startup': _startup_info()
     })
 
+def _startup_info():
+    warm_up = STARTUP['warm_up_thread']
+    return {
+        'import_seconds': STARTUP['import_seconds'],
+        'ready_seconds': STARTUP['ready_seconds'],
+        'warming_up': warm_up is not None and warm_up.is_alive(),
+        'model_load_seconds': model_registry.load_seconds if model_registry else None,
+        'lazy_imports': dict(lazy_import.IMPORT_TIMES),
+    }
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Pipeline stage latencies, frame counters and in-flight sessions in Prometheus text format"""
+    return Response(pipeline_metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/test', methods=['GET', 'POST'])
 def test():
     """Test endpoint to verify routing"""
@@ -253,9 +667,24 @@ def test():
 def download_report(filename):
     """Download a generated PDF report"""
     try:
-        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+        reports_dir = REPORTS_DIR
         file_path = os.path.join(reports_dir, filename)
         
+        # Reports are built in the background; tell the client to retry while this one is still pending
+        report_job = _report_job(filename)
+        if report_job is not None:
+            try:
+                wait = min(float(request.args.get('wait', 0)), MAX_JOB_WAIT)
+            except ValueError:
+                wait = 0
+            if wait > 0:
+                report_job.wait(wait)
+            status = _report_status(filename)
+            if status == REPORT_PENDING:
+                return jsonify({'success': False, 'report_status': status, 'message': 'Report is still being generated'}), 202
+            if status == REPORT_FAILED:
+                return jsonify({'success': False, 'report_status': status, 'error': f'Report generation failed: {report_job.error}'}), 500
+        
         print(f"\n📥 Download request for: {filename}")
         print(f"Looking in directory: {reports_dir}")
         print(f"Full path: {file_path}")
@@ -0,0 +1,236 @@
+"""
+Background job manager for screening sessions
+
+A screening holds its worker for the whole session (60-120 s) plus report
+generation, so the API hands each session to a small worker pool and returns
+a job id straight away. Clients then poll the job, or block on it with a
+timeout, to collect the result.
+
+With a state_dir, every job also writes a JSON snapshot on each status
+change. When the API runs as several server processes, a job started in one
+process can then be polled from any other.
+"""
+
+import json
+import os
+import pathlib
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+SNAPSHOT_POLL_INTERVAL = 0.25  # Seconds between snapshot reads while waiting on another process's job
+
+
+class ScreeningJob:
+    """A single unit of work tracked by the JobManager"""
+
+    def __init__(self, job_id, params):
+        self.job_id = job_id
+        self.params = params
+        self.status = JOB_QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+        self._reload = None  # Set on jobs read from a snapshot written by another process
+
+    @classmethod
+    def from_snapshot(cls, data, reload):
+        """Read-only view of a job running in another process, refreshed by reload(job_id)"""
+        job = cls(data['job_id'], None)
+        job._apply(data)
+        job._reload = reload
+        return job
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes or the timeout expires. Returns True if finished."""
+        if self._reload is None or self.done:
+            return self._done.wait(timeout)
+        deadline = None if timeout is None else time.time() + timeout
+        while not self.done:
+            remaining = SNAPSHOT_POLL_INTERVAL if deadline is None else deadline - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(min(SNAPSHOT_POLL_INTERVAL, remaining))
+            data = self._reload(self.job_id)
+            if data is not None:
+                self._apply(data)
+        return self.done
+
+    def _apply(self, data):
+        self.status = data['status']
+        self.result = data.get('result')
+        self.error = data.get('error')
+        self.created_at = data.get('created_at')
+        self.started_at = data.get('started_at')
+        self.finished_at = data.get('finished_at')
+        if self.status in (JOB_COMPLETED, JOB_FAILED):
+            self._done.set()
+
+    def to_dict(self, include_result=False):
+        """Return a JSON-serializable snapshot of the job"""
+        data = {
+            'job_id': self.job_id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+        }
+        if self.started_at is not None:
+            end = self.finished_at if self.finished_at is not None else time.time()
+            data['elapsed'] = round(end - self.started_at, 3)
+        if include_result:
+            data['result'] = self.result
+        return data
+
+
+class JobManager:
+    """Runs callables on a bounded thread pool and keeps their status by job id"""
+
+    def __init__(self, max_workers=1, job_ttl=3600, max_finished_jobs=500, name='screening', state_dir=None, serialize=None):
+        """
+        Args:
+            max_workers: Jobs run concurrently
+            job_ttl: Seconds a finished job is kept
+            max_finished_jobs: Most finished jobs kept in memory
+            name: Worker thread name prefix
+            state_dir: Directory for job snapshots shared between server processes (None keeps jobs in memory only)
+            serialize: Converts a job snapshot dict to JSON-serializable types before it is written
+        """
+        self.max_workers = max_workers
+        self.job_ttl = job_ttl
+        self.max_finished_jobs = max_finished_jobs
+        self.state_dir = pathlib.Path(state_dir) if state_dir else None
+        self._serialize = serialize or (lambda data: data)
+        if self.state_dir is not None:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'{name}-worker')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, params, job_id=None):
+        """
+        Queue fn(params) for execution
+
+        Args:
+            fn: Callable taking the params dict and returning the job result
+            params: Dictionary of job parameters (kept on the job for inspection)
+            job_id: Id to use instead of a random one
+
+        Returns:
+            The queued ScreeningJob
+        """
+        job = ScreeningJob(job_id or uuid.uuid4().hex, params)
+        with self._lock:
+            self._prune()
+            self._jobs[job.job_id] = job
+        self._save(job)
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id):
+        """Look up a job by id, falling back to snapshots written by other server processes"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.state_dir is not None:
+            data = self._load(job_id)
+            if data is not None:
+                job = ScreeningJob.from_snapshot(data, self._load)
+        return job
+
+    def queue_position(self, job_id):
+        """Number of queued jobs submitted before this one (0 when running or finished)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != JOB_QUEUED:
+                return 0
+            return sum(1 for other in self._jobs.values()
+                       if other.status == JOB_QUEUED and other.created_at < job.created_at)
+
+    def stats(self):
+        """Count jobs by status"""
+        counts = {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_COMPLETED: 0, JOB_FAILED: 0}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        counts['workers'] = self.max_workers
+        return counts
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job, fn):
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        self._save(job)
+        try:
+            job.result = fn(job.params)
+            job.status = JOB_COMPLETED
+        except Exception as e:
+            print(f"❌ Job {job.job_id} failed: {e}")
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = JOB_FAILED
+        finally:
+            job.finished_at = time.time()
+            self._save(job)
+            job._done.set()
+
+    def _snapshot_path(self, job_id):
+        if pathlib.Path(job_id).name != job_id:
+            return None  # Never let a job id escape the state directory
+        return self.state_dir / f'{job_id}.json'
+
+    def _save(self, job):
+        """Write the job snapshot atomically (no-op without a state_dir)"""
+        if self.state_dir is None:
+            return
+        path = self._snapshot_path(job.job_id)
+        if path is None:
+            return  # Job id is not a plain file name; the job is tracked in memory only
+        tmp = path.with_name(path.name + '.part')
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(self._serialize(job.to_dict(include_result=True)), f)
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"⚠️ Could not write snapshot for job {job.job_id}: {e}")
+
+    def _load(self, job_id):
+        path = self._snapshot_path(job_id)
+        if path is None:
+            return None
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _prune(self):
+        """Drop finished jobs past their TTL, and the oldest ones beyond max_finished_jobs. Caller holds the lock."""
+        now = time.time()
+        finished = sorted((job for job in self._jobs.values() if job.done), key=lambda job: job.finished_at)
+        expired = [job for job in finished if now - job.finished_at > self.job_ttl]
+        overflow = finished[:max(0, len(finished) - self.max_finished_jobs)]
+        for job in expired + overflow:
+            self._jobs.pop(job.job_id, None)
+        if self.state_dir is not None:
+            for path in self.state_dir.glob('*.json'):
+                try:
+                    if now - path.stat().st_mtime > self.job_ttl:
+                        path.unlink()
+                except OSError:
+                    pass  # Removed by another process
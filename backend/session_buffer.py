@@ -0,0 +1,96 @@
+"""
+Columnar storage for a session's gaze samples
+
+Sessions used to keep their samples as a list of {'x', 'y', 'timestamp'}
+dicts with NumPy scalars inside, converted to a DataFrame when the session
+ended. GazeBuffer stores them in preallocated NumPy columns instead:
+float64 timestamps, float32 coordinates and a uint8 flags column. The
+columns double in size when full, so appends cost amortised O(1) with no
+per-sample allocation. Feature extraction and reporting read the filled
+part through zero-copy views (columns()).
+"""
+
+import numpy as np
+
+FLAG_INTERPOLATED = 1  # Predicted sample (face mesh skipped), see adaptive_rate.py
+
+
+class GazeBuffer:
+    """Growable columnar buffer of gaze samples"""
+
+    COLUMNS = (('timestamp', np.float64), ('x', np.float32), ('y', np.float32),
+               ('target_x', np.float32), ('target_y', np.float32), ('flags', np.uint8))
+
+    def __init__(self, capacity=1024):
+        self._size = 0
+        self._data = {name: np.empty(max(1, capacity), dtype=dtype) for name, dtype in self.COLUMNS}
+
+    @property
+    def capacity(self):
+        return len(self._data['timestamp'])
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def clear(self):
+        """Forget all samples, keeping the allocated capacity"""
+        self._size = 0
+
+    def append(self, x, y, timestamp, target_x=np.nan, target_y=np.nan, flags=0):
+        if self._size == self.capacity:
+            self._grow(2 * self.capacity)
+        i = self._size
+        data = self._data
+        data['timestamp'][i] = timestamp
+        data['x'][i] = x
+        data['y'][i] = y
+        data['target_x'][i] = target_x
+        data['target_y'][i] = target_y
+        data['flags'][i] = flags
+        self._size = i + 1
+
+    def _grow(self, capacity):
+        for name, column in self._data.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._data[name] = grown
+
+    def column(self, name):
+        """Zero-copy view of the filled part of one column (invalidated when the buffer grows)"""
+        return self._data[name][:self._size]
+
+    def columns(self):
+        """Zero-copy views of all columns, keyed by name; indexable like a DataFrame (data['x'])"""
+        return {name: column[:self._size] for name, column in self._data.items()}
+
+    @property
+    def timestamp(self):
+        return self.column('timestamp')
+
+    @property
+    def x(self):
+        return self.column('x')
+
+    @property
+    def y(self):
+        return self.column('y')
+
+    @property
+    def interpolated(self):
+        return (self.column('flags') & FLAG_INTERPOLATED).astype(bool)
+
+    def __getitem__(self, index):
+        """One sample as a dict (for inspection; bulk access should use the column views)"""
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('sample index out of range')
+        data = self._data
+        sample = {'x': float(data['x'][index]), 'y': float(data['y'][index]), 'timestamp': float(data['timestamp'][index]),
+                  'interpolated': bool(data['flags'][index] & FLAG_INTERPOLATED)}
+        if not np.isnan(data['target_x'][index]):
+            sample['target_x'], sample['target_y'] = float(data['target_x'][index]), float(data['target_y'][index])
+        return sample
@@ -0,0 +1,123 @@
+"""
+Precomputed stimulus trajectories
+
+The screening stimulus (the white ball the child follows) used to move by a
+fixed number of pixels per render loop iteration. Its real speed therefore
+depended on how fast the loop ran, and where it was at any moment was never
+recorded. A StimulusTrajectory instead precomputes the whole path as arrays
+sampled at a fixed rate and looks positions up by elapsed session time. The
+ball moves at the same speed on any machine. Each gaze sample can be tagged
+with the target position at its capture time, and pursuit error is a single
+array operation (see pursuit_error()).
+
+Scripts are plain functions of (t, width, height, radius) returning x and y
+arrays; add new ones to SCRIPTS.
+"""
+
+import numpy as np
+
+DEFAULT_SCRIPT = 'bounce'
+MAX_PRECOMPUTED_SECONDS = 600
+
+
+def _reflect(start, velocity, t, low, high):
+    """Position of a point bouncing between low and high: a triangle wave of t"""
+    span = high - low
+    u = np.mod(start - low + velocity * t, 2 * span)
+    return low + np.where(u <= span, u, 2 * span - u)
+
+
+def _bounce(t, width, height, radius):
+    # Same path as the original per-frame ball (7, 5 px per frame at 30 fps), starting from the centre
+    return (_reflect(width / 2, 210.0, t, radius, width - radius),
+            _reflect(height / 2, 150.0, t, radius, height - radius))
+
+
+def _horizontal(t, width, height, radius):
+    # Side-to-side smooth pursuit at mid height, one sweep every 4 s
+    return _reflect(width / 2, (width - 2 * radius) / 4.0, t, radius, width - radius), np.full_like(t, height / 2)
+
+
+def _lissajous(t, width, height, radius):
+    # Smooth figure-of-eight; velocity changes continuously, so there are no bounces to anticipate
+    ax, ay = width / 2 - radius, height / 2 - radius
+    return width / 2 + ax * np.sin(2 * np.pi * t / 8.0), height / 2 + ay * np.sin(4 * np.pi * t / 8.0)
+
+
+def _jumps(t, width, height, radius):
+    # Step target that jumps between fixed points every 1.5 s (saccade task)
+    points = np.array([(0.5, 0.5), (0.15, 0.2), (0.85, 0.8), (0.85, 0.2), (0.15, 0.8), (0.5, 0.15), (0.5, 0.85)])
+    index = (t // 1.5).astype(np.int64) % len(points)
+    margin_x, margin_y = width - 2 * radius, height - 2 * radius
+    return radius + points[index, 0] * margin_x, radius + points[index, 1] * margin_y
+
+
+SCRIPTS = {'bounce': _bounce, 'horizontal': _horizontal, 'lissajous': _lissajous, 'jumps': _jumps}
+
+
+class StimulusTrajectory:
+    """A stimulus script precomputed over the session and indexed by elapsed time"""
+
+    def __init__(self, script=DEFAULT_SCRIPT, width=1920, height=1080, duration=60, radius=40, rate=240):
+        """
+        Args:
+            script: Name of a script in SCRIPTS
+            width, height: Screen size in pixels
+            duration: Session length in seconds; up to MAX_PRECOMPUTED_SECONDS are precomputed and
+                later times (e.g. open-ended video screening) are computed on demand
+            radius: Ball radius in pixels (the ball stays fully on screen)
+            rate: Samples per second of the precomputed path
+        """
+        if script not in SCRIPTS:
+            raise ValueError(f"Unknown stimulus script: {script}")
+        self.script = script
+        self.width, self.height = width, height
+        self.radius = radius
+        self.rate = rate
+        duration = min(duration, MAX_PRECOMPUTED_SECONDS)
+        self.t = np.arange(int(np.ceil(duration * rate)) + 1) / rate
+        self.x, self.y = (np.asarray(a, dtype=np.float32) for a in SCRIPTS[script](self.t, width, height, radius))
+
+    def position(self, elapsed):
+        """(x, y) of the stimulus at elapsed seconds into the session"""
+        x, y = self.positions(np.array([elapsed]))
+        return float(x[0]), float(y[0])
+
+    def positions(self, elapsed):
+        """Vectorized position(): x and y arrays for an array of elapsed times"""
+        elapsed = np.maximum(np.asarray(elapsed, dtype=np.float64), 0.0)
+        i = np.rint(elapsed * self.rate).astype(np.int64)
+        beyond = i >= len(self.t)
+        if not beyond.any():
+            return self.x[i], self.y[i]
+        x, y = self.x[np.minimum(i, len(self.t) - 1)], self.y[np.minimum(i, len(self.t) - 1)]
+        late_x, late_y = SCRIPTS[self.script](elapsed[beyond], self.width, self.height, self.radius)
+        x[beyond], y[beyond] = late_x, late_y
+        return x, y
+
+
+def pursuit_error(x, y, target_x, target_y):
+    """
+    How closely gaze followed the stimulus
+
+    Args:
+        x, y: Gaze sample coordinates (arrays)
+        target_x, target_y: Stimulus position at each sample's time
+
+    Returns:
+        Dict with mean, median and RMS Euclidean error in pixels, and the x/y gain
+        (gaze displacement range over target displacement range), or None without samples
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    target_x, target_y = np.asarray(target_x, dtype=np.float64), np.asarray(target_y, dtype=np.float64)
+    if x.size == 0:
+        return None
+    error = np.hypot(x - target_x, y - target_y)
+    span_x, span_y = np.ptp(target_x), np.ptp(target_y)
+    return {
+        'mean_error': float(error.mean()),
+        'median_error': float(np.median(error)),
+        'rms_error': float(np.sqrt(np.mean(error ** 2))),
+        'gain_x': float(np.ptp(x) / span_x) if span_x > 0 else None,
+        'gain_y': float(np.ptp(y) / span_y) if span_y > 0 else None,
+    }
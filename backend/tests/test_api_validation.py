@@ -0,0 +1,68 @@
+import pytest
+
+pytest.importorskip('flask')
+
+import screening_api
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(screening_api, 'IMPORT_ERROR', None)
+    monkeypatch.setattr(screening_api, '_system_ready', lambda: True)
+    if screening_api.frame_ingest is None:
+        monkeypatch.setattr(screening_api, 'frame_ingest', screening_api.FrameIngestManager(face_mesh_pool=None))
+    return screening_api.app.test_client()
+
+
+@pytest.mark.parametrize('body', [
+    {'duration': 'sixty'},
+    {'duration': 0},
+    {'duration': True},
+    {'duration': 1e309},
+    {'frame_stride': 'x'},
+    {'frame_stride': 0},
+    {'video_path': ['a.mp4']},
+])
+def test_start_screening_rejects_invalid_fields(client, body):
+    response = client.post('/api/start_screening', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_ingest_start_rejects_invalid_duration(client):
+    response = client.post('/api/ingest/start', json={'duration': 'long'})
+    assert response.status_code == 400
+    assert '"duration"' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('body, message', [
+    ({'session_id': 's', 'image': 'data:image/jpeg;base64,not base64!'}, 'base64'),
+    ({'session_id': 's', 'image': 42}, 'base64'),
+    ({'session_id': 's', 'image': 'aGVsbG8=', 'timestamp': '12:00'}, '"timestamp"'),
+])
+def test_process_frame_rejects_malformed_input(client, body, message):
+    response = client.post('/api/process_frame', json=body)
+    assert response.status_code == 400
+    assert message in response.get_json()['error']
+
+
+class _RecordingIngest:
+    def __init__(self):
+        self.pushed = []
+
+    def push(self, payload, timestamp=None):
+        self.pushed.append((payload, timestamp))
+
+    def stats(self):
+        return {'received': len(self.pushed)}
+
+
+def test_frame_timestamp_header_must_be_a_number(client, monkeypatch):
+    ingest = _RecordingIngest()
+    monkeypatch.setattr(screening_api, '_get_ingest', lambda session_id: ingest)
+    response = client.post('/api/ingest/s/frames', data=b'jpeg', content_type='image/jpeg', headers={'X-Frame-Timestamp': 'now'})
+    assert response.status_code == 400
+    assert '"timestamp"' in response.get_json()['error']
+    response = client.post('/api/ingest/s/frames', data=b'jpeg', content_type='image/jpeg', headers={'X-Frame-Timestamp': '1500'})
+    assert response.status_code == 200
+    assert ingest.pushed == [(b'jpeg', 1.5)]
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+import batch_screening
+
+
+@pytest.fixture
+def video_root(tmp_path):
+    root = tmp_path / 'videos'
+    (root / 'day1').mkdir(parents=True)
+    for name in ('a.mp4', 'b.MOV', 'notes.txt'):
+        (root / 'day1' / name).write_bytes(b'')
+    (tmp_path / 'outside.mp4').write_bytes(b'')
+    return root
+
+
+def test_expand_video_paths_inside_root(video_root):
+    paths = batch_screening.expand_video_paths(['day1', 'day1/a.mp4'], root=video_root)
+    names = [p.name for p in paths]
+    assert names == ['a.mp4', 'b.MOV', 'a.mp4']
+    assert all(p.is_relative_to(video_root.resolve()) for p in paths)
+
+
+@pytest.mark.parametrize('path', ['../outside.mp4', '/etc/passwd', 'day1/../../outside.mp4'])
+def test_expand_video_paths_rejects_paths_outside_root(video_root, path):
+    with pytest.raises(ValueError):
+        batch_screening.expand_video_paths([path], root=video_root)
+
+
+def test_expand_video_paths_rejects_symlink_escape(video_root, tmp_path):
+    os.symlink(tmp_path, video_root / 'escape')
+    with pytest.raises(ValueError):
+        batch_screening.expand_video_paths(['escape/outside.mp4'], root=video_root)
+    with pytest.raises(ValueError):
+        batch_screening.expand_video_paths(['escape'], root=video_root)
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import pytest
+
+import feature_cache
+
+
+@pytest.fixture
+def csv(tmp_path):
+    path = tmp_path / 'train.csv'
+    path.write_text('x,y\n1,2\n3,4\n')
+    return path
+
+
+def extractor(calls, X=None):
+    def extract():
+        calls.append(1)
+        return (np.arange(6, dtype=np.float64).reshape(3, 2) if X is None else X), np.array(['ASD', 'TD', 'TD'], dtype=object), ['a', 'b']
+    return extract
+
+
+def test_miss_then_hit_returns_the_same_arrays(csv, tmp_path):
+    calls = []
+    cache_dir = tmp_path / 'cache'
+    X1, y1, names1, hit1 = feature_cache.cached_features(csv, 'v1', {'rows': 1000}, extractor(calls), cache_dir)
+    X2, y2, names2, hit2 = feature_cache.cached_features(csv, 'v1', {'rows': 1000}, extractor(calls), cache_dir)
+    assert (hit1, hit2) == (False, True)
+    assert len(calls) == 1
+    np.testing.assert_array_equal(X1, X2)
+    np.testing.assert_array_equal(y1, y2)
+    assert names1 == names2 == ['a', 'b']
+    assert isinstance(X2, np.memmap)
+
+
+def test_key_follows_content_version_and_params(csv, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    key = feature_cache.cache_key(csv, 'v1', {'rows': 1000}, cache_dir)
+    assert feature_cache.cache_key(csv, 'v1', {'rows': 1000}, cache_dir) == key
+    assert feature_cache.cache_key(csv, 'v2', {'rows': 1000}, cache_dir) != key
+    assert feature_cache.cache_key(csv, 'v1', {'rows': 500}, cache_dir) != key
+
+    copy = tmp_path / 'copy.csv'
+    copy.write_bytes(csv.read_bytes())
+    assert feature_cache.cache_key(copy, 'v1', {'rows': 1000}, cache_dir) == key  # Keyed on content, not path
+
+    csv.write_text('x,y\n1,2\n3,5\n')  # Same size, new contents
+    os.utime(csv, ns=(0, csv.stat().st_mtime_ns + 1_000_000))
+    assert feature_cache.cache_key(csv, 'v1', {'rows': 1000}, cache_dir) != key
+
+
+def test_digest_is_reused_while_size_and_mtime_are_unchanged(csv, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    digest = feature_cache.file_digest(csv, cache_dir)
+    stat = csv.stat()
+    csv.write_text('x,y\n9,9\n9,9\n')  # Same size
+    os.utime(csv, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert feature_cache.file_digest(csv, cache_dir) == digest
+    os.utime(csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert feature_cache.file_digest(csv, cache_dir) != digest
+
+
+def test_disabled_cache_always_extracts(csv):
+    calls = []
+    for _ in range(2):
+        *_, hit = feature_cache.cached_features(csv, 'v1', {}, extractor(calls), cache_dir=None)
+        assert not hit
+    assert len(calls) == 2
@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from frame_ingest import FrameIngestManager, IngestError
+
+
+def test_unknown_session_is_404(tmp_path):
+    manager = FrameIngestManager(face_mesh_pool=None, state_dir=tmp_path)
+    with pytest.raises(IngestError) as e:
+        manager.get('missing')
+    assert e.value.status == 404
+
+
+def test_session_held_by_another_process_is_409(tmp_path):
+    manager = FrameIngestManager(face_mesh_pool=None, state_dir=tmp_path)
+    (tmp_path / 'abc.pid').write_text(str(os.getppid()))
+    with pytest.raises(IngestError) as e:
+        manager.get('abc')
+    assert e.value.status == 409
+    assert str(os.getppid()) in str(e.value)
+
+
+def test_stale_marker_of_an_exited_process_is_404(tmp_path):
+    manager = FrameIngestManager(face_mesh_pool=None, state_dir=tmp_path)
+    (tmp_path / 'abc.pid').write_text('999999999')
+    with pytest.raises(IngestError) as e:
+        manager.get('abc')
+    assert e.value.status == 404
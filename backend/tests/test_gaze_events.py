@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from gaze_events import EventStream, MAX_FIXATION_RADIUS, MIN_FIXATION_DURATION, VELOCITY_THRESHOLD, classify_events, count_events
+
+
+def state_machine_counts(x, y, t):
+    """The per-sample state machine gaze_events replaced (ScreeningSession._update_gaze_metrics)"""
+    fixations = saccades = 0
+    last_point = last_time = None
+    in_fixation = counted = False
+    start_time = start_pos = None
+    for point, current_time in zip(np.column_stack((x, y)), t):
+        if last_point is not None:
+            dt = current_time - last_time
+            if dt > 0:
+                velocity = np.linalg.norm(point - last_point) / dt
+                if velocity < VELOCITY_THRESHOLD:
+                    if not in_fixation:
+                        in_fixation, start_time, start_pos, counted = True, current_time, point, False
+                    elif not counted:
+                        if current_time - start_time > MIN_FIXATION_DURATION and np.linalg.norm(point - start_pos) < MAX_FIXATION_RADIUS:
+                            fixations += 1
+                            counted = True
+                elif in_fixation:
+                    saccades += 1
+                    in_fixation = False
+        last_point, last_time = point, current_time
+    return fixations, saccades
+
+
+def gaze(seed, n=2000):
+    """Fixations with jitter, jumps, drifts and some repeated timestamps"""
+    rng = np.random.default_rng(seed)
+    t = np.cumsum(rng.choice([0.0, 1 / 60, 1 / 30], size=n, p=[0.05, 0.8, 0.15]))
+    centres = rng.uniform([0, 0], [1920, 1080], size=(n // 25 + 1, 2))
+    xy = centres[np.arange(n) // 25] + rng.normal(0, rng.choice([2, 20]), size=(n, 2))
+    return xy[:, 0], xy[:, 1], t
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_count_events_matches_state_machine(seed):
+    x, y, t = gaze(seed)
+    assert count_events(x, y, t) == state_machine_counts(x, y, t)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 16, 500])
+def test_event_stream_matches_state_machine_for_any_chunk_size(chunk_size):
+    x, y, t = gaze(11)
+    stream = EventStream(chunk_size=chunk_size)
+    for sample in zip(x, y, t):
+        stream.push(*sample)
+    stream.flush()
+    assert (stream.fixations, stream.saccades) == state_machine_counts(x, y, t)
+
+
+def test_classify_events_segments_agree_with_counts():
+    x, y, t = gaze(3)
+    segments = classify_events(x, y, t)
+    assert (len(segments['fixations']['start']), len(segments['saccades']['start'])) == count_events(x, y, t)
+    assert (segments['fixations']['duration'] > MIN_FIXATION_DURATION).all()
+    assert (segments['saccades']['end'] > segments['saccades']['start']).all()
+
+
+def test_empty_and_single_sample_inputs():
+    assert count_events([], [], []) == (0, 0)
+    segments = classify_events([1.0], [2.0], [0.0])
+    assert len(segments['fixations']['start']) == len(segments['saccades']['start']) == 0
@@ -0,0 +1,28 @@
+import threading
+
+import pytest
+
+fcntl = pytest.importorskip('fcntl')
+pytest.importorskip('flask')
+
+import screening_api
+
+
+def test_device_sessions_wait_for_other_processes(tmp_path, monkeypatch):
+    lock_path = tmp_path / 'local_device.lock'
+    monkeypatch.setattr(screening_api, 'LOCAL_DEVICE_LOCK_FILE', str(lock_path))
+    entered = threading.Event()
+
+    def session():
+        with screening_api._local_device():
+            entered.set()
+
+    # flock locks are per open file, so this stands in for another server process holding the device
+    with open(lock_path, 'a') as other:
+        fcntl.flock(other, fcntl.LOCK_EX)
+        thread = threading.Thread(target=session)
+        thread.start()
+        assert not entered.wait(0.3)
+        fcntl.flock(other, fcntl.LOCK_UN)
+    assert entered.wait(5)
+    thread.join(5)
@@ -0,0 +1,112 @@
+import os
+import threading
+
+import pytest
+
+from model_registry import ModelRegistry, bundle_version
+
+
+class Bundle:
+    def __init__(self, version, contents):
+        self.version = version
+        self.contents = contents
+
+
+def load(models_dir, version):
+    path = models_dir / 'ensemble.json'
+    return Bundle(version, path.read_text()) if path.exists() else None
+
+
+def write_bundle(models_dir, contents):
+    path = models_dir / 'ensemble.json'
+    mtime = path.stat().st_mtime_ns if path.exists() else 0
+    path.write_text(contents)
+    os.utime(path, ns=(mtime + 1_000_000, mtime + 1_000_000))  # Distinct mtime even on coarse clocks
+
+
+@pytest.fixture
+def models_dir(tmp_path):
+    path = tmp_path / 'autism_models'
+    path.mkdir()
+    write_bundle(path, 'v1')
+    return path
+
+
+def test_current_loads_once(models_dir):
+    calls = []
+
+    def counting_load(models_dir, version):
+        calls.append(version)
+        return load(models_dir, version)
+
+    registry = ModelRegistry(models_dir, counting_load)
+    bundle = registry.current()
+    assert bundle.contents == 'v1'
+    assert registry.current() is bundle
+    assert registry.refresh() is False
+    assert len(calls) == 1
+    assert registry.version == bundle_version(models_dir)
+
+
+def test_hot_swap_keeps_running_sessions_on_their_bundle(models_dir):
+    registry = ModelRegistry(models_dir, load)
+    pinned = registry.current()  # A session pins the bundle it started with
+    write_bundle(models_dir, 'v2 with more trees')
+
+    # A change must look the same on two consecutive checks (a bundle may still be being written)
+    assert registry.refresh() is False
+    assert registry.current() is pinned
+    assert registry.refresh() is True
+
+    new = registry.current()
+    assert new.contents == 'v2 with more trees'
+    assert pinned.contents == 'v1'
+    assert registry.get(pinned.version) is pinned
+    assert registry.versions() == [pinned.version, new.version]
+
+
+def test_old_versions_are_dropped_beyond_keep_versions(models_dir):
+    registry = ModelRegistry(models_dir, load, keep_versions=2)
+    versions = [registry.current().version]
+    for contents in ('v2', 'v3'):
+        write_bundle(models_dir, contents)
+        assert registry.refresh(force=True)
+        versions.append(registry.version)
+    assert registry.versions() == versions[1:]
+    assert registry.get(versions[0]) is None
+
+
+def test_failed_load_keeps_the_active_bundle(models_dir):
+    def flaky_load(models_dir, version):
+        if (models_dir / 'ensemble.json').read_text() == 'broken':
+            raise ValueError('truncated pickle')
+        return load(models_dir, version)
+
+    registry = ModelRegistry(models_dir, flaky_load)
+    active = registry.current()
+    write_bundle(models_dir, 'broken')
+    assert registry.refresh(force=True) is False
+    assert registry.current() is active
+    assert registry.info()['last_error'] == 'truncated pickle'
+
+
+def test_concurrent_readers_see_a_complete_bundle(models_dir):
+    registry = ModelRegistry(models_dir, load)
+    registry.current()
+    seen, stop = [], threading.Event()
+
+    def read():
+        while not stop.is_set():
+            seen.append(registry.current().contents)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    for i in range(2, 6):
+        write_bundle(models_dir, f'v{i}')
+        registry.refresh(force=True)
+    stop.set()
+    for thread in readers:
+        thread.join()
+    assert set(seen) <= {f'v{i}' for i in range(1, 6)}
+    assert registry.current().contents == 'v5'
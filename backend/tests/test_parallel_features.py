@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import parallel_features
+import training_data
+
+
+@pytest.fixture
+def training_csv(tmp_path):
+    """Export with a subject column: 40 subjects of uneven length, a few below MIN_SAMPLES"""
+    rng = np.random.default_rng(1)
+    lengths = rng.integers(20, 400, size=40)
+    subjects = np.repeat(np.arange(40), lengths)
+    n = len(subjects)
+    df = pd.DataFrame({
+        'Subject': subjects,
+        'Point of Regard Left X [px]': rng.uniform(0, 1920, n),
+        'Point of Regard Left Y [px]': rng.uniform(0, 1080, n),
+        'timestamp': np.concatenate([np.cumsum(rng.uniform(0.01, 0.03, k)) for k in lengths]),
+        'Group': np.repeat(np.where(np.arange(40) % 2, 'ASD', 'TD'), lengths),
+    })
+    path = tmp_path / 'training.csv'
+    df.to_csv(path, index=False)
+    return path
+
+
+def _assert_same(a, b):
+    for left, right in zip(a, b):
+        np.testing.assert_array_equal(left, right)
+
+
+def test_extract_features_matches_sequential(training_csv):
+    table = training_data.load_subjects(training_csv)
+    expected = training_data.basic_features(table)
+    _assert_same(parallel_features.extract_features(table, training_data.basic_features, workers=2, min_rows_per_worker=1), expected)
+
+
+def test_stream_features_matches_sequential(training_csv):
+    expected = training_data.basic_features(training_data.load_subjects(training_csv))
+    tables = training_data.iter_subject_tables(training_csv, chunk_rows=1000)
+    _assert_same(parallel_features.stream_features(tables, training_data.basic_features, workers=2, max_pending=2), expected)
+
+
+def test_stream_features_in_process(training_csv):
+    expected = training_data.basic_features(training_data.load_subjects(training_csv))
+    tables = training_data.iter_subject_tables(training_csv, chunk_rows=1000)
+    _assert_same(parallel_features.stream_features(tables, training_data.basic_features, workers=1), expected)
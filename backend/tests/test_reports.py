@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+pytest.importorskip('reportlab')
+pytest.importorskip('flask')
+
+import screening_api
+
+
+class _NoVisualReport:
+    def render_visual_report(self, session, result):
+        pass
+
+
+def test_report_is_built_in_reports_dir_from_any_working_directory(tmp_path, monkeypatch):
+    reports_dir = tmp_path / 'reports'
+    elsewhere = tmp_path / 'elsewhere'
+    elsewhere.mkdir()
+    monkeypatch.setattr(screening_api, 'REPORTS_DIR', str(reports_dir))
+    monkeypatch.setattr(screening_api, 'screening_system', _NoVisualReport())
+    monkeypatch.chdir(elsewhere)
+
+    patient_info = {'name': 'Test Patient', 'id': 'P1', 'age': '4', 'date': 'January 01, 2026', 'time': '10:00 AM', 'type': 'Basic ASD Screening'}
+    filename = screening_api.report_generator.report_filename(patient_info)
+    result = {'verdict': 'Not Autistic', 'confidence': 0.8, 'uncertainty_std': 0.05, 'model_probs': {}, 'visual_report_path': None}
+    pdf_path = screening_api._build_report({'result': result, 'patient_info': patient_info, 'filename': filename, 'session': None})
+
+    assert pdf_path == os.path.join(str(reports_dir), filename)
+    assert os.path.isfile(pdf_path)
+    assert not (elsewhere / 'reports').exists()
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from screening_jobs import JOB_COMPLETED, JOB_FAILED, JOB_QUEUED, JobManager
+
+
+@pytest.fixture
+def manager():
+    jobs = JobManager(max_workers=1)
+    yield jobs
+    jobs.shutdown(wait=True)
+
+
+def test_job_completes_with_result(manager):
+    job = manager.submit(lambda params: params['a'] + 1, {'a': 41})
+    assert job.wait(5)
+    assert job.status == JOB_COMPLETED
+    assert job.result == 42
+    assert manager.get(job.job_id) is job
+
+
+def test_failed_job_keeps_the_error(manager):
+    def fail(params):
+        raise RuntimeError('no face found')
+
+    job = manager.submit(fail, {})
+    assert job.wait(5)
+    assert job.status == JOB_FAILED
+    assert job.error == 'no face found'
+
+
+def test_queue_position_counts_earlier_queued_jobs(manager):
+    release = threading.Event()
+    running = manager.submit(lambda params: release.wait(5), {})
+    queued = [manager.submit(lambda params: None, {}) for _ in range(2)]
+    try:
+        assert manager.queue_position(running.job_id) == 0
+        assert [job.status for job in queued] == [JOB_QUEUED, JOB_QUEUED]
+        assert [manager.queue_position(job.job_id) for job in queued] == [0, 1]
+    finally:
+        release.set()
+    assert all(job.wait(5) for job in queued)
+    assert manager.stats()[JOB_COMPLETED] == 3
+
+
+def test_snapshots_let_another_process_follow_a_job(tmp_path):
+    owner = JobManager(state_dir=tmp_path)
+    other = JobManager(state_dir=tmp_path)  # Stands in for a second server process
+    release = threading.Event()
+    try:
+        job = owner.submit(lambda params: release.wait(5) and {'verdict': 'Not Autistic'}, {})
+        remote = other.get(job.job_id)
+        assert remote is not None and not remote.done
+        release.set()
+        assert remote.wait(5)
+        assert remote.status == JOB_COMPLETED
+        assert remote.result == {'verdict': 'Not Autistic'}
+        assert other.get('unknown') is None
+    finally:
+        release.set()
+        owner.shutdown(wait=True)
+
+
+def test_job_ids_that_are_not_file_names_stay_in_memory(tmp_path):
+    manager = JobManager(state_dir=tmp_path / 'jobs')
+    try:
+        job = manager.submit(lambda params: 'ok', {}, job_id='x_A/B_1.pdf')
+        assert job.wait(5)
+        assert manager.get('x_A/B_1.pdf').result == 'ok'
+        assert not (tmp_path / 'x_A').exists()
+        assert list((tmp_path / 'jobs').iterdir()) == []
+    finally:
+        manager.shutdown(wait=True)
+
+
+def test_finished_jobs_beyond_the_limit_are_pruned():
+    manager = JobManager(max_finished_jobs=2)
+    try:
+        jobs = [manager.submit(lambda params: None, {}) for _ in range(3)]
+        assert all(job.wait(5) for job in jobs)
+        manager.submit(lambda params: None, {}).wait(5)  # Pruning happens on submit
+        assert manager.get(jobs[0].job_id) is None
+        assert manager.get(jobs[2].job_id) is jobs[2]
+    finally:
+        manager.shutdown(wait=True)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('cv2')
+
+from adaptive_rate import GazeKalman
+from ASD_Detection_backup import ScreeningSession
+
+
+def _gaze(n=300, fps=30.0, seed=0):
+    """Saccade-heavy gaze: fixations with jitter and a jump every 10 frames"""
+    rng = np.random.default_rng(seed)
+    t = 1000.0 + np.arange(n) / fps
+    centres = rng.uniform([100, 100], [1800, 1000], size=(n // 10 + 1, 2))
+    xy = centres[np.arange(n) // 10] + rng.normal(0, 5, size=(n, 2))
+    return xy[:, 0], xy[:, 1], t
+
+
+def _session(start):
+    session = ScreeningSession()
+    session.session_start_time = start
+    return session
+
+
+def test_interpolated_samples_do_not_change_features():
+    x, y, t = _gaze()
+    measured = _session(t[0])
+    throttled = _session(t[0])
+    kalman = GazeKalman()
+    for i in range(len(t)):
+        sample = {'x': x[i], 'y': y[i], 'timestamp': t[i], 'interpolated': False}
+        measured.add_sample(sample)
+        throttled.add_sample(sample)
+        kalman.update(x[i], y[i], t[i])
+        # Face mesh skipped on the frames in between: the throttled session gets predictions there
+        for dt in (1 / 90, 2 / 90):
+            predicted = kalman.predict(t[i] + dt)
+            if predicted is not None:
+                throttled.add_sample(throttled.predicted_gaze(predicted[0], predicted[1], t[i] + dt))
+
+    assert len(throttled.current_session_data) > len(measured.current_session_data)
+    assert throttled.current_session_data.interpolated.sum() == len(throttled.current_session_data) - len(t)
+    assert throttled.measured_samples == measured.measured_samples == len(t)
+    assert throttled.features() == pytest.approx(measured.features())
+    assert (throttled.fixations, throttled.saccades) == (measured.fixations, measured.saccades)
+    segments, expected = throttled.event_segments(), measured.event_segments()
+    for kind in expected:
+        for name in expected[kind]:
+            np.testing.assert_allclose(segments[kind][name], expected[kind][name])
+
+
+def test_interpolated_samples_stay_in_the_trace():
+    session = _session(0.0)
+    session.add_sample({'x': 10.0, 'y': 20.0, 'timestamp': 0.0, 'interpolated': False})
+    session.add_sample(session.predicted_gaze(12.0, 22.0, 0.033))
+    assert len(session.current_session_data) == 2
+    assert session.current_session_data[1]['interpolated']
+    assert session.measured_samples == 1
+    assert len(session.gaze_path) == 2
+
+
+def test_no_stimulus_means_no_target_or_pursuit_metrics():
+    from stimulus import StimulusTrajectory
+
+    x, y, t = _gaze(n=60)
+    headless, shown = _session(t[0]), _session(t[0])
+    shown.stimulus = StimulusTrajectory('bounce', 1920, 1080, duration=5, radius=40)
+    for i in range(len(t)):
+        sample = {'x': x[i], 'y': y[i], 'timestamp': t[i], 'interpolated': False}
+        headless.add_sample(sample)
+        shown.add_sample(sample)
+
+    assert headless.pursuit_metrics() is None
+    assert np.isnan(headless.current_session_data.column('target_x')).all()
+    assert 'target_x' not in headless.current_session_data[0]
+    assert shown.pursuit_metrics()['mean_error'] > 0
+    assert not np.isnan(shown.current_session_data.column('target_x')).any()
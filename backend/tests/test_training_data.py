@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import training_data
+from test_gaze_events import state_machine_counts
+
+
+def reference_features(df, min_samples=training_data.MIN_SAMPLES):
+    """The per-subject loop training_data replaced: filter, extract, one subject at a time"""
+    rows, labels = [], []
+    for _, subject in df.groupby('subject', sort=True):
+        if len(subject) < min_samples:
+            continue
+        x, y, t = (subject[c].to_numpy(dtype=np.float64) for c in ('x', 'y', 'timestamp'))
+        dt = np.diff(t)
+        dt[dt == 0] = training_data.MIN_DT
+        velocity = np.hypot(np.diff(x), np.diff(y)) / dt
+        rows.append([x.mean(), y.mean(), x.std(), y.std(), velocity.mean(), *state_machine_counts(x, y, t)])
+        labels.append(subject['label'].iloc[0])
+    return np.array(rows), np.array(labels)
+
+
+def export(path, n_subjects=30, interleave=False, seed=0):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(20, 300, size=n_subjects)
+    subjects = np.repeat(np.arange(n_subjects), lengths)
+    n = len(subjects)
+    df = pd.DataFrame({
+        'Subject': subjects,
+        'Point of Regard Left X [px]': np.round(rng.uniform(0, 1920, n), 1),
+        'Point of Regard Left Y [px]': np.round(rng.uniform(0, 1080, n), 1),
+        'timestamp': np.concatenate([np.cumsum(rng.choice([0.0, 0.016, 0.033], size=k)) for k in lengths]),
+        'Group': np.repeat(np.where(np.arange(n_subjects) % 3, 'ASD', 'TD'), lengths),
+    })
+    if interleave:
+        # Round-robin over subjects, each keeping its own sample order
+        df = df.iloc[np.lexsort((df['Subject'], df.groupby('Subject').cumcount()))]
+    df.to_csv(path, index=False)
+    return df
+
+
+def renamed(df):
+    return df.rename(columns={'Subject': 'subject', 'Point of Regard Left X [px]': 'x', 'Point of Regard Left Y [px]': 'y', 'Group': 'label'})
+
+
+def test_basic_features_match_the_per_subject_loop(tmp_path):
+    df = export(tmp_path / 'train.csv')
+    X, y, ids = training_data.basic_features(training_data.load_subjects(tmp_path / 'train.csv'))
+    expected_X, expected_y = reference_features(renamed(df).astype({'x': np.float32, 'y': np.float32}))
+    np.testing.assert_allclose(X, expected_X, rtol=1e-6)
+    np.testing.assert_array_equal(y, expected_y)
+    assert len(ids) == len(expected_X)
+
+
+def test_streamed_tables_hold_the_same_subjects(tmp_path):
+    export(tmp_path / 'train.csv')
+    whole = training_data.basic_features(training_data.load_subjects(tmp_path / 'train.csv'))
+    tables = list(training_data.iter_subject_tables(tmp_path / 'train.csv', chunk_rows=500))
+    assert len(tables) > 1
+    X, y, ids = (np.concatenate(parts) for parts in zip(*(training_data.basic_features(t) for t in tables)))
+    np.testing.assert_allclose(X, whole[0], rtol=1e-12)  # Sums over a different chunking may differ in the last bit
+    np.testing.assert_array_equal(y, whole[1])
+    np.testing.assert_array_equal(ids, whole[2])
+
+
+def test_interleaved_subjects_are_grouped_in_sample_order(tmp_path):
+    df = export(tmp_path / 'train.csv', interleave=True, seed=4)
+    X, y, _ = training_data.basic_features(training_data.load_subjects(tmp_path / 'train.csv'))
+    expected_X, expected_y = reference_features(renamed(df).astype({'x': np.float32, 'y': np.float32}))
+    np.testing.assert_allclose(X, expected_X, rtol=1e-6)
+    np.testing.assert_array_equal(y, expected_y)
+    # Streaming falls back to loading the interleaved file whole
+    tables = list(training_data.iter_subject_tables(tmp_path / 'train.csv', chunk_rows=500))
+    assert len(tables) == 1
+
+
+def test_rows_per_subject_without_subject_column(tmp_path):
+    rng = np.random.default_rng(2)
+    n = 2500
+    pd.DataFrame({'Point of Regard Left X [px]': rng.uniform(0, 1920, n), 'Point of Regard Left Y [px]': rng.uniform(0, 1080, n),
+                  'Group': 'TD'}).to_csv(tmp_path / 'train.csv', index=False)
+    table = training_data.load_subjects(tmp_path / 'train.csv', rows_per_subject=1000)
+    assert list(table.lengths) == [1000, 1000, 500]
+    np.testing.assert_allclose(table.timestamp[:3], np.arange(3) / training_data.SAMPLE_RATE)
+    streamed = list(training_data.iter_subject_tables(tmp_path / 'train.csv', rows_per_subject=1000, chunk_rows=700))
+    assert [int(n) for t in streamed for n in t.lengths] == [1000, 1000, 500]
@@ -0,0 +1,232 @@
+"""
+Training data loading
+
+The training CSV holds gaze samples for many subjects, one row per sample.
+load_subjects() reads it once, renames the export columns, and sorts the
+rows by subject a single time (stable, so each subject keeps its sample
+order). It then records where each subject starts and stops. Subjects are
+zero-copy slices of a few flat NumPy columns. basic_features() computes
+every subject's features in one vectorized pass over those columns, instead
+of filtering the DataFrame once per subject.
+
+Subjects come from a subject id column when the export has one. Otherwise
+every ROWS_PER_SUBJECT consecutive rows are treated as one subject, as
+before.
+
+Only the columns the features use are parsed (usecols), with explicit
+dtypes: float32 gaze coordinates, float64 timestamps. For exports too large
+to hold in memory, iter_subject_tables() streams the file in chunks of
+CHUNK_ROWS rows. Each chunk is cut at a subject boundary and the unfinished
+subject carries over to the next chunk. Memory is then bounded by the chunk
+size plus one subject, not by the file size. Streaming needs each subject's
+rows to be contiguous in the file. Exports where subjects are interleaved
+are detected by a pass over the subject id column alone, and loaded whole
+instead.
+"""
+
+import numpy as np
+
+from lazy_import import LazyModule
+from gaze_events import MAX_FIXATION_RADIUS, MIN_FIXATION_DURATION, VELOCITY_THRESHOLD, count_events
+
+pd = LazyModule('pandas')
+
+# Features computed by extract_comprehensive_features, in training order
+BASIC_FEATURES = ('mean_x', 'mean_y', 'std_x', 'std_y', 'mean_velocity', 'fixation_count', 'saccade_count')
+BASIC_FEATURES_VERSION = 'basic-2'  # Feature cache key; bump when basic_features() changes
+
+COLUMN_MAP = {'Point of Regard Left X [px]': 'x', 'Point of Regard Left Y [px]': 'y', 'Group': 'label'}
+SUBJECT_COLUMNS = ('subject_id', 'Subject', 'subject', 'Participant', 'participant')
+# Parsed column types (others are inferred); pixel coordinates do not need float64
+READ_DTYPES = {'Point of Regard Left X [px]': np.float32, 'Point of Regard Left Y [px]': np.float32, 'timestamp': np.float64}
+CHUNK_ROWS = 500_000
+ROWS_PER_SUBJECT = 1000
+SAMPLE_RATE = 60  # Hz, for exports without a timestamp column
+MIN_SAMPLES = 50
+MIN_DT = 1e-3  # Same substitute for repeated timestamps as extract_comprehensive_features
+
+
+class SubjectTable:
+    """Gaze samples grouped by subject: flat columns plus each subject's [start, stop) row range"""
+
+    def __init__(self, subject_ids, starts, stops, x, y, timestamp, label):
+        self.subject_ids = subject_ids
+        self.starts = starts
+        self.stops = stops
+        self.x = x
+        self.y = y
+        self.timestamp = timestamp
+        self.label = label  # Label of each subject (its first row)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def lengths(self):
+        return self.stops - self.starts
+
+    def subject(self, i):
+        """Column views of one subject, indexable like a DataFrame (data['x'])"""
+        rows = slice(self.starts[i], self.stops[i])
+        return {'x': self.x[rows], 'y': self.y[rows], 'timestamp': self.timestamp[rows]}
+
+
+def subject_column(columns):
+    """Name of the subject id column in an export, or None"""
+    return next((name for name in SUBJECT_COLUMNS if name in columns), None)
+
+
+def group_subjects(df, rows_per_subject=ROWS_PER_SUBJECT, row_offset=0):
+    """
+    Group a renamed DataFrame (x, y, label and optionally timestamp/subject columns) by subject
+
+    Args:
+        row_offset: Index of the first row in the whole file, so positional subject ids
+            (rows_per_subject) stay correct when the file is read in pieces
+    """
+    n = len(df)
+    id_column = subject_column(df.columns)
+    if id_column is None:
+        ids = (np.arange(n) + row_offset) // rows_per_subject
+        order = None  # Already grouped
+    else:
+        ids = df[id_column].to_numpy()
+        codes, _ = pd.factorize(ids, sort=True)
+        order = np.argsort(codes, kind='stable')
+        ids = ids[order]
+
+    def column(name, dtype=np.float64):
+        values = df[name].to_numpy(dtype=dtype) if dtype is not None else df[name].to_numpy()
+        return values if order is None else values[order]
+
+    x, y, label = column('x'), column('y'), column('label', dtype=None)
+    if n == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return SubjectTable(ids[:0], empty, empty, x, y, np.empty(0), label)
+    boundaries = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    stops = np.concatenate((boundaries, [n]))
+    if 'timestamp' in df.columns:
+        timestamp = column('timestamp')
+    elif order is None:
+        # Row number at the export's sample rate; written as row * (1 / rate) like the original loader,
+        # so durations that land exactly on the fixation threshold round the same way
+        timestamp = (np.arange(n) + row_offset) * (1 / SAMPLE_RATE)
+    else:
+        # Sample position within the subject
+        timestamp = (np.arange(n) - np.repeat(starts, stops - starts)) * (1 / SAMPLE_RATE)
+    return SubjectTable(ids[starts], starts, stops, x, y, timestamp, label[starts])
+
+
+def _used_column(name):
+    return name in COLUMN_MAP or name == 'timestamp' or name in SUBJECT_COLUMNS
+
+
+def read_csv(csv_path, **kwargs):
+    """pd.read_csv of only the columns the features use, with READ_DTYPES"""
+    return pd.read_csv(csv_path, usecols=_used_column, dtype=READ_DTYPES, **kwargs)
+
+
+def load_subjects(csv_path, rows_per_subject=ROWS_PER_SUBJECT):
+    """Read a training CSV and group its rows by subject"""
+    df = read_csv(csv_path).rename(columns=COLUMN_MAP)
+    return group_subjects(df, rows_per_subject)
+
+
+def _subjects_contiguous(csv_path, id_column, chunk_rows):
+    """Whether every subject's rows form one contiguous block, reading only the id column"""
+    seen, last = set(), None
+    for chunk in pd.read_csv(csv_path, usecols=[id_column], chunksize=chunk_rows):
+        ids = chunk[id_column].to_numpy()
+        if not len(ids):
+            continue
+        runs = ids[np.concatenate(([True], ids[1:] != ids[:-1]))].tolist()
+        if runs[0] == last:
+            runs = runs[1:]  # Subject continuing from the previous chunk
+        for subject in runs:
+            if subject in seen:
+                return False
+            seen.add(subject)
+        last = ids[-1]
+    return True
+
+
+def _complete_rows(df, id_column, row_offset, rows_per_subject):
+    """Number of leading rows of df that belong to subjects ending inside df"""
+    if id_column is None:
+        return max(0, (row_offset + len(df)) // rows_per_subject * rows_per_subject - row_offset)
+    ids = df[id_column].to_numpy()
+    other = np.flatnonzero(ids != ids[-1])
+    return int(other[-1]) + 1 if len(other) else 0
+
+
+def iter_subject_tables(csv_path, rows_per_subject=ROWS_PER_SUBJECT, chunk_rows=CHUNK_ROWS):
+    """
+    Stream a training CSV as SubjectTables of whole subjects, chunk_rows rows at a time
+
+    The tables together hold the same subjects as load_subjects(), in file order.
+    """
+    id_column = subject_column(pd.read_csv(csv_path, nrows=0).columns)
+    if id_column is not None and not _subjects_contiguous(csv_path, id_column, chunk_rows):
+        print(f"⚠️ Subjects are interleaved in {csv_path}; loading it whole")
+        yield load_subjects(csv_path, rows_per_subject)
+        return
+    carry, row_offset = None, 0  # Rows of the unfinished subject, and the file row they start at
+    for chunk in read_csv(csv_path, chunksize=chunk_rows):
+        df = chunk.rename(columns=COLUMN_MAP)
+        if carry is not None and len(carry):
+            df = pd.concat([carry, df], ignore_index=True)
+        if not len(df):
+            continue
+        cut = _complete_rows(df, id_column, row_offset, rows_per_subject)
+        if cut:
+            yield group_subjects(df.iloc[:cut], rows_per_subject, row_offset)
+        carry, row_offset = df.iloc[cut:], row_offset + cut
+    if carry is not None and len(carry):
+        yield group_subjects(carry, rows_per_subject, row_offset)
+
+
+def basic_features_params(rows_per_subject=ROWS_PER_SUBJECT, min_samples=MIN_SAMPLES):
+    """Everything besides the data that changes basic_features() output (feature cache key)"""
+    return {'rows_per_subject': rows_per_subject, 'min_samples': min_samples, 'sample_rate': SAMPLE_RATE, 'min_dt': MIN_DT,
+            'velocity_threshold': VELOCITY_THRESHOLD, 'min_fixation_duration': MIN_FIXATION_DURATION,
+            'max_fixation_radius': MAX_FIXATION_RADIUS}
+
+
+def basic_features(table, min_samples=MIN_SAMPLES):
+    """
+    BASIC_FEATURES for every subject with at least min_samples rows, in one vectorized pass
+
+    Returns:
+        (X, y, subject_ids): feature matrix in BASIC_FEATURES column order, labels and the
+        ids of the subjects kept
+    """
+    keep = table.lengths >= min_samples
+    starts, stops = table.starts[keep], table.stops[keep]
+    counts = stops - starts
+    if not len(starts):
+        return np.empty((0, len(BASIC_FEATURES))), table.label[:0], table.subject_ids[:0]
+    x, y, t = table.x, table.y, table.timestamp
+
+    # Only the kept subjects' rows, still contiguous per subject
+    if not keep.all():
+        rows = np.repeat(keep, table.lengths)
+        x, y, t = x[rows], y[rows], t[rows]
+    local_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    mean_x = np.add.reduceat(x, local_starts) / counts
+    mean_y = np.add.reduceat(y, local_starts) / counts
+    std_x = np.sqrt(np.add.reduceat((x - np.repeat(mean_x, counts)) ** 2, local_starts) / counts)
+    std_y = np.sqrt(np.add.reduceat((y - np.repeat(mean_y, counts)) ** 2, local_starts) / counts)
+
+    dt = np.diff(t)
+    dt[dt == 0] = MIN_DT
+    velocity = np.hypot(np.diff(x), np.diff(y)) / dt
+    # Drop the differences that straddle two subjects
+    velocity[local_starts[1:] - 1] = 0.0
+    mean_velocity = np.add.reduceat(velocity, local_starts) / (counts - 1)
+    local_stops = local_starts + counts
+
+    events = np.array([count_events(x[a:b], y[a:b], t[a:b]) for a, b in zip(local_starts, local_stops)], dtype=np.float64).reshape(-1, 2)
+    X = np.column_stack((mean_x, mean_y, std_x, std_y, mean_velocity, events[:, 0], events[:, 1]))
+    return X, table.label[keep], table.subject_ids[keep]
@@ -0,0 +1,74 @@
+import React, { useEffect, useRef } from 'react';
+
+// Decode a base64 column into a typed array (columns are little-endian, as are browsers)
+const decodeColumn = (data, ArrayType) => {
+  const binary = atob(data);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return new ArrayType(bytes.buffer);
+};
+
+// Turn the backend's compact gaze_trace payload into { x, y, t } typed arrays (t in ms)
+export const decodeGazeTrace = (trace) => {
+  if (!trace || trace.encoding !== 'base64') return null;
+  const x = decodeColumn(trace.columns.x, Float32Array);
+  const y = decodeColumn(trace.columns.y, Float32Array);
+  const dt = decodeColumn(trace.columns.dt, Uint16Array);
+  const t = new Float64Array(dt.length);
+  for (let i = 1; i < dt.length; i++) {
+    t[i] = t[i - 1] + dt[i];
+  }
+  return { x, y, t };
+};
+
+const GazeTrace = ({ trace, width = 480, height = 270 }) => {
+  const canvasRef = useRef(null);
+
+  useEffect(() => {
+    const canvas = canvasRef.current;
+    const decoded = decodeGazeTrace(trace);
+    if (!canvas || !decoded || decoded.x.length === 0) return;
+
+    const ctx = canvas.getContext('2d');
+    ctx.fillStyle = '#111';
+    ctx.fillRect(0, 0, width, height);
+
+    const { x, y } = decoded;
+    let minX = Infinity, maxX = -Infinity, minY = Infinity, maxY = -Infinity;
+    for (let i = 0; i < x.length; i++) {
+      minX = Math.min(minX, x[i]); maxX = Math.max(maxX, x[i]);
+      minY = Math.min(minY, y[i]); maxY = Math.max(maxY, y[i]);
+    }
+    const scale = Math.min(width / (maxX - minX || 1), height / (maxY - minY || 1)) * 0.9;
+    const toCanvas = (i) => [
+      (x[i] - minX) * scale + width * 0.05,
+      (y[i] - minY) * scale + height * 0.05
+    ];
+
+    ctx.strokeStyle = 'rgba(255, 60, 60, 0.8)';
+    ctx.lineWidth = 1.5;
+    ctx.beginPath();
+    ctx.moveTo(...toCanvas(0));
+    for (let i = 1; i < x.length; i++) {
+      ctx.lineTo(...toCanvas(i));
+    }
+    ctx.stroke();
+
+    const dot = (i, color) => {
+      const [cx, cy] = toCanvas(i);
+      ctx.fillStyle = color;
+      ctx.beginPath();
+      ctx.arc(cx, cy, 5, 0, 2 * Math.PI);
+      ctx.fill();
+    };
+    dot(0, 'lime');
+    dot(x.length - 1, 'cyan');
+  }, [trace, width, height]);
+
+  if (!trace) return null;
+  return <canvas ref={canvasRef} width={width} height={height} className="gaze-trace" />;
+};
+
+export default GazeTrace;
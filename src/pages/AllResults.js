@@ -39,6 +39,7 @@ const AllResults = () => {
       nonSocialAttention: newResult.nonSocialAttention || 0,
       improvement: newResult.improvement || 0,
       pdfReportUrl: newResult.pdfReportUrl,
+      gazeTrace: newResult.gazeTrace,
       timestamp: newResult.timestamp
     };
     
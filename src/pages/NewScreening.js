@@ -167,12 +167,56 @@ const NewScreening = () => {
         signal: controller.signal
       });
       
-      clearTimeout(timeoutId);
+      const jobData = await startResponse.json();
 
-      const startData = await startResponse.json();
-      
-      if (!startData.success) {
-        throw new Error(startData.error || 'Screening failed');
+      if (!jobData.success) {
+        clearTimeout(timeoutId);
+        throw new Error(jobData.error || 'Screening failed');
+      }
+
+      // The backend runs the session in the background; long-poll the job until it finishes.
+      // Network errors and server errors are retried after a short backoff until the overall timeout aborts.
+      const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+      let startData = null;
+      let retryDelay = 1000;
+      try {
+        while (!startData) {
+          let resultResponse;
+          try {
+            resultResponse = await fetch(`${API_BASE_URL}/screening_result/${jobData.job_id}?wait=25&trace=base64&max_points=600`, {
+              signal: controller.signal
+            });
+          } catch (fetchError) {
+            if (fetchError.name === 'AbortError') throw fetchError;
+            console.warn('Polling the screening result failed, retrying:', fetchError);
+            await sleep(retryDelay);
+            retryDelay = Math.min(retryDelay * 2, 10000);
+            continue;
+          }
+          if (resultResponse.status >= 500) {
+            console.warn(`Screening result returned ${resultResponse.status}, retrying`);
+            await sleep(retryDelay);
+            retryDelay = Math.min(retryDelay * 2, 10000);
+            continue;
+          }
+          retryDelay = 1000;
+          const resultJson = await resultResponse.json().catch(() => ({}));
+          if (resultJson.status === 'failed' || resultJson.status === 'cancelled') {
+            throw new Error(resultJson.error || `Screening ${resultJson.status}`);
+          }
+          if (resultResponse.status === 202) {
+            continue;
+          }
+          if (resultResponse.status === 404) {
+            throw new Error('The screening job was not found (it may have expired). Please start a new screening.');
+          }
+          if (!resultResponse.ok || !resultJson.success || !resultJson.result) {
+            throw new Error(resultJson.error || `Screening failed (HTTP ${resultResponse.status})`);
+          }
+          startData = resultJson;
+        }
+      } finally {
+        clearTimeout(timeoutId);
       }
 
       const screeningDuration = startData.duration || 60;
@@ -212,7 +256,8 @@ const NewScreening = () => {
         nonSocialAttention: Math.round(nonSocialAttention),
         improvement: Math.round(improvement * 10) / 10,
         timestamp: new Date().toISOString(),
-        pdfReportUrl: resultData.downloadUrl
+        pdfReportUrl: resultData.downloadUrl,
+        gazeTrace: resultData.gaze_trace
       };
       
       console.log('Saving screening result:', screeningResult);
@@ -243,6 +288,7 @@ const NewScreening = () => {
           nonSocialAttention: screeningResult.nonSocialAttention,
           improvement: screeningResult.improvement,
           pdfReportUrl: screeningResult.pdfReportUrl,
+          gazeTrace: screeningResult.gazeTrace,
           timestamp: screeningResult.timestamp
         });
         localStorage.setItem(storageKey, JSON.stringify(results));
@@ -1,12 +1,30 @@
 import React from 'react';
+import { useAuth } from '../services/auth';
+import GazeTrace from '../components/Common/GazeTrace';
 
 const Results = () => {
+  const { user } = useAuth();
+
+  // Show the most recent screening of this user that came back with a gaze trace
+  const saved = user ? localStorage.getItem(`screeningResults_${user.id}`) : null;
+  const results = saved ? JSON.parse(saved) : [];
+  const latest = [...results].reverse().find(r => r.gazeTrace);
+
   return (
     <div>
       <h1>Results Page</h1>
-      <p>Screening results will be displayed here.</p>
+      {latest ? (
+        <div>
+          <p>{latest.childName} - {latest.date}: {latest.verdict}</p>
+          <h3>Gaze Scan Path</h3>
+          <GazeTrace trace={latest.gazeTrace} />
+          <p>{latest.gazeTrace.count} of {latest.gazeTrace.source_count} gaze samples shown</p>
+        </div>
+      ) : (
+        <p>Screening results will be displayed here.</p>
+      )}
     </div>
   );
 };
 
-export default Results;
\ No newline at end of file
+export default Results;